@@ -0,0 +1,51 @@
+"""add refresh token partial indexes
+
+Revision ID: a5e9c3d7b1f8
+Revises: f4d8b2c6e0a7
+Create Date: 2026-04-08 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a5e9c3d7b1f8"
+down_revision: Union[str, Sequence[str], None] = "f4d8b2c6e0a7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_refresh_tokens_user_active",
+        "refresh_tokens",
+        ["user_id"],
+        unique=False,
+        postgresql_where=sa.text("revoked_at IS NULL"),
+        sqlite_where=sa.text("revoked_at IS NULL"),
+    )
+    op.create_index(
+        "ix_refresh_tokens_revoked_at",
+        "refresh_tokens",
+        ["revoked_at"],
+        unique=False,
+        postgresql_where=sa.text("revoked_at IS NOT NULL"),
+        sqlite_where=sa.text("revoked_at IS NOT NULL"),
+    )
+    op.create_index(
+        "ix_refresh_tokens_active_last_used",
+        "refresh_tokens",
+        ["last_used_at"],
+        unique=False,
+        postgresql_where=sa.text("revoked_at IS NULL"),
+        sqlite_where=sa.text("revoked_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_refresh_tokens_active_last_used", table_name="refresh_tokens")
+    op.drop_index("ix_refresh_tokens_revoked_at", table_name="refresh_tokens")
+    op.drop_index("ix_refresh_tokens_user_active", table_name="refresh_tokens")
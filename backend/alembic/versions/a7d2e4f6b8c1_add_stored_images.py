@@ -0,0 +1,74 @@
+"""add stored images
+
+Revision ID: a7d2e4f6b8c1
+Revises: f6c1d8e2a9b4
+Create Date: 2026-03-26 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a7d2e4f6b8c1"
+down_revision: Union[str, Sequence[str], None] = "f6c1d8e2a9b4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "stored_images",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=20), nullable=False),
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.Column("url", sa.String(), nullable=False),
+        sa.Column("public_id", sa.String(), nullable=True),
+        sa.Column("thumbnail_url", sa.String(), nullable=True),
+        sa.Column("medium_url", sa.String(), nullable=True),
+        sa.Column("byte_size", sa.Integer(), nullable=True),
+        sa.Column("width", sa.Integer(), nullable=True),
+        sa.Column("height", sa.Integer(), nullable=True),
+        sa.Column("ref_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("kind", "content_hash", name="uq_stored_images_kind_hash"),
+    )
+    op.create_index(op.f("ix_stored_images_id"), "stored_images", ["id"], unique=False)
+
+    op.add_column(
+        "provider_catalog_images",
+        sa.Column("stored_image_id", sa.Integer(), nullable=True),
+    )
+    op.create_index(
+        op.f("ix_provider_catalog_images_stored_image_id"),
+        "provider_catalog_images",
+        ["stored_image_id"],
+        unique=False,
+    )
+    if op.get_bind().dialect.name != "sqlite":
+        op.create_foreign_key(
+            "fk_provider_catalog_images_stored_image_id",
+            "provider_catalog_images",
+            "stored_images",
+            ["stored_image_id"],
+            ["id"],
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        op.drop_constraint(
+            "fk_provider_catalog_images_stored_image_id",
+            "provider_catalog_images",
+            type_="foreignkey",
+        )
+    op.drop_index(
+        op.f("ix_provider_catalog_images_stored_image_id"),
+        table_name="provider_catalog_images",
+    )
+    op.drop_column("provider_catalog_images", "stored_image_id")
+    op.drop_index(op.f("ix_stored_images_id"), table_name="stored_images")
+    op.drop_table("stored_images")
@@ -0,0 +1,82 @@
+"""add provider search documents
+
+Revision ID: b8e4f1a2c3d5
+Revises: a7d1c9e4f201
+Create Date: 2026-03-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b8e4f1a2c3d5"
+down_revision: Union[str, Sequence[str], None] = "a7d1c9e4f201"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "provider_search_documents",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("provider_id", sa.Integer(), nullable=False),
+        sa.Column("document", sa.Text(), nullable=False, server_default=""),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["provider_id"], ["providers.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_provider_search_documents_id"), "provider_search_documents", ["id"], unique=False)
+    op.create_index(
+        op.f("ix_provider_search_documents_provider_id"),
+        "provider_search_documents",
+        ["provider_id"],
+        unique=True,
+    )
+
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        "CREATE INDEX ix_provider_search_documents_document_trgm "
+        "ON provider_search_documents USING gin (document gin_trgm_ops)"
+    )
+    op.execute(
+        "CREATE INDEX ix_provider_search_documents_document_tsv "
+        "ON provider_search_documents USING gin (to_tsvector('simple', document))"
+    )
+
+    # Backfill one document per existing provider. Mirrors
+    # app.services.provider_search.build_search_document.
+    op.execute(
+        """
+        INSERT INTO provider_search_documents (provider_id, document, updated_at)
+        SELECT
+            p.id,
+            trim(regexp_replace(lower(concat_ws(
+                ' ',
+                u.username,
+                u.location,
+                p.bio,
+                (SELECT string_agg(pp.name, ' ') FROM provider_professions pp WHERE pp.provider_id = p.id),
+                (SELECT string_agg(s.name, ' ') FROM services s WHERE s.provider_id = p.id AND s.is_active)
+            )), '[^a-z0-9]+', ' ', 'g')),
+            now()
+        FROM providers p
+        JOIN users u ON u.id = p.user_id
+        """
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_provider_search_documents_document_tsv")
+        op.execute("DROP INDEX IF EXISTS ix_provider_search_documents_document_trgm")
+    op.drop_index(op.f("ix_provider_search_documents_provider_id"), table_name="provider_search_documents")
+    op.drop_index(op.f("ix_provider_search_documents_id"), table_name="provider_search_documents")
+    op.drop_table("provider_search_documents")
@@ -0,0 +1,42 @@
+"""add push tickets
+
+Revision ID: b8f3c5d7e9a2
+Revises: a7d2e4f6b8c1
+Create Date: 2026-03-28 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b8f3c5d7e9a2"
+down_revision: Union[str, Sequence[str], None] = "a7d2e4f6b8c1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "push_tickets",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("ticket_id", sa.String(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("expo_push_token", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("ticket_id"),
+    )
+    op.create_index(op.f("ix_push_tickets_id"), "push_tickets", ["id"], unique=False)
+    op.create_index("ix_push_tickets_created_at", "push_tickets", ["created_at"], unique=False)
+    op.create_index(op.f("ix_push_tokens_last_seen_at"), "push_tokens", ["last_seen_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_push_tokens_last_seen_at"), table_name="push_tokens")
+    op.drop_index("ix_push_tickets_created_at", table_name="push_tickets")
+    op.drop_index(op.f("ix_push_tickets_id"), table_name="push_tickets")
+    op.drop_table("push_tickets")
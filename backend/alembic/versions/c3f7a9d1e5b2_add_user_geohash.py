@@ -0,0 +1,57 @@
+"""add user geohash
+
+Revision ID: c3f7a9d1e5b2
+Revises: b8e4f1a2c3d5
+Create Date: 2026-03-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.geo import geohash_for
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c3f7a9d1e5b2"
+down_revision: Union[str, Sequence[str], None] = "b8e4f1a2c3d5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("geohash", sa.String(length=12), nullable=True))
+    op.create_index(
+        "ix_users_geohash",
+        "users",
+        ["geohash"],
+        unique=False,
+        postgresql_ops={"geohash": "varchar_pattern_ops"},
+    )
+
+    bind = op.get_bind()
+    users = sa.table(
+        "users",
+        sa.column("id", sa.Integer),
+        sa.column("lat", sa.Float),
+        sa.column("long", sa.Float),
+        sa.column("geohash", sa.String),
+    )
+    rows = bind.execute(
+        sa.select(users.c.id, users.c.lat, users.c.long).where(
+            users.c.lat.isnot(None),
+            users.c.long.isnot(None),
+        )
+    ).fetchall()
+    for row in rows:
+        bind.execute(
+            users.update()
+            .where(users.c.id == row.id)
+            .values(geohash=geohash_for(row.lat, row.long))
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_geohash", table_name="users")
+    op.drop_column("users", "geohash")
@@ -0,0 +1,43 @@
+"""add trigram indexes for admin user search
+
+Revision ID: c7e2a4f9b1d3
+Revises: a5e9c3d7b1f8
+Create Date: 2026-04-10 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c7e2a4f9b1d3"
+down_revision: Union[str, Sequence[str], None] = "a5e9c3d7b1f8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The admin client/provider lists filter with ILIKE '%term%'; pg_trgm
+    # GIN indexes let PostgreSQL answer that without scanning users.
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_users_username_trgm "
+        "ON users USING gin (username gin_trgm_ops)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_users_whatsapp_trgm "
+        "ON users USING gin (whatsapp gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_users_whatsapp_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_users_username_trgm")
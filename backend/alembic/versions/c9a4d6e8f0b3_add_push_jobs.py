@@ -0,0 +1,55 @@
+"""add push jobs
+
+Revision ID: c9a4d6e8f0b3
+Revises: b8f3c5d7e9a2
+Create Date: 2026-03-30 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c9a4d6e8f0b3"
+down_revision: Union[str, Sequence[str], None] = "b8f3c5d7e9a2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "push_jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("body", sa.Text(), nullable=False),
+        sa.Column("data", sa.Text(), nullable=True),
+        sa.Column("dedupe_key", sa.String(), nullable=True),
+        sa.Column("status", sa.String(length=20), nullable=False, server_default="pending"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False),
+        sa.Column("locked_at", sa.DateTime(), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("dedupe_key"),
+    )
+    op.create_index(op.f("ix_push_jobs_id"), "push_jobs", ["id"], unique=False)
+    op.create_index(
+        "ix_push_jobs_status_next_attempt",
+        "push_jobs",
+        ["status", "next_attempt_at"],
+        unique=False,
+    )
+    op.create_index("ix_push_jobs_user_sent_at", "push_jobs", ["user_id", "sent_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_push_jobs_user_sent_at", table_name="push_jobs")
+    op.drop_index("ix_push_jobs_status_next_attempt", table_name="push_jobs")
+    op.drop_index(op.f("ix_push_jobs_id"), table_name="push_jobs")
+    op.drop_table("push_jobs")
@@ -0,0 +1,81 @@
+"""add booking reminders
+
+Revision ID: d1b5e7f9a3c4
+Revises: c9a4d6e8f0b3
+Create Date: 2026-04-02 00:00:00.000000
+
+"""
+from datetime import timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.time import now_guyana
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d1b5e7f9a3c4"
+down_revision: Union[str, Sequence[str], None] = "c9a4d6e8f0b3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Matches the BOOKING_REMINDER_OFFSETS_MINUTES default.
+BACKFILL_OFFSETS_MINUTES = (1440, 60)
+
+
+def upgrade() -> None:
+    reminders = op.create_table(
+        "booking_reminders",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("booking_id", sa.Integer(), nullable=False),
+        sa.Column("offset_minutes", sa.Integer(), nullable=False),
+        sa.Column("due_at", sa.DateTime(), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False, server_default="pending"),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["booking_id"], ["bookings.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "booking_id", "offset_minutes", name="uq_booking_reminders_booking_offset"
+        ),
+    )
+    op.create_index(op.f("ix_booking_reminders_id"), "booking_reminders", ["id"], unique=False)
+    op.create_index(
+        "ix_booking_reminders_status_due_at",
+        "booking_reminders",
+        ["status", "due_at"],
+        unique=False,
+    )
+
+    # Schedule reminders for confirmed bookings that haven't started yet so
+    # they aren't lost when the old time-window job goes away.
+    bind = op.get_bind()
+    now = now_guyana()
+    upcoming = bind.execute(
+        sa.text(
+            "SELECT id, start_time FROM bookings "
+            "WHERE status = 'confirmed' AND start_time > :now"
+        ),
+        {"now": now},
+    ).fetchall()
+    rows = []
+    for booking_id, start_time in upcoming:
+        for offset in BACKFILL_OFFSETS_MINUTES:
+            due_at = start_time - timedelta(minutes=offset)
+            if due_at > now:
+                rows.append(
+                    {
+                        "booking_id": booking_id,
+                        "offset_minutes": offset,
+                        "due_at": due_at,
+                        "status": "pending",
+                    }
+                )
+    if rows:
+        op.bulk_insert(reminders, rows)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_booking_reminders_status_due_at", table_name="booking_reminders")
+    op.drop_index(op.f("ix_booking_reminders_id"), table_name="booking_reminders")
+    op.drop_table("booking_reminders")
@@ -0,0 +1,28 @@
+"""add push ticket checked_at
+
+Revision ID: d2b6f8a1c4e7
+Revises: c7e2a4f9b1d3
+Create Date: 2026-04-10 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d2b6f8a1c4e7"
+down_revision: Union[str, Sequence[str], None] = "c7e2a4f9b1d3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("push_tickets", sa.Column("checked_at", sa.DateTime(), nullable=True))
+    op.create_index("ix_push_tickets_checked_at", "push_tickets", ["checked_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_push_tickets_checked_at", table_name="push_tickets")
+    op.drop_column("push_tickets", "checked_at")
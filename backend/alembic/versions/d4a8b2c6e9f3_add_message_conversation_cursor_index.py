@@ -0,0 +1,30 @@
+"""add message conversation cursor index
+
+Revision ID: d4a8b2c6e9f3
+Revises: c3f7a9d1e5b2
+Create Date: 2026-03-20 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d4a8b2c6e9f3"
+down_revision: Union[str, Sequence[str], None] = "c3f7a9d1e5b2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_messages_conversation_created_id",
+        "messages",
+        ["conversation_id", "created_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_messages_conversation_created_id", table_name="messages")
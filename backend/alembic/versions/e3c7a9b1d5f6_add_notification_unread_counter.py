@@ -0,0 +1,47 @@
+"""add notification unread counter
+
+Revision ID: e3c7a9b1d5f6
+Revises: d1b5e7f9a3c4
+Create Date: 2026-04-04 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e3c7a9b1d5f6"
+down_revision: Union[str, Sequence[str], None] = "d1b5e7f9a3c4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column("unread_notification_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+    op.execute(
+        """
+        UPDATE users SET unread_notification_count = (
+            SELECT count(*) FROM notifications n
+            WHERE n.user_id = users.id
+              AND n.is_read = false
+        )
+        """
+    )
+
+    op.create_index(
+        "ix_notifications_user_read_created",
+        "notifications",
+        ["user_id", "is_read", "created_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_notifications_user_read_created", table_name="notifications")
+    op.drop_column("users", "unread_notification_count")
@@ -0,0 +1,81 @@
+"""add conversation inbox columns
+
+Revision ID: e5b9c3d7f1a4
+Revises: d4a8b2c6e9f3
+Create Date: 2026-03-21 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e5b9c3d7f1a4"
+down_revision: Union[str, Sequence[str], None] = "d4a8b2c6e9f3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("conversations", sa.Column("last_message_id", sa.Integer(), nullable=True))
+    op.add_column("conversations", sa.Column("last_message_at", sa.DateTime(), nullable=True))
+    op.add_column(
+        "conversations",
+        sa.Column("client_unread_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column(
+        "conversations",
+        sa.Column("provider_unread_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+    op.execute(
+        """
+        UPDATE conversations SET
+            last_message_id = (
+                SELECT m.id FROM messages m
+                WHERE m.conversation_id = conversations.id
+                ORDER BY m.created_at DESC, m.id DESC
+                LIMIT 1
+            ),
+            last_message_at = (
+                SELECT max(m.created_at) FROM messages m
+                WHERE m.conversation_id = conversations.id
+            ),
+            client_unread_count = (
+                SELECT count(*) FROM messages m
+                WHERE m.conversation_id = conversations.id
+                  AND m.sender_user_id != conversations.client_user_id
+                  AND m.read_at IS NULL
+            ),
+            provider_unread_count = (
+                SELECT count(*) FROM messages m
+                WHERE m.conversation_id = conversations.id
+                  AND m.sender_user_id != conversations.provider_user_id
+                  AND m.read_at IS NULL
+            )
+        """
+    )
+
+    op.create_index(
+        "ix_conversations_client_last_message",
+        "conversations",
+        ["client_user_id", "last_message_at", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_conversations_provider_last_message",
+        "conversations",
+        ["provider_user_id", "last_message_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_conversations_provider_last_message", table_name="conversations")
+    op.drop_index("ix_conversations_client_last_message", table_name="conversations")
+    op.drop_column("conversations", "provider_unread_count")
+    op.drop_column("conversations", "client_unread_count")
+    op.drop_column("conversations", "last_message_at")
+    op.drop_column("conversations", "last_message_id")
@@ -0,0 +1,40 @@
+"""add rate limit buckets
+
+Revision ID: f4d8b2c6e0a7
+Revises: e3c7a9b1d5f6
+Create Date: 2026-04-06 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f4d8b2c6e0a7"
+down_revision: Union[str, Sequence[str], None] = "e3c7a9b1d5f6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "rate_limit_buckets",
+        sa.Column("key", sa.String(length=255), nullable=False),
+        sa.Column("tokens", sa.Float(), nullable=False),
+        sa.Column("allowed", sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column("refreshed_at", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+    op.create_index(
+        op.f("ix_rate_limit_buckets_refreshed_at"),
+        "rate_limit_buckets",
+        ["refreshed_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_rate_limit_buckets_refreshed_at"), table_name="rate_limit_buckets")
+    op.drop_table("rate_limit_buckets")
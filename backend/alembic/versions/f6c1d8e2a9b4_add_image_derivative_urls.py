@@ -0,0 +1,34 @@
+"""add image derivative urls
+
+Revision ID: f6c1d8e2a9b4
+Revises: e5b9c3d7f1a4
+Create Date: 2026-03-24 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f6c1d8e2a9b4"
+down_revision: Union[str, Sequence[str], None] = "e5b9c3d7f1a4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("avatar_thumbnail_url", sa.String(), nullable=True))
+    op.add_column("providers", sa.Column("avatar_thumbnail_url", sa.String(), nullable=True))
+    op.add_column("message_attachments", sa.Column("medium_url", sa.String(), nullable=True))
+    op.add_column("provider_catalog_images", sa.Column("thumbnail_url", sa.String(), nullable=True))
+    op.add_column("provider_catalog_images", sa.Column("medium_url", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("provider_catalog_images", "medium_url")
+    op.drop_column("provider_catalog_images", "thumbnail_url")
+    op.drop_column("message_attachments", "medium_url")
+    op.drop_column("providers", "avatar_thumbnail_url")
+    op.drop_column("users", "avatar_thumbnail_url")
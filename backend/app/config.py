@@ -44,6 +44,40 @@ class Settings:
             )
         self.DATABASE_URL: str = db_url
 
+        # Connection pool, per engine and per worker process: a worker can
+        # hold up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections per engine.
+        self.DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+        self.DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+        self.DB_POOL_TIMEOUT_SECONDS: float = float(
+            os.getenv("DB_POOL_TIMEOUT_SECONDS", "30")
+        )
+        self.DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+        # Recycle connections before server/proxy idle timeouts drop them.
+        self.DB_POOL_RECYCLE_SECONDS: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+
+        # Optional read replica for reports and listings (app.services.read_routing).
+        self.DATABASE_READ_URL: str = os.getenv("DATABASE_READ_URL", "").strip()
+        self.DATABASE_READ_MAX_LAG_SECONDS: float = float(
+            os.getenv("DATABASE_READ_MAX_LAG_SECONDS", "5")
+        )
+        self.DATABASE_READ_LAG_CHECK_SECONDS: float = float(
+            os.getenv("DATABASE_READ_LAG_CHECK_SECONDS", "5")
+        )
+        # After a write, the user's reads stay on the primary this long.
+        self.DATABASE_READ_STICKY_SECONDS: float = float(
+            os.getenv("DATABASE_READ_STICKY_SECONDS", "10")
+        )
+
+        # Per-request SQL stats (app.services.query_stats). Requests running
+        # more statements than the count threshold, or one statement shape
+        # at least the repeat threshold times (N+1), are logged.
+        self.QUERY_STATS_HEADERS: bool = (
+            os.getenv("QUERY_STATS_HEADERS", "false" if self.ENV == "prod" else "true").lower()
+            == "true"
+        )
+        self.QUERY_COUNT_LOG_THRESHOLD: int = int(os.getenv("QUERY_COUNT_LOG_THRESHOLD", "30"))
+        self.QUERY_REPEAT_LOG_THRESHOLD: int = int(os.getenv("QUERY_REPEAT_LOG_THRESHOLD", "10"))
+
         # -----------------------------
         # 🔐 AUTH / JWT — SINGLE SOURCE OF TRUTH
         # -----------------------------
@@ -51,6 +85,21 @@ class Settings:
         self.JWT_SECRET_KEY: str = jwt_config.secret_key
         self.JWT_ALGORITHM: str = jwt_config.algorithm
         self.ACCESS_TOKEN_EXPIRE_MINUTES: int = jwt_config.access_token_expire_minutes
+        # Authenticated user/provider lookups are cached in-process this
+        # long (see app.services.user_cache); 0 disables the cache.
+        self.AUTH_USER_CACHE_TTL_SECONDS: float = float(
+            os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "30")
+        )
+        # Refresh tokens unused this long stop working; revoked and
+        # expired ones are deleted by the daily retention job.
+        self.REFRESH_TOKEN_INACTIVITY_DAYS: int = int(
+            os.getenv("REFRESH_TOKEN_INACTIVITY_DAYS", "90")
+        )
+        # pbkdf2_sha256 work factor; hashes with other rounds are upgraded
+        # on the next successful login. PASSWORD_HASH_WORKERS processes run
+        # the KDF (0 hashes in the request thread).
+        self.PASSWORD_HASH_ROUNDS: int = int(os.getenv("PASSWORD_HASH_ROUNDS", "29000"))
+        self.PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
 
         # -----------------------------
         # 🌐 CORS — EXPLICIT ORIGINS ONLY
@@ -149,6 +198,14 @@ class Settings:
         self.FACEBOOK_APP_ID: str = os.getenv("FACEBOOK_APP_ID", "")
         self.FACEBOOK_APP_SECRET: str = os.getenv("FACEBOOK_APP_SECRET", "")
         self.FACEBOOK_GRAPH_VERSION: str = os.getenv("FACEBOOK_GRAPH_VERSION", "v19.0")
+        self.FACEBOOK_GRAPH_URL: str = os.getenv(
+            "FACEBOOK_GRAPH_URL", "https://graph.facebook.com"
+        )
+        # Verified tokens are cached until they expire, but never longer
+        # than this (0 disables the cache).
+        self.FACEBOOK_TOKEN_CACHE_SECONDS: int = int(
+            os.getenv("FACEBOOK_TOKEN_CACHE_SECONDS", "3600")
+        )
 
         # -----------------------------
         # Google OAuth (validated only when /auth/google is called)
@@ -193,6 +250,72 @@ class Settings:
         self.CLOUDINARY_UPLOAD_FOLDER: str = os.getenv(
             "CLOUDINARY_UPLOAD_FOLDER", "bookitgy/avatars"
         )
+        # Processes used to render WebP thumbnails/medium images on upload;
+        # 0 renders in the threadpool instead.
+        self.IMAGE_DERIVATIVE_WORKERS: int = int(
+            os.getenv("IMAGE_DERIVATIVE_WORKERS", "2")
+        )
+
+        # -----------------------------
+        # Push notifications
+        # -----------------------------
+        # Pushes are queued in push_jobs. "background" delivers them from
+        # PUSH_QUEUE_WORKERS threads; "inline" drains the queue right after
+        # the enqueuing commit (tests, debugging).
+        self.PUSH_DISPATCH_MODE: str = os.getenv("PUSH_DISPATCH_MODE", "background").strip().lower()
+        self.PUSH_QUEUE_WORKERS: int = int(os.getenv("PUSH_QUEUE_WORKERS", "2"))
+        self.PUSH_QUEUE_POLL_SECONDS: float = float(
+            os.getenv("PUSH_QUEUE_POLL_SECONDS", "5")
+        )
+        self.PUSH_USER_RATE_LIMIT_PER_MINUTE: int = int(
+            os.getenv("PUSH_USER_RATE_LIMIT_PER_MINUTE", "10")
+        )
+        self.EXPO_PUSH_URL: str = os.getenv(
+            "EXPO_PUSH_URL", "https://exp.host/--/api/v2/push/send"
+        )
+        self.EXPO_PUSH_TIMEOUT_SECONDS: float = float(
+            os.getenv("EXPO_PUSH_TIMEOUT_SECONDS", "10")
+        )
+        # Tokens whose device hasn't re-registered for this long are deleted.
+        self.PUSH_TOKEN_RETENTION_DAYS: int = int(
+            os.getenv("PUSH_TOKEN_RETENTION_DAYS", "90")
+        )
+        # Appointment reminders, in minutes before start (default 24h and 1h).
+        self.BOOKING_REMINDER_OFFSETS_MINUTES: List[int] = [
+            int(offset)
+            for offset in os.getenv("BOOKING_REMINDER_OFFSETS_MINUTES", "1440,60").split(",")
+            if offset.strip()
+        ]
+
+        # -----------------------------
+        # Rate limiting (app.services.rate_limit)
+        # -----------------------------
+        # Backend "memory" (per process) or "database" (shared by all
+        # workers). Empty picks "database" when DATABASE_URL is PostgreSQL.
+        self.RATE_LIMIT_ENABLED: bool = (
+            os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+        )
+        self.RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "").strip().lower()
+        # Per-rule overrides, e.g. "login=5/60,availability=off".
+        self.RATE_LIMITS: str = os.getenv("RATE_LIMITS", "")
+        # Peers allowed to set X-Forwarded-For for IP-keyed buckets:
+        # comma-separated addresses/CIDRs, or "*" for any peer. The default
+        # covers private networks, which is where Render's proxy connects
+        # from; the header is ignored when the peer isn't listed.
+        self.TRUSTED_PROXIES: str = os.getenv(
+            "TRUSTED_PROXIES",
+            "127.0.0.1,::1,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,fc00::/7",
+        )
+
+        # -----------------------------
+        # Realtime events (GET /events/stream)
+        # -----------------------------
+        # "memory" (single process) or "postgres" (LISTEN/NOTIFY across
+        # workers). Empty picks "postgres" when DATABASE_URL is PostgreSQL.
+        self.REALTIME_BACKEND: str = os.getenv("REALTIME_BACKEND", "").strip().lower()
+        self.REALTIME_HEARTBEAT_SECONDS: int = int(
+            os.getenv("REALTIME_HEARTBEAT_SECONDS", "15")
+        )
 
 
 @lru_cache()
@@ -1,12 +1,12 @@
 import os
+from collections import defaultdict
 from datetime import datetime, timedelta, date, time
 import logging
 from decimal import Decimal, ROUND_HALF_UP
 from typing import Optional, List
-from sqlalchemy import func, cast, String, case, select, or_, desc, update
+from sqlalchemy import func, cast, String, case, select, or_, and_, desc, update
 from sqlalchemy.orm import Session, aliased, joinedload
 from sqlalchemy.exc import IntegrityError
-from passlib.context import CryptContext
 from twilio.rest import Client
 import hashlib
 import json
@@ -16,8 +16,24 @@ from dotenv import load_dotenv, find_dotenv
 from app.utils.passwords import validate_password
 from app.utils.time import now_guyana, today_start_guyana, today_end_guyana
 from app.utils.duration import derive_booking_end, format_duration_human
+from app.utils.pagination import decode_keyset_cursor, encode_keyset_cursor
+from app.utils.geo import (
+    bounding_box,
+    covering_geohash_prefixes,
+    geohash_precision_for_zoom,
+    haversine_km,
+)
 from app.utils.email import send_monthly_statement_email
-from app.services.push_notifications import send_push_to_user
+from app.services import password_hasher
+from app.services.booking_reminders import schedule_booking_reminders
+from app.services.cloudinary_service import destroy_stored_image
+from app.services.push_queue import enqueue_push
+from app.services.realtime import publish_after_commit
+from app.services.provider_search import (
+    refresh_provider_search_document,
+    refresh_search_document_for_user,
+    search_provider_ids,
+)
 
 load_dotenv(find_dotenv(), override=False)
 
@@ -28,7 +44,6 @@ logger = logging.getLogger(__name__)
 # Password hashing
 # ---------------------------------------------------------------------------
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 
 
 DEFAULT_SERVICE_CHARGE_PERCENTAGE = Decimal("10.0")
@@ -43,6 +58,10 @@ LOCKED_PROVIDER_MESSAGE = (
     "Provider account is locked and cannot accept or confirm new appointments."
 )
 BOOKING_TIME_BLOCKING_STATUSES = ("pending", "confirmed", "in_progress")
+DEFAULT_NEAR_RADIUS_KM = 10.0
+MAX_NEAR_RADIUS_KM = 200.0
+ADMIN_MAP_INDIVIDUAL_ZOOM = 15
+ADMIN_MAP_MAX_PROVIDERS = 500
 
 
 def booking_time_bucket(start_time: datetime, end_time: datetime, now: datetime | None = None) -> str:
@@ -84,12 +103,12 @@ def validate_coordinates(lat: Optional[float], long: Optional[float]) -> None:
 
 def hash_password(password: str) -> str:
     """Return a secure hash for the given plaintext password."""
-    return pwd_context.hash(password)
+    return password_hasher.hash_password(password)
 
 
 def verify_password(plain: str, hashed: str) -> bool:
     """Verify that a plaintext password matches a stored hash."""
-    return pwd_context.verify(plain, hashed)
+    return password_hasher.verify_and_update(plain, hashed)[0]
 
 
 # ---------------------------------------------------------------------------
@@ -237,6 +256,7 @@ def create_provider_for_user(db: Session, user: models.User):
     db.add(provider)
     db.flush()
     _assign_intro_promo_fields(db, provider)
+    refresh_provider_search_document(db, provider.id)
     db.commit()
     db.refresh(provider)
     return provider
@@ -344,10 +364,17 @@ def get_booking_rating_for_user(db: Session, booking_id: int, user: models.User)
         .first()
     )
 
-def list_providers(db: Session, profession: Optional[str] = None):
+def list_providers(
+    db: Session,
+    profession: Optional[str] = None,
+    near: Optional[tuple] = None,
+    radius_km: Optional[float] = None,
+):
     """
     Public list of providers for the client search screen.
     Optionally filter by profession name (case-insensitive).
+    When `near` (lat, long) is given, only providers within `radius_km`
+    are returned, nearest first, each with a `distance_km`.
     Returns a list of ProviderListItem structures.
     """
     # Base query joining providers → users
@@ -371,36 +398,120 @@ def list_providers(db: Session, profession: Optional[str] = None):
             .filter(models.ProviderProfession.name.ilike(f"%{profession}%"))
         )
 
-    providers = q.all()
+    if near is None:
+        return _provider_list_items(db, q.all())
 
-    results = []
-    for provider in providers:
+    lat, long = near
+    radius_km = float(radius_km if radius_km is not None else DEFAULT_NEAR_RADIUS_KM)
+    min_lat, min_long, max_lat, max_long = bounding_box(lat, long, radius_km)
+    prefixes = covering_geohash_prefixes(min_lat, min_long, max_lat, max_long)
+
+    # Coarse prefilter on the indexed geohash prefix, then the bounding box,
+    # then exact haversine distance in Python.
+    q = q.filter(
+        models.User.lat.between(min_lat, max_lat),
+        models.User.long.between(min_long, max_long),
+    )
+    if prefixes != [""]:
+        q = q.filter(
+            or_(*[models.User.geohash.like(f"{prefix}%") for prefix in prefixes])
+        )
+
+    ranked = []
+    for provider in q.all():
         user = provider.user
-        professions = get_professions_for_provider(db, provider.id)
-        services = [svc.name for svc in list_services_for_provider(db, provider.id)]
+        distance = haversine_km(lat, long, user.lat, user.long)
+        if distance <= radius_km:
+            ranked.append((distance, provider.id, provider))
+    ranked.sort(key=lambda row: (row[0], row[1]))
+
+    items = _provider_list_items(db, [provider for _, _, provider in ranked])
+    for (distance, _, _), item in zip(ranked, items):
+        item["distance_km"] = round(distance, 3)
+    return items
+
+
+def _provider_list_items(db: Session, providers: List[models.Provider]) -> List[dict]:
+    """ProviderListItem dicts for `providers`, loading professions and
+    active service names for all of them in one query each."""
+    provider_ids = [provider.id for provider in providers]
+    professions: dict = defaultdict(list)
+    services: dict = defaultdict(list)
+    if provider_ids:
+        for provider_id, name in (
+            db.query(models.ProviderProfession.provider_id, models.ProviderProfession.name)
+            .filter(models.ProviderProfession.provider_id.in_(provider_ids))
+            .order_by(models.ProviderProfession.id.asc())
+        ):
+            professions[provider_id].append(name)
+        for provider_id, name in (
+            db.query(models.Service.provider_id, models.Service.name)
+            .filter(
+                models.Service.provider_id.in_(provider_ids),
+                models.Service.is_active.is_(True),
+            )
+            .order_by(models.Service.id.asc())
+        ):
+            services[provider_id].append(name)
+    return [
+        _provider_list_item(provider, professions[provider.id], services[provider.id])
+        for provider in providers
+    ]
 
-        results.append(
-            {
-                "provider_id": provider.id,
-                "user_id": user.id,
-                "name": get_display_name(user),
-                "location": user.location or "",
-                "lat": user.lat,
-                "long": user.long,
-                "user": {
-                    "lat": user.lat,
-                    "long": user.long,
-                },
-                "bio": provider.bio or "",
-                "professions": professions,
-                "services": services,
-                "avatar_url": provider.avatar_url,
-                "avg_rating": provider.avg_rating,
-                "rating_count": int(provider.rating_count or 0),
-                "is_suspended": bool(getattr(user, "is_suspended", False)),
-            }
+
+def _provider_list_item(
+    provider: models.Provider, professions: List[str], services: List[str]
+) -> dict:
+    user = provider.user
+
+    return {
+        "provider_id": provider.id,
+        "user_id": user.id,
+        "name": get_display_name(user),
+        "location": user.location or "",
+        "lat": user.lat,
+        "long": user.long,
+        "user": {
+            "lat": user.lat,
+            "long": user.long,
+        },
+        "bio": provider.bio or "",
+        "professions": professions,
+        "services": services,
+        "avatar_url": provider.avatar_url,
+        "avatar_thumbnail_url": provider.avatar_thumbnail_url,
+        "avg_rating": provider.avg_rating,
+        "rating_count": int(provider.rating_count or 0),
+        "is_suspended": bool(getattr(user, "is_suspended", False)),
+    }
+
+
+def search_providers(db: Session, query: str, limit: int = 20):
+    """
+    Ranked, typo-tolerant provider search over name, username, professions,
+    service names, bio and location.
+    """
+    ranked = search_provider_ids(db, query, limit=limit)
+    if not ranked:
+        return []
+
+    providers = (
+        db.query(models.Provider)
+        .join(models.User, models.Provider.user_id == models.User.id)
+        .filter(
+            models.Provider.id.in_([provider_id for provider_id, _ in ranked]),
+            models.User.is_deleted.is_(False),
+            models.User.deleted_at.is_(None),
         )
+        .options(joinedload(models.Provider.user))
+        .all()
+    )
+    by_id = {provider.id: provider for provider in providers}
 
+    found = [(by_id[provider_id], score) for provider_id, score in ranked if provider_id in by_id]
+    results = _provider_list_items(db, [provider for provider, _ in found])
+    for (_, score), item in zip(found, results):
+        item["score"] = round(score, 4)
     return results
 
 
@@ -411,22 +522,86 @@ def list_admin_provider_locations(db: Session):
         .all()
     )
 
-    results = []
-    for provider, user in rows:
-        results.append(
-            {
-                "provider_id": provider.id,
-                "username": user.username,
-                "email": user.email,
-                "phone": user.phone,
-                "lat": user.lat,
-                "long": user.long,
-                "account_number": provider.account_number,
-                "location": user.location or "",
-            }
-        )
+    return [_admin_provider_location_item(provider, user) for provider, user in rows]
+
+
+def _admin_provider_location_item(provider: models.Provider, user: models.User) -> dict:
+    return {
+        "provider_id": provider.id,
+        "username": user.username,
+        "email": user.email,
+        "phone": user.phone,
+        "lat": user.lat,
+        "long": user.long,
+        "account_number": provider.account_number,
+        "location": user.location or "",
+    }
 
-    return results
+
+def get_admin_provider_map(
+    db: Session,
+    *,
+    min_lat: float,
+    min_long: float,
+    max_lat: float,
+    max_long: float,
+    zoom: int,
+):
+    """
+    Viewport query for the admin provider map. Below ADMIN_MAP_INDIVIDUAL_ZOOM
+    providers are grouped by geohash prefix and only counts and centroids are
+    returned; when zoomed in, the individual providers in view are returned.
+    """
+    if min_lat > max_lat or min_long > max_long:
+        raise ValueError("Invalid bounding box")
+
+    precision = geohash_precision_for_zoom(zoom)
+    prefixes = covering_geohash_prefixes(min_lat, min_long, max_lat, max_long)
+    in_view = [
+        models.User.geohash.isnot(None),
+        models.User.lat.between(min_lat, max_lat),
+        models.User.long.between(min_long, max_long),
+    ]
+    if prefixes != [""]:
+        in_view.append(or_(*[models.User.geohash.like(f"{prefix}%") for prefix in prefixes]))
+
+    result = {"zoom": zoom, "precision": precision, "clusters": [], "providers": [], "truncated": False}
+
+    if zoom >= ADMIN_MAP_INDIVIDUAL_ZOOM:
+        rows = (
+            db.query(models.Provider, models.User)
+            .join(models.User, models.Provider.user_id == models.User.id)
+            .filter(*in_view)
+            .order_by(models.Provider.id.asc())
+            .limit(ADMIN_MAP_MAX_PROVIDERS + 1)
+            .all()
+        )
+        result["truncated"] = len(rows) > ADMIN_MAP_MAX_PROVIDERS
+        result["providers"] = [
+            _admin_provider_location_item(provider, user)
+            for provider, user in rows[:ADMIN_MAP_MAX_PROVIDERS]
+        ]
+        return result
+
+    cell = func.substr(models.User.geohash, 1, precision).label("cell")
+    rows = (
+        db.query(
+            cell,
+            func.count(models.Provider.id),
+            func.avg(models.User.lat),
+            func.avg(models.User.long),
+        )
+        .join(models.User, models.Provider.user_id == models.User.id)
+        .filter(*in_view)
+        .group_by(cell)
+        .order_by(cell)
+        .all()
+    )
+    result["clusters"] = [
+        {"geohash": geohash, "count": int(count), "lat": float(lat), "long": float(long)}
+        for geohash, count, lat, long in rows
+    ]
+    return result
 
 
 def list_admin_cancellation_stats(
@@ -549,6 +724,8 @@ def create_service_for_provider(db: Session, provider_id: int, service_in: schem
         duration_minutes=service_in.duration_minutes,
     )
     db.add(svc)
+    db.flush()
+    refresh_provider_search_document(db, provider_id)
     db.commit()
     db.refresh(svc)
     return svc
@@ -570,6 +747,8 @@ def update_service(
         if field_name in updates:
             setattr(svc, field_name, updates[field_name])
 
+    db.flush()
+    refresh_provider_search_document(db, provider_id)
     db.commit()
     db.refresh(svc)
     return svc
@@ -600,6 +779,8 @@ def delete_service_for_provider(
     if not svc.is_active:
         return "already_archived"
     svc.is_active = False
+    db.flush()
+    refresh_provider_search_document(db, provider_id)
     db.commit()
     return "archived"
 
@@ -748,12 +929,13 @@ def notify_booking_created(
     service: models.Service,
     booking: models.Booking,
 ) -> None:
-    """Send all notifications for a newly confirmed booking.
+    """Send the WhatsApp notifications for a newly confirmed booking.
 
     - WhatsApp to customer (if configured)
     - WhatsApp to provider (if configured)
-    - Push to customer (if configured)
-    - Push to provider (if configured)
+
+    The provider's push is queued with the booking itself; see
+    _enqueue_booking_created_push.
     """
     if not (customer and provider_user):
         return
@@ -785,14 +967,24 @@ def notify_booking_created(
     )
 
 
-    # Push notifications (one each)
-    send_push_to_user(
+def _enqueue_booking_created_push(
+    db: Session,
+    customer: Optional[models.User],
+    provider_user: Optional[models.User],
+    service: models.Service,
+    booking: models.Booking,
+) -> None:
+    """Queue the provider's "new appointment" push in the booking's transaction."""
+    if not (customer and provider_user):
+        return
+    enqueue_push(
         db,
         user_id=provider_user.id,
         title="New appointment",
         body=f"{get_display_name(customer)} booked {service.name} on "
         f"{booking.start_time.strftime('%d %b %Y at %I:%M %p')}",
         data={"type": "appointment_created", "bookingId": booking.id, "targetScreen": "Appointments"},
+        dedupe_key=f"booking:{booking.id}:created",
     )
 
 
@@ -966,11 +1158,32 @@ def _get_booking_chat_read_only_message(booking: models.Booking) -> str:
     return "Messaging is unavailable because this appointment is no longer active."
 
 
+# Built once: per-call aliases defeat the compiled-SQL cache on hot chat and
+# booking-list paths.
+_chat_client_user = aliased(models.User, name="chat_client_user")
+_chat_provider_user = aliased(models.User, name="chat_provider_user")
+_inbox_counterpart = aliased(models.User, name="inbox_counterpart")
+_inbox_last_message = aliased(models.Message, name="inbox_last_message")
+_customer_booking_provider_user = aliased(models.User, name="customer_booking_provider_user")
+
+
 def _get_booking_with_participants(db: Session, booking_id: int):
+    client_user = _chat_client_user
+    provider_user = _chat_provider_user
     return (
-        db.query(models.Booking, models.Service.provider_id, models.Provider.user_id)
+        db.query(
+            models.Booking,
+            models.Service.provider_id,
+            models.Provider.user_id,
+            client_user,
+            provider_user,
+            models.Conversation,
+        )
         .join(models.Service, models.Booking.service_id == models.Service.id)
         .join(models.Provider, models.Service.provider_id == models.Provider.id)
+        .outerjoin(client_user, client_user.id == models.Booking.customer_id)
+        .outerjoin(provider_user, provider_user.id == models.Provider.user_id)
+        .outerjoin(models.Conversation, models.Conversation.booking_id == models.Booking.id)
         .filter(models.Booking.id == booking_id)
         .first()
     )
@@ -982,11 +1195,15 @@ def get_booking_chat_context(
     booking_id: int,
     user_id: int,
 ):
+    """
+    Load a booking chat's booking, both participant users and its
+    conversation (if any) in one query, and check `user_id` may access it.
+    """
     booking_row = _get_booking_with_participants(db, booking_id)
     if not booking_row:
         return None
 
-    booking, _provider_id, provider_user_id = booking_row
+    booking, _provider_id, provider_user_id, client_user, provider_user, conversation = booking_row
     client_user_id = booking.customer_id
 
     if user_id not in {client_user_id, provider_user_id}:
@@ -996,6 +1213,9 @@ def get_booking_chat_context(
         "booking": booking,
         "client_user_id": client_user_id,
         "provider_user_id": provider_user_id,
+        "client_user": client_user,
+        "provider_user": provider_user,
+        "conversation": conversation,
         "sender_role": "client" if user_id == client_user_id else "provider",
     }
 
@@ -1038,7 +1258,6 @@ def _get_or_create_conversation(
 
 
 def send_booking_message(
-        
     db: Session,
     *,
     booking_id: int,
@@ -1046,8 +1265,11 @@ def send_booking_message(
     text: Optional[str],
     attachment: Optional[schemas.MessageAttachmentPayload],
 ):
-    logger.warning("BOOKING MESSAGE PATCH LIVE")
-    
+    """
+    Write a chat message, its attachment, the recipient's notification and
+    the conversation inbox counters in a single transaction. The push to the
+    recipient is queued in the same transaction (see services.push_queue).
+    """
     context = get_booking_chat_context(db, booking_id=booking_id, user_id=sender_user_id)
     if not context:
         return None
@@ -1056,7 +1278,7 @@ def send_booking_message(
     if not _is_booking_chat_send_allowed(booking):
         raise ValueError(_get_booking_chat_read_only_message(booking))
 
-    conversation = _get_or_create_conversation(
+    conversation = context["conversation"] or _get_or_create_conversation(
         db,
         booking_id=booking.id,
         client_user_id=context["client_user_id"],
@@ -1074,66 +1296,82 @@ def send_booking_message(
         text=normalized_text,
         message_type=message_type,
     )
-    db.add(message)
-    db.flush()
-
+    message.conversation = conversation
     if attachment:
-        message_attachment = models.MessageAttachment(
-            message_id=message.id,
+        message.attachment = models.MessageAttachment(
             attachment_type="image",
             file_url=attachment.file_url,
             thumbnail_url=attachment.thumbnail_url,
+            medium_url=attachment.medium_url,
             original_filename=attachment.original_filename,
             mime_type=attachment.mime_type,
             file_size_bytes=attachment.file_size_bytes,
             width=attachment.width,
             height=attachment.height,
         )
-        db.add(message_attachment)
-
-    db.commit()
-    db.refresh(message)
+    else:
+        message.attachment = None
+    db.add(message)
+    db.flush()
 
-    recipient_id = (
-        context["provider_user_id"]
-        if sender_user_id == context["client_user_id"]
-        else context["client_user_id"]
+    sender_is_client = sender_user_id == context["client_user_id"]
+    unread_column = (
+        models.Conversation.provider_unread_count
+        if sender_is_client
+        else models.Conversation.client_unread_count
     )
-    recipient = get_user_by_id(db, recipient_id)
-    sender = get_user_by_id(db, sender_user_id)
-
-    logger.warning(
-        "BOOKING MESSAGE RECIPIENT DEBUG booking_id=%s sender_user_id=%s recipient_id=%s recipient_found=%s sender_found=%s context=%s",
-        booking.id,
-        sender_user_id,
-        recipient_id,
-        bool(recipient),
-        bool(sender),
-        context,
+    db.query(models.Conversation).filter(
+        models.Conversation.id == conversation.id
+    ).update(
+        {
+            models.Conversation.last_message_id: message.id,
+            models.Conversation.last_message_at: message.created_at,
+            unread_column: unread_column + 1,
+        },
+        synchronize_session=False,
     )
 
+    event_data = {
+        "booking_id": booking.id,
+        "conversation_id": conversation.id,
+        "message": {
+            "id": message.id,
+            "sender_user_id": sender_user_id,
+            "sender_role": context["sender_role"],
+            "text": normalized_text,
+            "created_at": message.created_at.isoformat() if message.created_at else None,
+            "attachment": (
+                {
+                    "file_url": attachment.file_url,
+                    "thumbnail_url": attachment.thumbnail_url,
+                    "medium_url": attachment.medium_url,
+                    "width": attachment.width,
+                    "height": attachment.height,
+                }
+                if attachment
+                else None
+            ),
+        },
+    }
+    for participant_id in {context["client_user_id"], context["provider_user_id"]}:
+        publish_after_commit(db, participant_id, "chat_message", event_data)
+
+    sender = context["client_user"] if sender_is_client else context["provider_user"]
+    recipient = context["provider_user"] if sender_is_client else context["client_user"]
+    body_text = (normalized_text or "Sent an image")[:80]
     if recipient:
-        preview_text = "Sent an image" if not normalized_text else normalized_text
-        body_text = preview_text[:80]
-        notification = models.Notification(
+        create_notification(
+            db,
             user_id=recipient.id,
             type="message",
             title=f"New message from {get_display_name(sender)}",
             body=body_text,
             conversation_id=conversation.id,
             message_id=message.id,
-            is_read=False,
         )
-        db.add(notification)
-        db.commit()
 
-        logger.warning(
-            "Dispatching booking message push booking_id=%s sender_user_id=%s recipient_user_id=%s",
-            booking.id,
-            sender_user_id,
-            recipient.id,
-        )
-        send_push_to_user(
+    if recipient:
+        enqueue_push(
             db,
             user_id=recipient.id,
             title="New message",
@@ -1145,31 +1383,23 @@ def send_booking_message(
                 "messageId": message.id,
                 "targetScreen": "Appointments",
             },
+            dedupe_key=f"message:{message.id}",
         )
     else:
-        logger.warning(
-            "BOOKING MESSAGE PUSH SKIPPED booking_id=%s sender_user_id=%s recipient_id=%s recipient_missing",
+        logger.info(
+            "Booking message push skipped booking_id=%s sender_user_id=%s: recipient missing",
             booking.id,
             sender_user_id,
-            recipient_id,
         )
 
+    db.commit()
     return message
 
 
-def list_booking_messages(
-    db: Session,
-    *,
-    booking_id: int,
-    user_id: int,
-):
-    context = get_booking_chat_context(db, booking_id=booking_id, user_id=user_id)
-    if not context:
-        return None
-
-    provider_user = get_user_by_id(db, context["provider_user_id"])
-    client_user = get_user_by_id(db, context["client_user_id"])
-    participants = {
+def _booking_chat_participants(context: dict) -> dict:
+    provider_user = context["provider_user"]
+    client_user = context["client_user"]
+    return {
         "provider": {
             "username": provider_user.username if provider_user else "Provider",
             "avatar_url": provider_user.avatar_url if provider_user else None,
@@ -1180,26 +1410,89 @@ def list_booking_messages(
         },
     }
 
-    conversation = (
-        db.query(models.Conversation)
-        .filter(models.Conversation.booking_id == booking_id)
-        .first()
+
+def _message_cursor_filter(cursor_id: int, *, newer: bool):
+    """
+    Keyset condition on (created_at, id) relative to the message `cursor_id`,
+    so pages line up with ix_messages_conversation_created_id.
+    """
+    cursor_created_at = (
+        select(models.Message.created_at)
+        .where(models.Message.id == cursor_id)
+        .scalar_subquery()
     )
-    if not conversation:
+    if newer:
+        return or_(
+            models.Message.created_at > cursor_created_at,
+            and_(
+                models.Message.created_at == cursor_created_at,
+                models.Message.id > cursor_id,
+            ),
+        )
+    return or_(
+        models.Message.created_at < cursor_created_at,
+        and_(
+            models.Message.created_at == cursor_created_at,
+            models.Message.id < cursor_id,
+        ),
+    )
+
+
+def list_booking_messages(
+    db: Session,
+    *,
+    booking_id: int,
+    user_id: int,
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    limit: int = 50,
+):
+    """
+    One page of a booking chat, oldest first.
+
+    Without a cursor the most recent `limit` messages are returned.
+    `before_id` pages backwards through history and `after_id` returns only
+    messages newer than the client's last seen one (for polling).
+    `has_more` reports whether another page exists in the requested direction.
+    """
+    if before_id is not None and after_id is not None:
+        raise ValueError("Use either before_id or after_id, not both.")
+
+    context = get_booking_chat_context(db, booking_id=booking_id, user_id=user_id)
+    if not context:
+        return None
+
+    participants = _booking_chat_participants(context)
+
+    conversation_id = context["conversation"].id if context["conversation"] else None
+    if not conversation_id:
         return {
             "booking_id": booking_id,
             "conversation_id": None,
             **participants,
             "messages": [],
+            "has_more": False,
         }
 
-    rows = (
+    q = (
         db.query(models.Message)
         .options(joinedload(models.Message.attachment))
-        .filter(models.Message.conversation_id == conversation.id)
-        .order_by(models.Message.created_at.asc(), models.Message.id.asc())
-        .all()
+        .filter(models.Message.conversation_id == conversation_id)
     )
+    if after_id is not None:
+        q = q.filter(_message_cursor_filter(after_id, newer=True)).order_by(
+            models.Message.created_at.asc(), models.Message.id.asc()
+        )
+    else:
+        if before_id is not None:
+            q = q.filter(_message_cursor_filter(before_id, newer=False))
+        q = q.order_by(models.Message.created_at.desc(), models.Message.id.desc())
+
+    rows = q.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if after_id is None:
+        rows.reverse()
 
     messages = []
     for row in rows:
@@ -1218,12 +1511,113 @@ def list_booking_messages(
 
     return {
         "booking_id": booking_id,
-        "conversation_id": conversation.id,
+        "conversation_id": conversation_id,
         **participants,
         "messages": messages,
+        "has_more": has_more,
     }
 
 
+def list_conversations_for_user(
+    db: Session,
+    *,
+    user_id: int,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+):
+    """
+    Inbox of the user's booking chats, most recent activity first, in a
+    single query over the denormalized Conversation inbox columns.
+    `cursor` is the `next_cursor` from the previous page.
+    """
+    is_client = models.Conversation.client_user_id == user_id
+    counterpart = _inbox_counterpart
+    last_message = _inbox_last_message
+
+    q = (
+        db.query(
+            models.Conversation,
+            last_message,
+            counterpart,
+            case(
+                (is_client, models.Conversation.client_unread_count),
+                else_=models.Conversation.provider_unread_count,
+            ).label("unread_count"),
+        )
+        .outerjoin(last_message, last_message.id == models.Conversation.last_message_id)
+        .outerjoin(
+            counterpart,
+            counterpart.id
+            == case(
+                (is_client, models.Conversation.provider_user_id),
+                else_=models.Conversation.client_user_id,
+            ),
+        )
+        .filter(
+            or_(is_client, models.Conversation.provider_user_id == user_id),
+            models.Conversation.last_message_at.isnot(None),
+        )
+    )
+
+    if cursor:
+        cursor_at, cursor_id = decode_keyset_cursor(cursor)
+        q = q.filter(
+            or_(
+                models.Conversation.last_message_at < cursor_at,
+                and_(
+                    models.Conversation.last_message_at == cursor_at,
+                    models.Conversation.id < cursor_id,
+                ),
+            )
+        )
+
+    rows = (
+        q.order_by(
+            models.Conversation.last_message_at.desc(),
+            models.Conversation.id.desc(),
+        )
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    conversations = []
+    for conversation, message, other_user, unread_count in rows:
+        conversations.append(
+            {
+                "conversation_id": conversation.id,
+                "booking_id": conversation.booking_id,
+                "role": "client" if conversation.client_user_id == user_id else "provider",
+                "counterpart": {
+                    "user_id": other_user.id if other_user else None,
+                    "username": get_display_name(other_user),
+                    "avatar_url": other_user.avatar_url if other_user else None,
+                },
+                "last_message": (
+                    {
+                        "id": message.id,
+                        "sender_user_id": message.sender_user_id,
+                        "text": message.text,
+                        "message_type": message.message_type,
+                        "created_at": message.created_at,
+                    }
+                    if message
+                    else None
+                ),
+                "last_message_at": conversation.last_message_at,
+                "unread_count": int(unread_count or 0),
+            }
+        )
+
+    next_cursor = None
+    if has_more and rows:
+        tail = rows[-1][0]
+        next_cursor = encode_keyset_cursor(tail.last_message_at, tail.id)
+
+    return {"conversations": conversations, "next_cursor": next_cursor}
+
+
 def mark_booking_messages_read(
     db: Session,
     *,
@@ -1234,11 +1628,7 @@ def mark_booking_messages_read(
     if not context:
         return None
 
-    conversation = (
-        db.query(models.Conversation)
-        .filter(models.Conversation.booking_id == booking_id)
-        .first()
-    )
+    conversation = context["conversation"]
     if not conversation:
         return 0
 
@@ -1252,6 +1642,25 @@ def mark_booking_messages_read(
         )
         .update({models.Message.read_at: now}, synchronize_session=False)
     )
+    if updated_count:
+        unread_column = (
+            models.Conversation.client_unread_count
+            if user_id == context["client_user_id"]
+            else models.Conversation.provider_unread_count
+        )
+        # Decrement by what was flipped rather than zeroing, so a message
+        # sent concurrently keeps its increment.
+        db.query(models.Conversation).filter(
+            models.Conversation.id == conversation.id
+        ).update(
+            {
+                unread_column: case(
+                    (unread_column > updated_count, unread_column - updated_count),
+                    else_=0,
+                )
+            },
+            synchronize_session=False,
+        )
     db.commit()
     return int(updated_count or 0)
 def create_user_for_oauth(
@@ -1372,9 +1781,15 @@ def authenticate_user(db: Session, email: str, password: str):
     if user_is_deleted(user):
         return None
 
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = password_hasher.verify_and_update(password, user.hashed_password)
+    if not verified:
         return None
 
+    if new_hash:
+        # Stored with an older work factor; upgrade while we have the password.
+        user.hashed_password = new_hash
+        db.commit()
+
     return user
 
 
@@ -1420,6 +1835,7 @@ def delete_user_account(
             user.lat = None
             user.long = None
             user.avatar_url = None
+            user.avatar_thumbnail_url = None
             user.is_email_verified = False
             user.email_verified_at = None
             user.password_reset_at = None
@@ -1429,6 +1845,7 @@ def delete_user_account(
                 provider.is_locked = True
                 provider.bio = None
                 provider.avatar_url = None
+                provider.avatar_thumbnail_url = None
                 db.query(models.Service).filter(
                     models.Service.provider_id == provider.id
                 ).update(
@@ -1478,6 +1895,10 @@ def update_user(
         "avatar_url",
     }
 
+    if "avatar_url" in update_data and update_data["avatar_url"] != user.avatar_url:
+        # A directly supplied URL has no generated thumbnail.
+        user.avatar_thumbnail_url = None
+
     for field, value in update_data.items():
         if field in ALLOWED_USER_FIELDS:
             setattr(user, field, value)
@@ -1487,6 +1908,10 @@ def update_user(
     elif "full_name" in update_data:
         set_username_from_full_name(db, user, update_data.get("full_name"))
 
+    if user.is_provider:
+        db.flush()
+        refresh_search_document_for_user(db, user.id)
+
     db.commit()
     db.refresh(user)
     return user
@@ -1622,20 +2047,107 @@ def revoke_refresh_token(
 
 
 def revoke_user_refresh_tokens(db: Session, user_id: int) -> int:
-    now = now_guyana()
-    tokens = (
-        db.query(models.RefreshToken)
-        .filter(
+    result = db.execute(
+        update(models.RefreshToken)
+        .where(
             models.RefreshToken.user_id == user_id,
             models.RefreshToken.revoked_at.is_(None),
         )
-        .all()
+        .values(revoked_at=now_guyana())
+        .execution_options(synchronize_session=False)
     )
-    for token in tokens:
-        token.revoked_at = now
-    if tokens:
+    revoked = result.rowcount or 0
+    if revoked:
+        db.commit()
+    return revoked
+
+
+def rotate_refresh_token(
+    db: Session,
+    token: models.RefreshToken,
+    new_token_hash: str,
+) -> Optional[int]:
+    """
+    Replace `token` with a new refresh token for the same user: insert the
+    new row and revoke the old one (pointing it at its replacement) in a
+    single statement on PostgreSQL. Returns the new token id, or None if
+    `token` was revoked in the meantime, e.g. by a concurrent refresh.
+    """
+    table = models.RefreshToken.__table__
+    now = now_guyana()
+    insert_new = table.insert().values(
+        user_id=token.user_id,
+        token_hash=new_token_hash,
+        created_at=now,
+        last_used_at=now,
+    )
+    revoke_old = (
+        update(table)
+        .where(table.c.id == token.id, table.c.revoked_at.is_(None))
+        .returning(table.c.replaced_by_token_id)
+    )
+
+    if db.get_bind().dialect.name == "postgresql":
+        inserted = insert_new.returning(table.c.id).cte("inserted")
+        new_id = db.execute(
+            revoke_old.values(
+                revoked_at=now,
+                replaced_by_token_id=select(inserted.c.id).scalar_subquery(),
+            )
+        ).scalar()
+    else:
+        inserted_id = db.execute(insert_new.returning(table.c.id)).scalar()
+        new_id = db.execute(
+            revoke_old.values(revoked_at=now, replaced_by_token_id=inserted_id)
+        ).scalar()
+
+    if new_id is None:
+        # Lost the race: don't keep the token we just inserted.
+        db.rollback()
+        return None
+    db.commit()
+    return new_id
+
+
+def prune_refresh_tokens(
+    db: Session,
+    *,
+    inactivity_days: int,
+    batch_size: int = 5000,
+) -> int:
+    """
+    Delete tokens revoked, or unused, for longer than `inactivity_days`.
+    Neither can be used again; /auth/refresh already rejects them.
+    """
+    cutoff = now_guyana() - timedelta(days=inactivity_days)
+    expired = or_(
+        models.RefreshToken.revoked_at < cutoff,
+        and_(
+            models.RefreshToken.revoked_at.is_(None),
+            models.RefreshToken.last_used_at < cutoff,
+        ),
+    )
+    pruned = 0
+    while True:
+        # Oldest first: a token is always revoked (and so expires) no later
+        # than the replacement its replaced_by_token_id points at, so it is
+        # deleted in the same or an earlier batch and the FK never dangles.
+        ids = [
+            token_id
+            for (token_id,) in db.query(models.RefreshToken.id)
+            .filter(expired)
+            .order_by(models.RefreshToken.id)
+            .limit(batch_size)
+            .all()
+        ]
+        if not ids:
+            return pruned
+        pruned += (
+            db.query(models.RefreshToken)
+            .filter(models.RefreshToken.id.in_(ids))
+            .delete(synchronize_session=False)
+        )
         db.commit()
-    return len(tokens)
 
 # ---------------------------------------------------------------------------
 # Promotion CRUD
@@ -1830,8 +2342,8 @@ def create_booking(
     )
 
     db.add(new_booking)
-    db.commit()
-    db.refresh(new_booking)
+    db.flush()
+    schedule_booking_reminders(db, new_booking, now=now)
 
     # Load customer
     customer = (
@@ -1840,7 +2352,11 @@ def create_booking(
         .first()
     )
 
-    # Dispatch all notifications in one place
+    _enqueue_booking_created_push(db, customer, provider_user, service, new_booking)
+    db.commit()
+    db.refresh(new_booking)
+
+    # WhatsApp goes out only once the booking is committed
     notify_booking_created(db, customer, provider_user, service, new_booking)
 
     return new_booking
@@ -3179,49 +3695,52 @@ def list_bookings_for_customer(db: Session, customer_id: int):
     _auto_complete_finished_bookings(db, as_of=now)
 
     rows = (
-        db.query(models.Booking, models.Service)
+        db.query(models.Booking, models.Service, _customer_booking_provider_user)
         .join(models.Service, models.Booking.service_id == models.Service.id)
+        .outerjoin(models.Provider, models.Provider.id == models.Service.provider_id)
+        .outerjoin(
+            _customer_booking_provider_user,
+            _customer_booking_provider_user.id == models.Provider.user_id,
+        )
         .filter(models.Booking.customer_id == customer_id)
         .order_by(models.Booking.start_time.desc())
         .all()
     )
 
+    # Conversations and ratings for every booking in one query each.
+    booking_ids = [booking.id for booking, _, _ in rows]
+    conversation_ids = {}
+    ratings = {}
+    if booking_ids:
+        for booking_id, conversation_id in (
+            db.query(models.Conversation.booking_id, func.min(models.Conversation.id))
+            .filter(models.Conversation.booking_id.in_(booking_ids))
+            .group_by(models.Conversation.booking_id)
+        ):
+            conversation_ids[booking_id] = conversation_id
+        for rating in (
+            db.query(models.BookingRating)
+            .filter(models.BookingRating.booking_id.in_(booking_ids))
+            .order_by(models.BookingRating.id.asc())
+        ):
+            ratings.setdefault(rating.booking_id, rating)
+
     results: list[schemas.BookingWithDetails] = []
 
-    for booking, service in rows:
+    for booking, service, provider_user in rows:
         provider_name = ""
         provider_location = ""
         provider_lat = None
         provider_long = None
 
-        if service:
-            provider = (
-                db.query(models.Provider)
-                .filter(models.Provider.id == service.provider_id)
-                .first()
-            )
-            if provider:
-                provider_user = (
-                    db.query(models.User)
-                    .filter(models.User.id == provider.user_id)
-                    .first()
-                )
-                if provider_user:
-                    provider_name = get_display_name(provider_user)
-                    provider_location = provider_user.location or ""
-                    provider_lat = provider_user.lat
-                    provider_long = provider_user.long
+        if provider_user:
+            provider_name = get_display_name(provider_user)
+            provider_location = provider_user.location or ""
+            provider_lat = provider_user.lat
+            provider_long = provider_user.long
 
-        conversation = (
-            db.query(models.Conversation)
-            .filter(models.Conversation.booking_id == booking.id)
-            .first()
-        )
-        rating = (
-            db.query(models.BookingRating)
-            .filter(models.BookingRating.booking_id == booking.id)
-            .first()
-        )
+        conversation_id = conversation_ids.get(booking.id)
+        rating = ratings.get(booking.id)
         has_rating = rating is not None
 
         results.append(
@@ -3247,7 +3766,7 @@ def list_bookings_for_customer(db: Session, customer_id: int):
                 provider_location=provider_location,
                 provider_lat=provider_lat,
                 provider_long=provider_long,
-                conversation_id=conversation.id if conversation else None,
+                conversation_id=conversation_id,
                 can_rate=(
                     normalized_booking_status_value(booking.status) == "completed"
                     and service is not None
@@ -3298,6 +3817,7 @@ def confirm_booking_for_provider(
 
     if normalized_status != "confirmed":
         booking.status = "confirmed"
+        schedule_booking_reminders(db, booking)
         db.commit()
         db.refresh(booking)
 
@@ -3336,15 +3856,6 @@ def cancel_booking_for_customer(
     if normalized_status == "cancelled":
         return booking
 
-    booking.status = "cancelled"
-    booking.canceled_at = now_guyana()
-    booking.canceled_by_user_id = customer_id
-    booking.canceled_by_role = "client"
-    db.commit()
-    db.refresh(booking)
-
-    _refresh_bill_for_booking(db, booking)
-
     service = (
         db.query(models.Service)
         .filter(models.Service.id == booking.service_id)
@@ -3370,22 +3881,30 @@ def cancel_booking_for_customer(
         .first()
     )
 
-    if provider_user and service and customer and provider_user.whatsapp:
-        send_whatsapp(
-            provider_user.whatsapp,
-            f"{get_display_name(customer)} cancelled {service.name} on "
-            f"{booking.start_time.strftime('%d %b %Y at %I:%M %p')}",
-        )
-
-
+    booking.status = "cancelled"
+    booking.canceled_at = now_guyana()
+    booking.canceled_by_user_id = customer_id
+    booking.canceled_by_role = "client"
     if provider_user and service and customer:
-        send_push_to_user(
+        enqueue_push(
             db,
             user_id=provider_user.id,
             title="Appointment canceled",
             body=f"{get_display_name(customer)} canceled {service.name} on "
             f"{booking.start_time.strftime('%d %b %Y at %I:%M %p')}",
             data={"type": "appointment_canceled", "bookingId": booking.id, "targetScreen": "Appointments"},
+            dedupe_key=f"booking:{booking.id}:canceled",
+        )
+    db.commit()
+    db.refresh(booking)
+
+    _refresh_bill_for_booking(db, booking)
+
+    if provider_user and service and customer and provider_user.whatsapp:
+        send_whatsapp(
+            provider_user.whatsapp,
+            f"{get_display_name(customer)} cancelled {service.name} on "
+            f"{booking.start_time.strftime('%d %b %Y at %I:%M %p')}",
         )
 
     return booking
@@ -3447,6 +3966,16 @@ def cancel_booking_for_provider(
     booking.canceled_at = now_guyana()
     booking.canceled_by_user_id = provider_user_id
     booking.canceled_by_role = "provider"
+    if customer:
+        enqueue_push(
+            db,
+            user_id=customer.id,
+            title="Appointment canceled",
+            body=f"Your provider canceled {service.name} "
+            f"scheduled for {booking.start_time.strftime('%d %b %Y at %I:%M %p')}",
+            data={"type": "appointment_canceled", "bookingId": booking.id, "targetScreen": "Appointments"},
+            dedupe_key=f"booking:{booking.id}:canceled",
+        )
     db.commit()
     db.refresh(booking)
 
@@ -3460,17 +3989,6 @@ def cancel_booking_for_provider(
             f"{booking.start_time.strftime('%d %b %Y at %I:%M %p')}",
         )
 
-
-    if customer and service:
-        send_push_to_user(
-            db,
-            user_id=customer.id,
-            title="Appointment canceled",
-            body=f"Your provider canceled {service.name} "
-            f"scheduled for {booking.start_time.strftime('%d %b %Y at %I:%M %p')}",
-            data={"type": "appointment_canceled", "bookingId": booking.id, "targetScreen": "Appointments"},
-        )
-
     return True
 
 
@@ -3730,6 +4248,8 @@ def set_professions_for_provider(
     for name in cleaned:
         db.add(models.ProviderProfession(provider_id=provider_id, name=name))
 
+    db.flush()
+    refresh_provider_search_document(db, provider_id)
     db.commit()
 
     rows = (
@@ -3740,6 +4260,145 @@ def set_professions_for_provider(
     )
     return [r.name for r in rows]
 
+def get_stored_image(db: Session, kind: str, content_hash: str) -> Optional[models.StoredImage]:
+    return (
+        db.query(models.StoredImage)
+        .filter(
+            models.StoredImage.kind == kind,
+            models.StoredImage.content_hash == content_hash,
+        )
+        .first()
+    )
+
+
+def reference_stored_image(
+    db: Session,
+    stored: models.StoredImage,
+    *,
+    counted: bool = True,
+) -> Optional[models.StoredImage]:
+    """
+    Take a reference on `stored`. Returns None if its last reference was
+    released (and the remote asset destroyed) since it was looked up, in
+    which case the bytes must be uploaded again. Commits.
+    """
+    still_stored = db.query(models.StoredImage).filter(models.StoredImage.id == stored.id)
+    if counted:
+        referenced = still_stored.update(
+            {models.StoredImage.ref_count: models.StoredImage.ref_count + 1},
+            synchronize_session=False,
+        )
+    else:
+        referenced = still_stored.count()
+    if not referenced:
+        db.expunge(stored)
+        return None
+    db.commit()
+    db.refresh(stored)
+    return stored
+
+
+def acquire_stored_image(
+    db: Session,
+    *,
+    kind: str,
+    content_hash: str,
+    url: str,
+    public_id: Optional[str] = None,
+    thumbnail_url: Optional[str] = None,
+    medium_url: Optional[str] = None,
+    byte_size: Optional[int] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    counted: bool = True,
+) -> models.StoredImage:
+    """
+    Take a reference on the stored image for `content_hash`, registering it
+    if this is the first upload of those bytes. With counted=False (avatars,
+    which are never released) the image is registered but ref_count is left
+    alone. Commits.
+    """
+    existing = get_stored_image(db, kind, content_hash)
+    if existing is not None:
+        referenced = reference_stored_image(db, existing, counted=counted)
+        if referenced is not None:
+            return referenced
+        # Released and deleted since we looked it up; the caller just
+        # uploaded these bytes again, so register them afresh.
+
+    stored = models.StoredImage(
+        kind=kind,
+        content_hash=content_hash,
+        url=url,
+        public_id=public_id,
+        thumbnail_url=thumbnail_url,
+        medium_url=medium_url,
+        byte_size=byte_size,
+        width=width,
+        height=height,
+        ref_count=1 if counted else 0,
+    )
+    db.add(stored)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Same bytes registered concurrently; take a reference on theirs.
+        db.rollback()
+        stored = get_stored_image(db, kind, content_hash)
+        if stored is None:
+            raise
+        if counted:
+            db.query(models.StoredImage).filter(
+                models.StoredImage.id == stored.id
+            ).update(
+                {models.StoredImage.ref_count: models.StoredImage.ref_count + 1},
+                synchronize_session=False,
+            )
+        db.commit()
+    db.refresh(stored)
+    return stored
+
+
+def _release_stored_image(db: Session, stored_image_id: int) -> None:
+    """
+    Drop one reference. On the last one, destroy the remote asset and then
+    delete the row, both before the caller commits. Does not commit.
+
+    The decrement holds the row's write lock until that commit, so an upload
+    of the same bytes that found the row blocks in reference_stored_image,
+    sees it gone and uploads again, instead of pointing at (or re-uploading
+    under the same public_id just ahead of) the asset destroyed here.
+    """
+    released = db.query(models.StoredImage).filter(
+        models.StoredImage.id == stored_image_id
+    ).update(
+        {models.StoredImage.ref_count: models.StoredImage.ref_count - 1},
+        synchronize_session=False,
+    )
+    if not released:
+        return
+
+    stored = db.get(models.StoredImage, stored_image_id, populate_existing=True)
+    if stored is None or stored.ref_count > 0:
+        return
+    _destroy_remote_image(stored)
+    db.delete(stored)
+
+
+def _destroy_remote_image(stored: models.StoredImage) -> None:
+    if not stored.public_id:
+        return
+    variants = [
+        variant
+        for variant, url in (("thumbnail", stored.thumbnail_url), ("medium", stored.medium_url))
+        if url
+    ]
+    try:
+        destroy_stored_image(stored.public_id, variants)
+    except Exception:
+        logger.exception("Failed to delete stored image %s", stored.public_id)
+
+
 def list_catalog_images_for_provider(db: Session, provider_id: int):
     return (
         db.query(models.ProviderCatalogImage)
@@ -3754,10 +4413,16 @@ def add_catalog_image_for_provider(
     provider_id: int,
     image_url: str,
     caption: Optional[str] = None,
+    thumbnail_url: Optional[str] = None,
+    medium_url: Optional[str] = None,
+    stored_image_id: Optional[int] = None,
 ):
     item = models.ProviderCatalogImage(
         provider_id=provider_id,
         image_url=image_url,
+        thumbnail_url=thumbnail_url,
+        medium_url=medium_url,
+        stored_image_id=stored_image_id,
         caption=caption or None,
     )
     db.add(item)
@@ -3782,7 +4447,11 @@ def delete_catalog_image_for_provider(
     if not item:
         return False
 
+    stored_image_id = item.stored_image_id
     db.delete(item)
+    db.flush()
+    if stored_image_id is not None:
+        _release_stored_image(db, stored_image_id)
     db.commit()
     return True
 
@@ -4067,6 +4736,8 @@ def update_provider(
         if hasattr(provider, field):
             setattr(provider, field, value)
 
+    db.flush()
+    refresh_provider_search_document(db, provider.id)
     db.commit()
     db.refresh(provider)
     return provider
@@ -4095,28 +4766,130 @@ def update_provider(
 #     return True
 
 
-def list_notifications_for_user(db: Session, *, user_id: int):
-    return (
-        db.query(models.Notification)
-        .filter(models.Notification.user_id == user_id)
-        .order_by(models.Notification.created_at.desc(), models.Notification.id.desc())
+def create_notification(
+    db: Session,
+    *,
+    user_id: int,
+    type: str,
+    title: str,
+    body: str,
+    conversation_id: Optional[int] = None,
+    message_id: Optional[int] = None,
+) -> models.Notification:
+    """
+    Add an unread notification and queue a realtime "notification" event for
+    the user. The caller commits; the event is only delivered on commit.
+    """
+    notification = models.Notification(
+        user_id=user_id,
+        type=type,
+        title=title,
+        body=body,
+        conversation_id=conversation_id,
+        message_id=message_id,
+        is_read=False,
+    )
+    db.add(notification)
+    db.flush()
+    db.query(models.User).filter(models.User.id == user_id).update(
+        {models.User.unread_notification_count: models.User.unread_notification_count + 1},
+        synchronize_session=False,
+    )
+
+    publish_after_commit(
+        db,
+        user_id,
+        "notification",
+        {
+            "id": notification.id,
+            "type": type,
+            "title": title,
+            "body": body,
+            "conversation_id": conversation_id,
+            "message_id": message_id,
+            "created_at": notification.created_at.isoformat() if notification.created_at else None,
+        },
+    )
+    return notification
+
+
+def list_notifications_for_user(
+    db: Session,
+    *,
+    user_id: int,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> dict:
+    """
+    Return one page of the user's notifications, newest first, keyed on
+    (created_at, id). Raises ValueError for a malformed cursor.
+    """
+    q = db.query(models.Notification).filter(models.Notification.user_id == user_id)
+
+    if cursor:
+        cursor_at, cursor_id = decode_keyset_cursor(cursor)
+        q = q.filter(
+            or_(
+                models.Notification.created_at < cursor_at,
+                and_(
+                    models.Notification.created_at == cursor_at,
+                    models.Notification.id < cursor_id,
+                ),
+            )
+        )
+
+    rows = (
+        q.order_by(models.Notification.created_at.desc(), models.Notification.id.desc())
+        .limit(limit + 1)
         .all()
     )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = encode_keyset_cursor(rows[-1].created_at, rows[-1].id)
+
+    return {"notifications": rows, "next_cursor": next_cursor}
+
+
+def _adjust_unread_notification_count(db: Session, user_id: int, delta: int) -> None:
+    db.query(models.User).filter(models.User.id == user_id).update(
+        {
+            models.User.unread_notification_count: case(
+                (
+                    models.User.unread_notification_count + delta > 0,
+                    models.User.unread_notification_count + delta,
+                ),
+                else_=0,
+            )
+        },
+        synchronize_session=False,
+    )
 
 
 def mark_notification_read(db: Session, *, notification_id: int, user_id: int) -> bool:
-    notification = (
-        db.query(models.Notification)
+    exists = (
+        db.query(models.Notification.id)
         .filter(
             models.Notification.id == notification_id,
             models.Notification.user_id == user_id,
         )
         .first()
     )
-    if not notification:
+    if not exists:
         return False
-    if not notification.is_read:
-        notification.is_read = True
+    # Conditional update so two concurrent requests can't both decrement.
+    flipped = (
+        db.query(models.Notification)
+        .filter(
+            models.Notification.id == notification_id,
+            models.Notification.is_read.is_(False),
+        )
+        .update({models.Notification.is_read: True}, synchronize_session=False)
+    )
+    if flipped:
+        _adjust_unread_notification_count(db, user_id, -flipped)
         db.commit()
     return True
 
@@ -4130,17 +4903,19 @@ def mark_all_notifications_read(db: Session, *, user_id: int) -> int:
         )
         .values(is_read=True)
     )
+    flipped = result.rowcount or 0
+    if flipped:
+        # Decrement rather than zero so a concurrent create_notification
+        # keeps its increment.
+        _adjust_unread_notification_count(db, user_id, -flipped)
     db.commit()
-    return result.rowcount or 0
+    return flipped
 
 
 def get_unread_notification_count(db: Session, *, user_id: int) -> int:
-    return int(
-        db.query(func.count(models.Notification.id))
-        .filter(
-            models.Notification.user_id == user_id,
-            models.Notification.is_read.is_(False),
-        )
+    count = (
+        db.query(models.User.unread_notification_count)
+        .filter(models.User.id == user_id)
         .scalar()
-        or 0
     )
+    return int(count or 0)
@@ -1,9 +1,13 @@
+from fastapi import Depends, Request
 from sqlalchemy import create_engine, event
-from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import NullPool, StaticPool
 from sqlalchemy.engine import make_url
+from starlette.concurrency import run_in_threadpool
 
 from app.config import get_settings
+from app.utils.db_pool import instrument_engine, pool_kwargs
 
 settings = get_settings()
 
@@ -15,8 +19,11 @@ if DATABASE_URL.startswith("sqlite"):
     engine_kwargs["connect_args"] = {"check_same_thread": False}
     if ":memory:" in DATABASE_URL:
         engine_kwargs["poolclass"] = StaticPool
+if "poolclass" not in engine_kwargs:
+    engine_kwargs.update(pool_kwargs(settings, "primary"))
 
 engine = create_engine(DATABASE_URL, **engine_kwargs)
+instrument_engine(engine, "primary")
 
 url = make_url(DATABASE_URL)
 is_postgres = url.get_backend_name() == "postgresql"
@@ -35,14 +42,15 @@ def _ensure_tables_initialized():
 
     _tables_initialized = True
 
-if is_postgres:
-    def _set_guyana_timezone(dbapi_connection, connection_record):
-        cursor = dbapi_connection.cursor()
-        try:
-            cursor.execute("SET TIME ZONE 'America/Guyana'")
-        finally:
-            cursor.close()
+def _set_guyana_timezone(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("SET TIME ZONE 'America/Guyana'")
+    finally:
+        cursor.close()
 
+
+if is_postgres:
     event.listen(engine, "connect", _set_guyana_timezone)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 Base = declarative_base()
@@ -57,6 +65,129 @@ def get_db():
     finally:
         db.close()
 
+
+# -------------------------------------------------------------------
+# Async engine
+#
+# Same database as `engine`, through asyncpg / aiosqlite. Async route
+# handlers take an AsyncSession from get_async_db and run the existing
+# crud functions with `await db.run_sync(crud.fn, ...)`, so the query code
+# is shared and the request doesn't hold a threadpool thread while it
+# waits on the database.
+# -------------------------------------------------------------------
+_ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def to_async_url(database_url: str):
+    async_url = make_url(database_url)
+    async_url = async_url.set(drivername=_ASYNC_DRIVERS[async_url.get_backend_name()])
+    if "sslmode" in async_url.query:
+        # asyncpg spells libpq's sslmode as ssl.
+        sslmode = async_url.query["sslmode"]
+        async_url = async_url.difference_update_query(["sslmode"]).update_query_dict(
+            {"ssl": sslmode}
+        )
+    return async_url
+
+
+def _async_engine_kwargs(database_url: str, pool_name: str) -> dict:
+    kwargs = {}
+    if make_url(database_url).get_backend_name() == "postgresql":
+        kwargs["connect_args"] = {"server_settings": {"timezone": "America/Guyana"}}
+        kwargs.update(pool_kwargs(settings, pool_name, use_async=True))
+    else:
+        # aiosqlite connections are cheap to open and tied to the event loop
+        # that opened them, so don't pool them across loops.
+        kwargs["poolclass"] = NullPool
+    return kwargs
+
+
+async_engine = create_async_engine(
+    to_async_url(DATABASE_URL), **_async_engine_kwargs(DATABASE_URL, "async")
+)
+instrument_engine(async_engine.sync_engine, "async")
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+
+async def get_async_db():
+    """Yield an AsyncSession and ensure it is closed afterwards."""
+    _ensure_tables_initialized()
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# -------------------------------------------------------------------
+# Read replica
+#
+# With DATABASE_READ_URL set, reporting and listing routes read through
+# get_read_db / get_async_read_db, which hand out a replica session unless
+# app.services.read_routing sends the request to the primary (the caller
+# just wrote, or the replica is lagging). Without it they get the primary
+# session from get_db / get_async_db.
+# -------------------------------------------------------------------
+DATABASE_READ_URL = settings.DATABASE_READ_URL
+read_engine = None
+ReadSessionLocal = None
+async_read_engine = None
+AsyncReadSessionLocal = None
+replica_monitor = None
+
+if DATABASE_READ_URL:
+    read_engine_kwargs = pool_kwargs(settings, "replica")
+    if DATABASE_READ_URL.startswith("sqlite"):
+        read_engine_kwargs["connect_args"] = {"check_same_thread": False}
+    read_engine = create_engine(DATABASE_READ_URL, **read_engine_kwargs)
+    instrument_engine(read_engine, "replica")
+    if make_url(DATABASE_READ_URL).get_backend_name() == "postgresql":
+        event.listen(read_engine, "connect", _set_guyana_timezone)
+    ReadSessionLocal = sessionmaker(
+        autocommit=False, autoflush=False, expire_on_commit=False, bind=read_engine
+    )
+
+    async_read_engine = create_async_engine(
+        to_async_url(DATABASE_READ_URL),
+        **_async_engine_kwargs(DATABASE_READ_URL, "async_replica"),
+    )
+    instrument_engine(async_read_engine.sync_engine, "async_replica")
+    AsyncReadSessionLocal = async_sessionmaker(
+        async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+
+    from app.services.read_routing import ReplicaLagMonitor
+
+    replica_monitor = ReplicaLagMonitor(
+        read_engine, check_interval=settings.DATABASE_READ_LAG_CHECK_SECONDS
+    )
+
+
+def get_read_db(request: Request, primary: Session = Depends(get_db)):
+    """Yield a replica session for read-only routes, or the primary one."""
+    from app.services import read_routing
+
+    if not read_routing.use_replica(read_routing.request_user_id(request), replica_monitor):
+        yield primary
+        return
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request, primary: AsyncSession = Depends(get_async_db)):
+    """Async counterpart of get_read_db."""
+    from app.services import read_routing
+
+    if replica_monitor is not None and replica_monitor.needs_check():
+        await run_in_threadpool(replica_monitor.check)
+    if not read_routing.use_replica(read_routing.request_user_id(request), replica_monitor):
+        yield primary
+        return
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
 # import os
 # from sqlalchemy import create_engine
 # from sqlalchemy.orm import sessionmaker, declarative_base
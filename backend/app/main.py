@@ -18,14 +18,25 @@ bookings_routes = importlib.import_module("app.routes.bookings")
 profile_routes = importlib.import_module("app.routes.profile")
 admin_routes = importlib.import_module("app.routes.admin")
 notifications_routes = importlib.import_module("app.routes.notifications")
+events_routes = importlib.import_module("app.routes.events")
+conversations_routes = importlib.import_module("app.routes.conversations")
 from app.security import get_current_user_from_header
 from app.workers.cron import registerCronJobs
+from app.services.image_derivatives import shutdown_derivative_pool
+from app.services.password_hasher import shutdown_password_pool
+from app.services.push_queue import start_push_worker, stop_push_worker
+from app.services.query_stats import QueryStatsMiddleware
+from app.services.rate_limit import RateLimitMiddleware
 settings = get_settings()
 get_jwt_secret_key()
 
 app = FastAPI(title="BookitGY")
 scheduler = BackgroundScheduler()
 
+# Added first so it sits inside CORS and 429s still carry CORS headers.
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+
 origins = settings.CORS_ALLOW_ORIGINS
 if settings.ENV == "dev":
     print(f"[CORS] Allowed origins: {', '.join(origins)}")
@@ -177,6 +188,8 @@ app.include_router(bookings_routes.router)
 app.include_router(profile_routes.router)
 app.include_router(admin_routes.router)
 app.include_router(notifications_routes.router)
+app.include_router(events_routes.router)
+app.include_router(conversations_routes.router)
 
 
 # -------------------------------------------------------------------
@@ -222,6 +235,7 @@ def update_my_location(
     user.lat = lat_f
     user.long = long_f
     user.location = location
+    crud.refresh_search_document_for_user(db, user.id)
 
     db.commit()
     db.refresh(user)
@@ -241,3 +255,11 @@ def update_my_location(
 def on_startup() -> None:
     _seed_demo_users()
     start_scheduler()
+    start_push_worker()
+
+
+@app.on_event("shutdown")
+def on_shutdown() -> None:
+    stop_push_worker(wait=True)
+    shutdown_derivative_pool(wait=True)
+    shutdown_password_pool(wait=True)
@@ -13,6 +13,8 @@ from sqlalchemy import (
     UniqueConstraint,
     ForeignKeyConstraint,
     CheckConstraint,
+    Index,
+    text,
 )
 
 from .database import Base
@@ -20,12 +22,20 @@ from datetime import datetime
 from app.utils.time import now_guyana
 
 from app.utils.duration import minutes_to_duration_parts
-from sqlalchemy.orm import relationship
+from app.utils.geo import geohash_for
+from sqlalchemy.orm import relationship, validates
 
 
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index(
+            "ix_users_geohash",
+            "geohash",
+            postgresql_ops={"geohash": "varchar_pattern_ops"},
+        ),
+    )
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True, nullable=False)
     email = Column(String, unique=True, index=True)
@@ -38,6 +48,7 @@ class User(Base):
     location = Column(String)
     lat = Column(Float, nullable=True)
     long = Column(Float, nullable=True)
+    geohash = Column(String(12), nullable=True)
     is_provider = Column(Boolean, default=False)
     is_admin = Column(Boolean, default=False)
     is_suspended = Column(Boolean, default=False, nullable=False)
@@ -47,12 +58,22 @@ class User(Base):
     password_changed_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=now_guyana)
     avatar_url = Column(String, nullable=True)   # 👈 NEW
+    avatar_thumbnail_url = Column(String, nullable=True)
     deleted_at = Column(DateTime, nullable=True)
     is_deleted = Column(Boolean, default=False, nullable=False)
     token_version = Column(Integer, default=0, nullable=False)
+    # Maintained by crud's notification helpers; see get_unread_notification_count.
+    unread_notification_count = Column(Integer, default=0, nullable=False)
     deleted_email_hash = Column(Text, nullable=True)
     deleted_phone_hash = Column(Text, nullable=True)
 
+    @validates("lat", "long")
+    def _sync_geohash(self, key, value):
+        lat = value if key == "lat" else self.lat
+        long = value if key == "long" else self.long
+        self.geohash = geohash_for(lat, long)
+        return value
+
 
 class PasswordResetToken(Base):
     __tablename__ = "password_reset_tokens"
@@ -67,6 +88,28 @@ class PasswordResetToken(Base):
 
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
+    __table_args__ = (
+        # Active tokens per user (revoke on password change / deletion).
+        Index(
+            "ix_refresh_tokens_user_active",
+            "user_id",
+            postgresql_where=text("revoked_at IS NULL"),
+            sqlite_where=text("revoked_at IS NULL"),
+        ),
+        # Retention job: revoked tokens by age, active tokens by last use.
+        Index(
+            "ix_refresh_tokens_revoked_at",
+            "revoked_at",
+            postgresql_where=text("revoked_at IS NOT NULL"),
+            sqlite_where=text("revoked_at IS NOT NULL"),
+        ),
+        Index(
+            "ix_refresh_tokens_active_last_used",
+            "last_used_at",
+            postgresql_where=text("revoked_at IS NULL"),
+            sqlite_where=text("revoked_at IS NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
@@ -103,6 +146,7 @@ class Provider(Base):
     bio = Column(Text)
     account_number = Column(String, unique=True, index=True)  # NEW
     avatar_url = Column(String, nullable=True)
+    avatar_thumbnail_url = Column(String, nullable=True)
     is_locked = Column(Boolean, default=False)
     avg_rating = Column(Float, nullable=True)
     rating_count = Column(Integer, nullable=False, default=0)
@@ -197,6 +241,10 @@ class BookingRating(Base):
 
 class Conversation(Base):
     __tablename__ = "conversations"
+    __table_args__ = (
+        Index("ix_conversations_client_last_message", "client_user_id", "last_message_at", "id"),
+        Index("ix_conversations_provider_last_message", "provider_user_id", "last_message_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     booking_id = Column(Integer, ForeignKey("bookings.id"), nullable=False, unique=True, index=True)
@@ -204,12 +252,22 @@ class Conversation(Base):
     provider_user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     created_at = Column(DateTime, default=now_guyana, nullable=False)
     updated_at = Column(DateTime, default=now_guyana, onupdate=now_guyana, nullable=False)
+    # Denormalized inbox state, maintained by send_booking_message and
+    # mark_booking_messages_read. last_message_id has no FK to avoid a
+    # conversations <-> messages cycle.
+    last_message_id = Column(Integer, nullable=True)
+    last_message_at = Column(DateTime, nullable=True)
+    client_unread_count = Column(Integer, default=0, nullable=False)
+    provider_unread_count = Column(Integer, default=0, nullable=False)
 
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
 
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_conversation_created_id", "conversation_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False, index=True)
@@ -231,6 +289,7 @@ class MessageAttachment(Base):
     attachment_type = Column(String, nullable=False, default="image")
     file_url = Column(String, nullable=False)
     thumbnail_url = Column(String, nullable=True)
+    medium_url = Column(String, nullable=True)
     original_filename = Column(String, nullable=True)
     mime_type = Column(String, nullable=True)
     file_size_bytes = Column(Integer, nullable=True)
@@ -243,6 +302,9 @@ class MessageAttachment(Base):
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_user_read_created", "user_id", "is_read", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
@@ -269,7 +331,77 @@ class PushToken(Base):
     is_active = Column(Boolean, nullable=False, default=True)
     created_at = Column(DateTime, default=now_guyana, nullable=False)
     updated_at = Column(DateTime, default=now_guyana, onupdate=now_guyana, nullable=False)
-    last_seen_at = Column(DateTime, nullable=True)
+    last_seen_at = Column(DateTime, nullable=True, index=True)
+
+
+class PushJob(Base):
+    """A queued push notification; see app.services.push_queue."""
+    __tablename__ = "push_jobs"
+    __table_args__ = (
+        Index("ix_push_jobs_status_next_attempt", "status", "next_attempt_at"),
+        Index("ix_push_jobs_user_sent_at", "user_id", "sent_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    title = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    data = Column(Text, nullable=True)  # JSON
+    dedupe_key = Column(String, nullable=True, unique=True)
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, default=now_guyana, nullable=False)
+    locked_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=now_guyana, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+
+
+class PushTicket(Base):
+    """An accepted Expo push ticket awaiting its delivery receipt."""
+    __tablename__ = "push_tickets"
+    __table_args__ = (
+        Index("ix_push_tickets_created_at", "created_at"),
+        Index("ix_push_tickets_checked_at", "checked_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    ticket_id = Column(String, nullable=False, unique=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    expo_push_token = Column(String, nullable=False)
+    created_at = Column(DateTime, default=now_guyana, nullable=False)
+    # Last time Expo had no receipt ready for this ticket.
+    checked_at = Column(DateTime, nullable=True)
+
+
+class RateLimitBucket(Base):
+    """Shared token bucket for app.services.rate_limit's database backend."""
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String(255), primary_key=True)
+    tokens = Column(Float, nullable=False)
+    allowed = Column(Boolean, nullable=False, default=True)
+    refreshed_at = Column(Float, nullable=False, index=True)  # epoch seconds
+
+
+class BookingReminder(Base):
+    """A reminder push due `offset_minutes` before a booking starts."""
+    __tablename__ = "booking_reminders"
+    __table_args__ = (
+        UniqueConstraint(
+            "booking_id", "offset_minutes", name="uq_booking_reminders_booking_offset"
+        ),
+        Index("ix_booking_reminders_status_due_at", "status", "due_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    booking_id = Column(
+        Integer, ForeignKey("bookings.id", ondelete="CASCADE"), nullable=False
+    )
+    offset_minutes = Column(Integer, nullable=False)
+    due_at = Column(DateTime, nullable=False)
+    status = Column(String(20), nullable=False, default="pending")  # pending, sent, skipped
+    sent_at = Column(DateTime, nullable=True)
 
 
 
@@ -354,16 +486,55 @@ class ProviderProfession(Base):
     provider_id = Column(Integer, ForeignKey("providers.id"))
     name = Column(String, index=True)
 
+class ProviderSearchDocument(Base):
+    __tablename__ = "provider_search_documents"
+
+    id = Column(Integer, primary_key=True, index=True)
+    provider_id = Column(Integer, ForeignKey("providers.id"), nullable=False, unique=True, index=True)
+    # Lower-cased username, location, bio, professions and active service
+    # names. PostgreSQL indexes this with pg_trgm + tsvector (see migration).
+    document = Column(Text, nullable=False, default="")
+    updated_at = Column(DateTime, default=now_guyana, onupdate=now_guyana, nullable=False)
+
 class ProviderCatalogImage(Base):
     __tablename__ = "provider_catalog_images"
 
     id = Column(Integer, primary_key=True, index=True)
     provider_id = Column(Integer, ForeignKey("providers.id"), index=True, nullable=False)
     image_url = Column(String, nullable=False)
+    thumbnail_url = Column(String, nullable=True)
+    medium_url = Column(String, nullable=True)
+    stored_image_id = Column(Integer, ForeignKey("stored_images.id"), nullable=True, index=True)
     caption = Column(String, nullable=True)
     created_at = Column(DateTime, default=now_guyana)
 
 
+class StoredImage(Base):
+    """
+    Content-addressed index of uploaded images, keyed by SHA-256 of the bytes.
+    ref_count is the number of rows pointing at the asset; the remote copy is
+    only deleted when it drops to zero. Avatars are never released, so they
+    aren't counted (ref_count stays 0).
+    """
+    __tablename__ = "stored_images"
+    __table_args__ = (
+        UniqueConstraint("kind", "content_hash", name="uq_stored_images_kind_hash"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(20), nullable=False)
+    content_hash = Column(String(64), nullable=False)
+    url = Column(String, nullable=False)
+    public_id = Column(String, nullable=True)
+    thumbnail_url = Column(String, nullable=True)
+    medium_url = Column(String, nullable=True)
+    byte_size = Column(Integer, nullable=True)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=now_guyana, nullable=False)
+
+
 class PlatformSetting(Base):
     __tablename__ = "platform_settings"
 
@@ -8,8 +8,9 @@ from sqlalchemy import and_, case, func, literal
 from sqlalchemy.orm import Session, aliased
 
 from app import crud, schemas, models
+from app.utils import db_pool, metrics
 from app.utils.email import send_billing_paid_email, send_provider_suspension_email
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.security import get_current_user_from_header
 
 router = APIRouter(prefix="/admin", tags=["admin"])
@@ -108,6 +109,35 @@ def list_provider_locations(
     return crud.list_admin_provider_locations(db)
 
 
+@router.get("/providers/locations/map", response_model=schemas.AdminProviderMapOut)
+def get_provider_location_map(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_long: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_long: float = Query(..., ge=-180, le=180),
+    zoom: int = Query(..., ge=0, le=22),
+    db: Session = Depends(get_db),
+    _: models.User = Depends(_require_admin),
+):
+    try:
+        return crud.get_admin_provider_map(
+            db,
+            min_lat=min_lat,
+            min_long=min_long,
+            max_lat=max_lat,
+            max_long=max_long,
+            zoom=zoom,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@router.get("/metrics")
+def get_metrics(_: models.User = Depends(_require_admin)):
+    """Counters and distributions for this worker process since start-up."""
+    return {**metrics.snapshot(), "db_pools": db_pool.pool_status()}
+
+
 
 
 @router.get("/clients/list", response_model=List[schemas.AdminClientListItemOut])
@@ -225,7 +255,7 @@ def list_provider_cancellations(
 def get_signup_report(
     start: date = Query(...),
     end: date = Query(...),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: models.User = Depends(_require_admin),
 ):
     if start > end:
@@ -279,7 +309,7 @@ def get_signup_report(
 
 @router.get("/reports/professions", response_model=schemas.AdminProfessionsOut)
 def list_professions(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: models.User = Depends(_require_admin),
 ):
     professions = []
@@ -301,7 +331,7 @@ def get_booking_metrics(
     end: date = Query(...),
     status: Optional[str] = Query(None),
     profession: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: models.User = Depends(_require_admin),
 ):
     if start > end:
@@ -446,7 +476,7 @@ def get_provider_performance_summary(
     end: date = Query(...),
     profession: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: models.User = Depends(_require_admin),
 ):
     if start > end:
@@ -650,7 +680,7 @@ def get_provider_retention(
     start: Optional[date] = Query(None),
     end: Optional[date] = Query(None),
     profession: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: models.User = Depends(_require_admin),
 ):
     if start and end and start > end:
@@ -739,7 +769,7 @@ def get_provider_retention(
 )
 def get_provider_daily_bookings(
     date: date = Query(...),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: models.User = Depends(_require_admin),
 ):
     start_ts = datetime.combine(date, time.min)
@@ -834,7 +864,7 @@ def get_low_activity_providers(
     year: Optional[int] = Query(None, ge=2000),
     threshold: int = Query(3, ge=0),
     profession: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: models.User = Depends(_require_admin),
 ):
     if month:
@@ -917,7 +947,7 @@ def get_provider_cancellation_rates(
     end: date = Query(...),
     min_bookings: int = Query(5, ge=1),
     profession: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: models.User = Depends(_require_admin),
 ):
     if start > end:
@@ -11,7 +11,6 @@ from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 import secrets
-import requests
 
 from app.config import get_settings
 from app.auth.jwt import create_access_token
@@ -19,6 +18,8 @@ from app.auth.jwt_config import get_jwt_algorithm
 from app.database import get_db
 from app import crud, schemas, models
 from app.security import get_current_user_from_header
+from app.services.facebook_graph import get_facebook_verifier
+from app.services.google_jwks import get_google_jwks
 from app.utils.email import send_password_reset_email, send_verification_email
 from app.utils.passwords import validate_password, PASSWORD_REQUIREMENTS_MESSAGE
 from app.utils.tokens import (
@@ -38,7 +39,7 @@ settings = get_settings()
 logger = logging.getLogger(__name__)
 
 
-REFRESH_TOKEN_INACTIVITY_DAYS = 90
+REFRESH_TOKEN_INACTIVITY_DAYS = settings.REFRESH_TOKEN_INACTIVITY_DAYS
 GOOGLE_DEBUG_LOGS = True
 
 
@@ -181,20 +182,13 @@ def _verify_google_id_token(id_token: str) -> dict:
         raise _google_error(status.HTTP_401_UNAUTHORIZED, "GOOGLE_TOKEN_INVALID")
 
     try:
-        jwks_resp = requests.get("https://www.googleapis.com/oauth2/v3/certs", timeout=10)
-        jwks = jwks_resp.json() if jwks_resp.ok else {}
+        key_data = get_google_jwks().get_key(kid)
     except Exception as exc:
         if GOOGLE_DEBUG_LOGS:
             logger.exception("[google-backend] verification_failed error=%s", str(exc))
             logger.info("[google-backend] verification_failed reason=unexpected exception exception=%s detail=%s", exc.__class__.__name__, str(exc))
         raise _google_error(status.HTTP_401_UNAUTHORIZED, "GOOGLE_TOKEN_INVALID")
 
-    key_data = None
-    for key in jwks.get("keys", []):
-        if key.get("kid") == kid:
-            key_data = key
-            break
-
     if not key_data:
         if GOOGLE_DEBUG_LOGS:
             logger.info("[google-backend] verification_failed reason=signature failure detail=matching kid not found")
@@ -297,49 +291,15 @@ def _verify_facebook_access_token(user_token: str) -> dict:
     if not app_id or not app_secret:
         raise _facebook_error(status.HTTP_401_UNAUTHORIZED, "FB_TOKEN_INVALID")
 
-    version = _facebook_graph_version()
-    try:
-        debug_resp = requests.get(
-            f"https://graph.facebook.com/{version}/debug_token",
-            params={
-                "input_token": user_token,
-                "access_token": f"{app_id}|{app_secret}",
-            },
-            timeout=10,
-        )
-        debug_data = debug_resp.json().get("data", {}) if debug_resp.ok else {}
-    except Exception:
-        raise _facebook_error(status.HTTP_401_UNAUTHORIZED, "FB_TOKEN_INVALID")
-
-    if (
-        not debug_data.get("is_valid")
-        or str(debug_data.get("app_id") or "") != str(app_id)
-        or not debug_data.get("user_id")
-    ):
-        raise _facebook_error(status.HTTP_401_UNAUTHORIZED, "FB_TOKEN_INVALID")
-
-    try:
-        profile_resp = requests.get(
-            f"https://graph.facebook.com/{version}/me",
-            params={
-                "fields": "id,name,email",
-                "access_token": user_token,
-            },
-            timeout=10,
-        )
-        profile = profile_resp.json() if profile_resp.ok else {}
-    except Exception:
-        raise _facebook_error(status.HTTP_401_UNAUTHORIZED, "FB_TOKEN_INVALID")
-
-    fb_user_id = profile.get("id") or debug_data.get("user_id")
-    if not fb_user_id:
+    profile = get_facebook_verifier().verify(
+        user_token,
+        app_id=app_id,
+        app_secret=app_secret,
+        version=_facebook_graph_version(),
+    )
+    if profile is None:
         raise _facebook_error(status.HTTP_401_UNAUTHORIZED, "FB_TOKEN_INVALID")
-
-    return {
-        "id": str(fb_user_id),
-        "name": (profile.get("name") or "").strip(),
-        "email": (profile.get("email") or "").strip().lower() or None,
-    }
+    return profile
 
 
 def _facebook_auth_response(db: Session, user: models.User) -> dict:
@@ -925,8 +885,9 @@ def refresh_session(
         crud.revoke_refresh_token(db, token_record)
         raise _session_expired_error()
 
-    new_refresh_token, new_record = _create_refresh_token(db, user.id)
-    crud.revoke_refresh_token(db, token_record, replaced_by_token_id=new_record.id)
+    new_refresh_token = _new_refresh_token_raw()
+    if crud.rotate_refresh_token(db, token_record, hash_token(new_refresh_token)) is None:
+        raise _session_expired_error()
 
     access_token = _issue_access_token(user.email, user.token_version, user.id)
     return {
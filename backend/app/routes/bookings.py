@@ -1,17 +1,27 @@
 from typing import Optional, List
 from datetime import datetime, time
 
-from fastapi import APIRouter, Depends, HTTPException, Header, UploadFile, File, status
+from functools import partial
+
+from fastapi import APIRouter, Depends, HTTPException, Header, Response, UploadFile, File, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app import crud, schemas, models
-from app.security import get_current_user_from_header
-from app.services.cloudinary_service import upload_booking_message_image
-from PIL import Image, UnidentifiedImageError
-from io import BytesIO
-from tempfile import NamedTemporaryFile
-import os
+from app.security import get_current_user_async, get_current_user_from_header
+from app.services.cloudinary_service import (
+    BOOKING_MESSAGE_FOLDER,
+    upload_booking_message_image,
+    upload_image_derivative,
+)
+from app.services.uploads import (
+    UploadTimer,
+    receive_image_upload,
+    upload_result_url,
+    upload_with_derivatives,
+)
+from app.services import user_cache
 
 
 
@@ -31,48 +41,27 @@ MAX_BOOKING_MESSAGE_IMAGE_SIZE = 8 * 1024 * 1024
 MAX_BOOKING_MESSAGE_IMAGE_DIMENSION = 4096
 
 
-def _validate_booking_message_image(contents: bytes) -> tuple[int, int]:
-    try:
-        with Image.open(BytesIO(contents)) as img:
-            img_format = (img.format or "").upper()
-            width, height = img.size
-            img.verify()
-    except UnidentifiedImageError:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Uploaded file is not a valid image.",
-        )
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Could not read uploaded image.",
-        )
-
-    if img_format not in ALLOWED_BOOKING_MESSAGE_IMAGE_FORMATS:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid image format. Allowed: JPEG, PNG, WEBP.",
-        )
-
-    if width > MAX_BOOKING_MESSAGE_IMAGE_DIMENSION or height > MAX_BOOKING_MESSAGE_IMAGE_DIMENSION:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Image dimensions are too large.",
-        )
-
-    return int(width), int(height)
-
-
 def _require_current_provider(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user_from_header),
 ) -> models.Provider:
+    return _current_provider(db, current_user)
+
+
+async def _require_current_provider_async(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async),
+) -> models.Provider:
+    return await db.run_sync(_current_provider, current_user)
+
+
+def _current_provider(db: Session, current_user: models.User) -> models.Provider:
     if not current_user.is_provider:
         raise HTTPException(
             status_code=403, detail="Only providers can access this endpoint",
         )
 
-    provider = crud.get_provider_by_user_id(db, current_user.id)
+    provider = user_cache.get_provider(db, current_user.id, crud.get_provider_by_user_id)
     if not provider:
         raise HTTPException(
             status_code=403,
@@ -107,19 +96,19 @@ def create_booking_for_me(
 
 
 @router.get("/bookings/me")
-def list_my_bookings(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_from_header),
+async def list_my_bookings(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async),
 ):
-    return crud.list_bookings_for_customer(db, current_user.id)
+    return await db.run_sync(crud.list_bookings_for_customer, current_user.id)
 
 
 @router.get("/providers/me/bookings")
-def list_provider_bookings(
+async def list_provider_bookings(
     start: Optional[str] = None,
     end: Optional[str] = None,
-    db: Session = Depends(get_db),
-    provider: models.Provider = Depends(_require_current_provider),
+    db: AsyncSession = Depends(get_async_db),
+    provider: models.Provider = Depends(_require_current_provider_async),
 ):
     if start and end:
         try:
@@ -139,14 +128,14 @@ def list_provider_bookings(
 
         range_start = datetime.combine(start_date, time.min)
         range_end = datetime.combine(end_date, time.max)
-        return crud.list_bookings_for_provider(
-            db,
+        return await db.run_sync(
+            crud.list_bookings_for_provider,
             provider.id,
             range_start=range_start,
             range_end=range_end,
         )
 
-    return crud.list_bookings_for_provider(db, provider.id)
+    return await db.run_sync(crud.list_bookings_for_provider, provider.id)
 
 
 @router.get("/providers/me/billing/bookings")
@@ -262,6 +251,7 @@ def list_my_upcoming_bookings(
 @router.post("/bookings/messages/attachments")
 async def upload_booking_message_attachment(
     booking_id: int,
+    response: Response,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user_from_header),
@@ -284,39 +274,29 @@ async def upload_booking_message_attachment(
             detail="Only image attachments are allowed.",
         )
 
-    contents = await file.read()
-    if len(contents) > MAX_BOOKING_MESSAGE_IMAGE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Image file is too large. Maximum size is 8 MB.",
-        )
-
-    width, height = _validate_booking_message_image(contents)
-
-    try:
-        with NamedTemporaryFile(delete=False) as tmp:
-            tmp.write(contents)
-            tmp_path = tmp.name
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to buffer uploaded file",
-        )
-
+    timer = UploadTimer()
+    upload = await receive_image_upload(
+        file,
+        timer=timer,
+        max_bytes=MAX_BOOKING_MESSAGE_IMAGE_SIZE,
+        max_dimension=MAX_BOOKING_MESSAGE_IMAGE_DIMENSION,
+        too_large_detail="Image file is too large. Maximum size is 8 MB.",
+    )
     try:
-        upload_result = upload_booking_message_image(tmp_path)
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to upload image",
+        upload_result, derivatives = await upload_with_derivatives(
+            upload_booking_message_image,
+            upload,
+            timer=timer,
+            error_detail="Failed to upload image",
+            store_derivative=partial(
+                upload_image_derivative,
+                folder=BOOKING_MESSAGE_FOLDER,
+            ),
         )
     finally:
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
+        upload.close()
 
-    image_url = upload_result.get("secure_url") if isinstance(upload_result, dict) else str(upload_result)
+    image_url = upload_result_url(upload_result)
 
     if not image_url:
         raise HTTPException(
@@ -324,13 +304,16 @@ async def upload_booking_message_attachment(
             detail="Image upload did not return a valid URL",
         )
 
+    timer.apply(response)
     return {
         "attachment_type": "image",
         "file_url": image_url,
+        "thumbnail_url": derivatives.get("thumbnail"),
+        "medium_url": derivatives.get("medium"),
         "mime_type": file.content_type,
-        "file_size_bytes": len(contents),
-        "width": width,
-        "height": height,
+        "file_size_bytes": upload.size,
+        "width": upload.width,
+        "height": upload.height,
     }
 
 
@@ -338,19 +321,27 @@ async def upload_booking_message_attachment(
     "/bookings/{booking_id}/messages",
     response_model=schemas.BookingMessagesResponse,
 )
-def get_booking_messages(
+async def get_booking_messages(
     booking_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_from_header),
+    before_id: Optional[int] = Query(None, ge=1),
+    after_id: Optional[int] = Query(None, ge=1),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async),
 ):
     try:
-        payload = crud.list_booking_messages(
-            db,
+        payload = await db.run_sync(
+            crud.list_booking_messages,
             booking_id=booking_id,
             user_id=current_user.id,
+            before_id=before_id,
+            after_id=after_id,
+            limit=limit,
         )
     except PermissionError as exc:
         raise HTTPException(status_code=403, detail=str(exc))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
     if payload is None:
         raise HTTPException(status_code=404, detail="Booking not found")
@@ -383,16 +374,16 @@ def send_booking_message(
     if message is None:
         raise HTTPException(status_code=404, detail="Booking not found")
 
-    context = crud.get_booking_chat_context(
-        db,
-        booking_id=payload.booking_id,
-        user_id=current_user.id,
+    sender_role = (
+        "client"
+        if message.conversation.client_user_id == current_user.id
+        else "provider"
     )
 
     return {
         "id": message.id,
         "sender_user_id": message.sender_user_id,
-        "sender_role": context["sender_role"],
+        "sender_role": sender_role,
         "text": message.text,
         "created_at": message.created_at,
         "read_at": message.read_at,
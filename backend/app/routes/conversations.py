@@ -0,0 +1,28 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud, models, schemas
+from app.database import get_async_db
+from app.security import get_current_user_async
+
+router = APIRouter(tags=["conversations"])
+
+
+@router.get("/conversations/me", response_model=schemas.ConversationInboxResponse)
+async def get_my_conversations(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async),
+):
+    try:
+        return await db.run_sync(
+            crud.list_conversations_for_user,
+            user_id=current_user.id,
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+
+from app import models
+from app.config import get_settings
+from app.security import get_current_user_async
+from app.services.realtime import get_broker, user_channel
+
+router = APIRouter(tags=["events"])
+
+
+def _format_sse(event_type: str, data) -> str:
+    return f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _event_stream(request: Request, subscription, heartbeat_seconds: float):
+    try:
+        yield _format_sse("ready", {"channel": subscription.channel})
+        while True:
+            if await request.is_disconnected():
+                break
+            payload = await subscription.get(timeout=heartbeat_seconds)
+            if payload is None:
+                # Comment line keeps proxies from closing an idle stream.
+                yield ": keep-alive\n\n"
+                continue
+            yield _format_sse(payload.get("type", "message"), payload.get("data"))
+    except asyncio.CancelledError:
+        pass
+    finally:
+        subscription.close()
+
+
+@router.get("/events/stream")
+async def stream_events(
+    request: Request,
+    current_user: models.User = Depends(get_current_user_async),
+):
+    """
+    Server-Sent Events stream of the current user's chat messages
+    ("chat_message") and notifications ("notification").
+    """
+    subscription = get_broker().subscribe(user_channel(current_user.id))
+    return StreamingResponse(
+        _event_stream(
+            request,
+            subscription,
+            get_settings().REALTIME_HEARTBEAT_SECONDS,
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,32 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
-from app.database import get_db
-from app.security import get_current_user_from_header
+from app.database import get_async_db, get_db
+from app.security import get_current_user_async, get_current_user_from_header
 from app.services import push_notifications
 
 router = APIRouter(tags=["notifications"])
 
 
 @router.get("/notifications/me", response_model=schemas.NotificationsResponse)
-def get_my_notifications(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_from_header),
+async def get_my_notifications(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async),
 ):
-    notifications = crud.list_notifications_for_user(db, user_id=current_user.id)
-    return {"notifications": notifications}
+    try:
+        return await db.run_sync(
+            crud.list_notifications_for_user,
+            user_id=current_user.id,
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 
 @router.get(
     "/notifications/me/unread-count",
     response_model=schemas.NotificationUnreadCountResponse,
 )
-def get_my_notification_unread_count(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_from_header),
+async def get_my_notification_unread_count(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async),
 ):
-    unread_count = crud.get_unread_notification_count(db, user_id=current_user.id)
+    unread_count = await db.run_sync(
+        crud.get_unread_notification_count, user_id=current_user.id
+    )
     return {"unread_count": unread_count}
 
 
@@ -155,7 +155,10 @@ def update_my_provider_profile(
 
     # Update avatar URL (sanitized)
     if payload.avatar_url is not None:
-        provider.avatar_url = _sanitize_avatar_url(payload.avatar_url)
+        avatar_url = _sanitize_avatar_url(payload.avatar_url)
+        if avatar_url != provider.avatar_url:
+            provider.avatar_url = avatar_url
+            provider.avatar_thumbnail_url = None
 
     # Update professions if provided
     if payload.professions is not None:
@@ -165,6 +168,9 @@ def update_my_provider_profile(
     else:
         professions = crud.get_professions_for_provider(db, provider.id)
 
+    db.flush()
+    crud.refresh_provider_search_document(db, provider.id)
+
     try:
         db.commit()
     except IntegrityError as exc:
@@ -269,7 +275,13 @@ def update_my_profile(
         user.location = payload.location
 
     if payload.avatar_url is not None:      # 👈 NEW
-        user.avatar_url = payload.avatar_url
+        if payload.avatar_url != user.avatar_url:
+            user.avatar_url = payload.avatar_url
+            user.avatar_thumbnail_url = None
+
+    if user.is_provider:
+        db.flush()
+        crud.refresh_search_document_for_user(db, user.id)
 
     try:
         db.commit()
@@ -1,25 +1,37 @@
 from typing import List, Optional
 from datetime import date
-import os
-from io import BytesIO
+from functools import partial
 import cloudinary
-import cloudinary.uploader
 from fastapi import (
     APIRouter,
     Depends,
     HTTPException,
+    Response,
     UploadFile,
     File,
     status,
     Form,
     Query,
 )
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from tempfile import NamedTemporaryFile
 
-from app.services.cloudinary_service import upload_avatar
-from app.database import get_db
+from app.services.cloudinary_service import (
+    CATALOG_FOLDER,
+    upload_avatar,
+    upload_catalog_image,
+    upload_image_derivative,
+)
+from app.services.uploads import (
+    AVATAR_DERIVATIVE_SIZES,
+    UploadTimer,
+    receive_image_upload,
+    upload_deduplicated,
+)
+from app.services import user_cache
+from app.utils.geo import parse_lat_long
+from app.database import get_async_db, get_async_read_db, get_db, get_read_db
 from app import crud, schemas, models
 from app.security import get_current_user_from_header
 from app.config import get_settings
@@ -43,7 +55,7 @@ router = APIRouter(tags=["providers"])
     response_model=schemas.PublicProviderOut,
     status_code=status.HTTP_200_OK,
 )
-def get_public_provider_by_username(username: str, db: Session = Depends(get_db)):
+def get_public_provider_by_username(username: str, db: Session = Depends(get_read_db)):
     """Return public provider information by username (case-insensitive)."""
 
     user = crud.get_user_by_username(db, username)
@@ -85,46 +97,6 @@ ALLOWED_AVATAR_FORMATS = {"JPEG", "PNG", "WEBP"}
 MAX_AVATAR_FILE_SIZE = 5 * 1024 * 1024  # 5 MB
 MAX_AVATAR_DIMENSION = 4096  # cap width/height to avoid extremely large images
 
-def _validate_image_contents(contents: bytes) -> None:
-    """Ensure the uploaded bytes are a real, reasonably sized image."""
-    try:
-        with Image.open(BytesIO(contents)) as img:
-            img_format = (img.format or "").upper()
-            img.verify()
-    except UnidentifiedImageError:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Uploaded file is not a valid image.",
-        )
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Could not read uploaded image.",
-        )
-
-    if img_format not in ALLOWED_AVATAR_FORMATS:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid image format. Allowed: JPEG, PNG, WEBP.",
-        )
-
-    try:
-        with Image.open(BytesIO(contents)) as img_dim:
-            width, height = img_dim.size
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Could not inspect image dimensions.",
-        )
-
-    if width > MAX_AVATAR_DIMENSION or height > MAX_AVATAR_DIMENSION:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Avatar image dimensions are too large.",
-        )
-
-
-
 def _ensure_pillow():
     """Import Pillow lazily so missing deps don’t break app startup."""
     try:
@@ -139,7 +111,7 @@ def _ensure_pillow():
     Image.MAX_IMAGE_PIXELS = 10_000_000
     return Image, UnidentifiedImageError
 
-def _scan_bytes_for_viruses(data: bytes) -> None:
+def _scan_upload_for_viruses(fileobj) -> None:
     """
     Hook for virus scanning.
 
@@ -147,7 +119,7 @@ def _scan_bytes_for_viruses(data: bytes) -> None:
     For now it's a no-op stub to make the security intent explicit.
     """
     # Example:
-    # result = antivirus_client.scan_bytes(data)
+    # result = antivirus_client.scan_file(fileobj)
     # if not result.clean:
     #     raise HTTPException(
     #         status_code=status.HTTP_400_BAD_REQUEST,
@@ -174,7 +146,7 @@ def _get_provider_for_user(db: Session, current_user: models.User) -> models.Pro
             detail="Only providers can access this endpoint",
         )
 
-    provider = crud.get_provider_by_user_id(db, current_user.id)
+    provider = user_cache.get_provider(db, current_user.id, crud.get_provider_by_user_id)
     if not provider:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -196,6 +168,7 @@ def _require_current_provider(
 
 @router.post("/providers/me/avatar")
 async def upload_my_avatar(
+    response: Response,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user_from_header),
@@ -209,60 +182,51 @@ async def upload_my_avatar(
             detail="Invalid avatar file type. Allowed: JPEG, PNG, WEBP.",
         )
 
-    # Read and enforce size
-    contents = await file.read()
-    if len(contents) > MAX_AVATAR_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Avatar file is too large. Maximum size is 5 MB.",
-        )
-    
-    _validate_image_contents(contents)
-
-    # Optional malware scan
-    _scan_bytes_for_viruses(contents)
-
-    # Write to a temporary file for Cloudinary
-    try:
-        with NamedTemporaryFile(delete=False) as tmp:
-            tmp.write(contents)
-            tmp_path = tmp.name
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to buffer uploaded file",
-        )
-
-    # Upload using your Cloudinary helper
+    timer = UploadTimer()
+    upload = await receive_image_upload(
+        file,
+        timer=timer,
+        max_bytes=MAX_AVATAR_FILE_SIZE,
+        max_dimension=MAX_AVATAR_DIMENSION,
+        too_large_detail="Avatar file is too large. Maximum size is 5 MB.",
+        dimension_detail="Avatar image dimensions are too large.",
+    )
     try:
-        upload_result = upload_avatar(tmp_path)
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to upload avatar",
+        # Optional malware scan
+        _scan_upload_for_viruses(upload.file)
+        stored = await upload_deduplicated(
+            db,
+            upload,
+            kind="avatar",
+            upload_fn=upload_avatar,
+            store_derivative=partial(
+                upload_image_derivative,
+                folder=get_settings().CLOUDINARY_UPLOAD_FOLDER,
+            ),
+            timer=timer,
+            error_detail="Failed to upload avatar",
+            sizes=AVATAR_DERIVATIVE_SIZES,
+            counted=False,
         )
     finally:
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
-
-    if isinstance(upload_result, dict):
-        secure_url = upload_result.get("secure_url")
-    else:
-        secure_url = str(upload_result)
+        upload.close()
 
-    if not secure_url:
+    if stored is None:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Avatar upload did not return a valid URL",
-)
+        )
 
-    provider.avatar_url = secure_url
+    provider.avatar_url = stored.url
+    provider.avatar_thumbnail_url = stored.thumbnail_url
     db.commit()
     db.refresh(provider)
 
-    return {"avatar_url": secure_url}
+    timer.apply(response)
+    return {
+        "avatar_url": provider.avatar_url,
+        "avatar_thumbnail_url": provider.avatar_thumbnail_url,
+    }
 
 
 # -------------------------------------------------------------------
@@ -445,6 +409,7 @@ def update_my_location(
 
     if payload.location is not None:
         current_user.location = payload.location
+        crud.refresh_search_document_for_user(db, current_user.id)
 
     db.commit()
     db.refresh(current_user)
@@ -476,6 +441,7 @@ def list_my_catalog_images(
     response_model=schemas.ProviderCatalogImageOut,
 )
 async def upload_my_catalog_image(
+    response: Response,
     file: UploadFile = File(...),
     caption: Optional[str] = Form(None),
     db: Session = Depends(get_db),
@@ -488,43 +454,30 @@ async def upload_my_catalog_image(
             detail="Invalid image type. Allowed: JPEG, PNG, WEBP.",
         )
 
-    contents = await file.read()
-    if len(contents) > MAX_AVATAR_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Image file is too large. Maximum size is 5 MB.",
-        )
-
-    _validate_image_contents(contents)
-    _scan_bytes_for_viruses(contents)
-
-    # Write to temp file for Cloudinary
-    try:
-        with NamedTemporaryFile(delete=False) as tmp:
-            tmp.write(contents)
-            tmp_path = tmp.name
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to buffer uploaded file",
-        )
-
+    timer = UploadTimer()
+    upload = await receive_image_upload(
+        file,
+        timer=timer,
+        max_bytes=MAX_AVATAR_FILE_SIZE,
+        max_dimension=MAX_AVATAR_DIMENSION,
+        too_large_detail="Image file is too large. Maximum size is 5 MB.",
+        dimension_detail="Avatar image dimensions are too large.",
+    )
     try:
-        # You can tweak folder/name options here if you want
-        upload_result = cloudinary.uploader.upload(tmp_path, folder="bookitgy/catalog")
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to upload image",
+        _scan_upload_for_viruses(upload.file)
+        stored = await upload_deduplicated(
+            db,
+            upload,
+            kind="catalog",
+            upload_fn=upload_catalog_image,
+            store_derivative=partial(upload_image_derivative, folder=CATALOG_FOLDER),
+            timer=timer,
+            error_detail="Failed to upload image",
         )
     finally:
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
+        upload.close()
 
-    image_url = upload_result.get("secure_url") if isinstance(upload_result, dict) else str(upload_result)
-    if not image_url:
+    if stored is None:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Image upload did not return a valid URL",
@@ -533,9 +486,13 @@ async def upload_my_catalog_image(
     item = crud.add_catalog_image_for_provider(
         db,
         provider_id=provider.id,
-        image_url=image_url,
+        image_url=stored.url,
         caption=caption,
+        thumbnail_url=stored.thumbnail_url,
+        medium_url=stored.medium_url,
+        stored_image_id=stored.id,
     )
+    timer.apply(response)
     return item
 
 
@@ -622,12 +579,36 @@ def delete_my_blocked_time(
 # Public provider routes
 # -------------------------------------------------------------------
 
+@router.get("/providers/search")
+async def search_providers(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Ranked provider search with typo tolerance. Matches display name,
+    username, professions, service names, bio and location.
+    """
+    return await db.run_sync(crud.search_providers, q, limit=limit)
+
+
 @router.get("/providers")
-def list_providers(
+async def list_providers(
     profession: Optional[str] = None,
-    db: Session = Depends(get_db),
+    near: Optional[str] = Query(None, description="lat,long to sort providers by distance"),
+    radius_km: Optional[float] = Query(None, gt=0, le=crud.MAX_NEAR_RADIUS_KM),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
-    return crud.list_providers(db, profession=profession)
+    if near is None:
+        return await db.run_sync(crud.list_providers, profession=profession)
+
+    try:
+        point = parse_lat_long(near)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return await db.run_sync(
+        crud.list_providers, profession=profession, near=point, radius_km=radius_km
+    )
 
 
 @router.get("/providers/{provider_id}")
@@ -639,14 +620,14 @@ def get_provider(provider_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/providers/{provider_id}/services")
-def list_provider_services(provider_id: int, db: Session = Depends(get_db)):
+def list_provider_services(provider_id: int, db: Session = Depends(get_read_db)):
     return crud.list_services_for_provider(db, provider_id)
 
 @router.get(
     "/providers/{provider_id}/catalog",
     response_model=List[schemas.ProviderCatalogImageOut],
 )
-def list_provider_catalog(provider_id: int, db: Session = Depends(get_db)):
+def list_provider_catalog(provider_id: int, db: Session = Depends(get_read_db)):
     return crud.list_catalog_images_for_provider(db, provider_id)
 
 
@@ -654,19 +635,19 @@ def list_provider_catalog(provider_id: int, db: Session = Depends(get_db)):
     "/providers/{provider_id}/availability",
     response_model=List[schemas.ProviderAvailabilityDay],
 )
-def get_provider_availability_route(
+async def get_provider_availability_route(
     provider_id: int,
     service_id: int,
     days: int = 14,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Availability for a specific provider + service over the next `days`.
     Used by the client calendar/time slot picker.
     """
     try:
-        availability = crud.get_provider_availability(
-            db,
+        availability = await db.run_sync(
+            crud.get_provider_availability,
             provider_id=provider_id,
             service_id=service_id,
             days=days,
@@ -699,6 +680,10 @@ def update_my_provider_profile(
     if payload.whatsapp is not None:
         current_user.whatsapp = payload.whatsapp
 
+    if payload.location is not None:
+        db.flush()
+        crud.refresh_provider_search_document(db, provider.id)
+
     db.commit()
     db.refresh(updated)
     db.refresh(current_user)
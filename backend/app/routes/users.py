@@ -1,19 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from fastapi import APIRouter, Depends, HTTPException, Response, UploadFile, File, status
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 import traceback
-from io import BytesIO
-import os
-from tempfile import NamedTemporaryFile
+from functools import partial
 
 import cloudinary
-from PIL import Image, UnidentifiedImageError
 
 from app.database import get_db
 from app import crud, schemas, models
 from app.security import get_current_user_from_header
 from app.config import get_settings
-from app.services.cloudinary_service import upload_avatar
+from app.services.cloudinary_service import upload_avatar, upload_image_derivative
+from app.services.uploads import (
+    AVATAR_DERIVATIVE_SIZES,
+    UploadTimer,
+    receive_image_upload,
+    upload_deduplicated,
+)
 
 
 router = APIRouter(tags=["users"])
@@ -37,44 +40,6 @@ MAX_AVATAR_FILE_SIZE = 5 * 1024 * 1024  # 5 MB
 MAX_AVATAR_DIMENSION = 4096
 
 
-def _validate_client_image(contents: bytes) -> None:
-    try:
-        with Image.open(BytesIO(contents)) as img:
-            img_format = (img.format or "").upper()
-            img.verify()
-    except UnidentifiedImageError:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Uploaded file is not a valid image.",
-        )
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Could not read uploaded image.",
-        )
-
-    if img_format not in ALLOWED_AVATAR_FORMATS:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid image format. Allowed: JPEG, PNG, WEBP.",
-        )
-
-    try:
-        with Image.open(BytesIO(contents)) as img_dim:
-            width, height = img_dim.size
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Could not inspect image dimensions.",
-        )
-
-    if width > MAX_AVATAR_DIMENSION or height > MAX_AVATAR_DIMENSION:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Avatar image dimensions are too large.",
-        )
-
-
 @router.get("/users/me")
 def read_users_me(
     current_user: models.User = Depends(get_current_user_from_header),
@@ -151,6 +116,7 @@ def delete_my_account(
 
 @router.post("/users/me/avatar")
 async def upload_my_avatar(
+    response: Response,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user_from_header),
@@ -167,53 +133,46 @@ async def upload_my_avatar(
             detail="Invalid avatar file type. Allowed: JPEG, PNG, WEBP.",
         )
 
-    contents = await file.read()
-    if len(contents) > MAX_AVATAR_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Avatar file is too large. Maximum size is 5 MB.",
-        )
-
-    _validate_client_image(contents)
-
-    # Temporary file for Cloudinary
-    try:
-        with NamedTemporaryFile(delete=False) as tmp:
-            tmp.write(contents)
-            tmp_path = tmp.name
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to buffer uploaded file",
-        )
-
+    timer = UploadTimer()
+    upload = await receive_image_upload(
+        file,
+        timer=timer,
+        max_bytes=MAX_AVATAR_FILE_SIZE,
+        max_dimension=MAX_AVATAR_DIMENSION,
+        too_large_detail="Avatar file is too large. Maximum size is 5 MB.",
+        dimension_detail="Avatar image dimensions are too large.",
+    )
     try:
-        upload_result = upload_avatar(tmp_path)
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to upload avatar",
+        stored = await upload_deduplicated(
+            db,
+            upload,
+            kind="avatar",
+            upload_fn=upload_avatar,
+            store_derivative=partial(
+                upload_image_derivative,
+                folder=settings.CLOUDINARY_UPLOAD_FOLDER,
+            ),
+            timer=timer,
+            error_detail="Failed to upload avatar",
+            sizes=AVATAR_DERIVATIVE_SIZES,
+            counted=False,
         )
     finally:
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
-
-    secure_url = (
-        upload_result.get("secure_url")
-        if isinstance(upload_result, dict)
-        else str(upload_result)
-    )
+        upload.close()
 
-    if not secure_url:
+    if stored is None:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Avatar upload did not return a valid URL",
         )
 
-    current_user.avatar_url = secure_url
+    current_user.avatar_url = stored.url
+    current_user.avatar_thumbnail_url = stored.thumbnail_url
     db.commit()
     db.refresh(current_user)
 
-    return {"avatar_url": secure_url}
+    timer.apply(response)
+    return {
+        "avatar_url": current_user.avatar_url,
+        "avatar_thumbnail_url": current_user.avatar_thumbnail_url,
+    }
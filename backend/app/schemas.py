@@ -412,6 +412,21 @@ class AdminProviderLocationOut(BaseModel):
     location: Optional[str] = None
 
 
+class AdminProviderMapClusterOut(BaseModel):
+    geohash: str
+    count: int
+    lat: float
+    long: float
+
+
+class AdminProviderMapOut(BaseModel):
+    zoom: int
+    precision: int
+    clusters: List[AdminProviderMapClusterOut] = []
+    providers: List[AdminProviderLocationOut] = []
+    truncated: bool = False
+
+
 class AdminProviderCancellationOut(BaseModel):
     provider_id: int
     username: Optional[str] = None
@@ -722,6 +737,7 @@ class MessageAttachmentPayload(BaseModel):
     attachment_type: str = "image"
     file_url: str
     thumbnail_url: Optional[str] = None
+    medium_url: Optional[str] = None
     original_filename: Optional[str] = None
     mime_type: Optional[str] = None
     file_size_bytes: Optional[int] = None
@@ -781,6 +797,7 @@ class MessageAttachmentOut(BaseModel):
     attachment_type: str
     file_url: str
     thumbnail_url: Optional[str] = None
+    medium_url: Optional[str] = None
     original_filename: Optional[str] = None
     mime_type: Optional[str] = None
     file_size_bytes: Optional[int] = None
@@ -812,6 +829,36 @@ class BookingMessagesResponse(BaseModel):
     provider: Optional[BookingChatParticipantOut] = None
     client: Optional[BookingChatParticipantOut] = None
     messages: List[BookingMessageOut] = []
+    has_more: bool = False
+
+
+class ConversationCounterpartOut(BaseModel):
+    user_id: Optional[int] = None
+    username: str = ""
+    avatar_url: Optional[str] = None
+
+
+class ConversationLastMessageOut(BaseModel):
+    id: int
+    sender_user_id: int
+    text: Optional[str] = None
+    message_type: str
+    created_at: datetime
+
+
+class ConversationInboxItemOut(BaseModel):
+    conversation_id: int
+    booking_id: int
+    role: str
+    counterpart: ConversationCounterpartOut
+    last_message: Optional[ConversationLastMessageOut] = None
+    last_message_at: Optional[datetime] = None
+    unread_count: int = 0
+
+
+class ConversationInboxResponse(BaseModel):
+    conversations: List[ConversationInboxItemOut] = []
+    next_cursor: Optional[str] = None
 
 
 class MarkMessagesReadRequest(BaseModel):
@@ -847,6 +894,7 @@ class PushTokenDeactivateRequest(BaseModel):
 
 class NotificationsResponse(BaseModel):
     notifications: List[NotificationOut] = []
+    next_cursor: Optional[str] = None
 
 
 class NotificationUnreadCountResponse(BaseModel):
@@ -866,6 +914,7 @@ class ProviderListItem(BaseModel):
     professions: List[str] = []
     services: List[str] = []
     avatar_url: Optional[str] = None
+    avatar_thumbnail_url: Optional[str] = None
     avg_rating: Optional[float] = None
     rating_count: int = 0
 
@@ -994,6 +1043,8 @@ class ProviderLocationUpdate(BaseModel):
 class ProviderCatalogImageOut(BaseModel):
     id: int
     image_url: str
+    thumbnail_url: Optional[str] = None
+    medium_url: Optional[str] = None
     caption: Optional[str] = None
 
     class Config:
@@ -4,12 +4,14 @@ from typing import Optional
 
 from fastapi import Depends, Header, HTTPException, Request, status
 from jose.exceptions import JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.config import get_settings
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app import crud, models
 from app.auth.jwt import decode_token
+from app.services import read_routing, user_cache
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -35,6 +37,23 @@ def get_current_user_from_header(
     - Looks up the user by email (sub).
     - Optionally enforces token freshness using 'iat' and a max age.
     """
+    return _authenticate(db, request.url.path, authorization)
+
+
+async def get_current_user_async(
+    request: Request,
+    authorization: str = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+) -> models.User:
+    """
+    get_current_user_from_header for async routes: the lookup runs on the
+    request's AsyncSession, so the route doesn't also hold a sync pool
+    connection (or a threadpool thread) just to authenticate.
+    """
+    return await db.run_sync(_authenticate, request.url.path, authorization)
+
+
+def _authenticate(db: Session, path: str, authorization: Optional[str]) -> models.User:
     if not authorization:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -55,7 +74,7 @@ def get_current_user_from_header(
     except JWTError:
         logger.warning(
             "Bearer token decode failed path=%s token_fingerprint=%s",
-            request.url.path,
+            path,
             _token_fingerprint(token),
         )
         raise HTTPException(
@@ -65,7 +84,7 @@ def get_current_user_from_header(
 
     logger.info(
         "Bearer token decode success path=%s sub=%s user_id=%s exp=%s iat=%s aud=%s iss=%s",
-        request.url.path,
+        path,
         payload.get("sub"),
         payload.get("uid"),
         int(payload.get("exp")) if isinstance(payload.get("exp"), (int, float)) else payload.get("exp"),
@@ -83,16 +102,22 @@ def get_current_user_from_header(
             detail="Invalid token payload",
         )
 
+    token_version = payload.get("tv")
+
     user = None
     if user_id:
-        user = crud.get_user_by_id(db, user_id, include_deleted=True)
+        user = user_cache.get_user(db, user_id, token_version)
+        if user is None:
+            generation = user_cache.generation(user_id)
+            user = crud.get_user_by_id(db, user_id, include_deleted=True)
+            user_cache.store_user(user, generation)
     if not user and user_email:
         user = crud.get_user_by_email(db, user_email, include_deleted=True)
 
     if not user:
         logger.warning(
             "Bearer token user lookup failed path=%s sub=%s user_id=%s",
-            request.url.path,
+            path,
             user_email,
             user_id,
         )
@@ -107,13 +132,15 @@ def get_current_user_from_header(
             detail="Invalid or expired token",
         )
 
-    token_version = payload.get("tv")
     if token_version is None or token_version != user.token_version:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
         )
 
+    # Lets read_routing keep this user's reads on the primary after a write.
+    db.info[read_routing.SESSION_USER_KEY] = user.id
+
     # ------------------------------------------------------------------
     # Token freshness check using iat
     # ------------------------------------------------------------------
@@ -0,0 +1,146 @@
+"""
+Scheduled appointment reminders backed by the booking_reminders table.
+
+One row per (booking, offset) is written when a booking is confirmed, with
+`due_at = start_time - offset`. The cron job then only has to read the
+"pending and due" slice of the (status, due_at) index, hand each reminder to
+the push queue and flip it to "sent" in the same transaction, so a reminder
+is queued exactly once no matter how often or how late the job runs.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.push_queue import enqueue_push
+from app.utils import metrics
+from app.utils.time import now_guyana
+
+logger = logging.getLogger(__name__)
+
+BOOKING_REMINDER_BATCH_SIZE = 200
+# A reminder found this long after its due time (scheduler downtime) is
+# skipped rather than sent: "starts in 24 hours" two hours before the
+# appointment is worse than nothing, and the shorter offset covers it.
+BOOKING_REMINDER_MAX_LATENESS = timedelta(minutes=30)
+
+
+def reminder_offsets() -> list[int]:
+    from app.config import get_settings
+
+    return get_settings().BOOKING_REMINDER_OFFSETS_MINUTES
+
+
+def _describe_offset(offset_minutes: int) -> str:
+    if offset_minutes % 60 == 0:
+        hours = offset_minutes // 60
+        return "1 hour" if hours == 1 else f"{hours} hours"
+    return "1 minute" if offset_minutes == 1 else f"{offset_minutes} minutes"
+
+
+def schedule_booking_reminders(
+    db: Session,
+    booking: models.Booking,
+    *,
+    offsets: Optional[Iterable[int]] = None,
+    now: Optional[datetime] = None,
+) -> int:
+    """
+    Add a pending reminder per offset in the caller's transaction. Offsets
+    whose due time has already passed are skipped, as are offsets the
+    booking already has a row for. Returns how many rows were added.
+    """
+    if booking.id is None:
+        db.flush()
+    now = now or now_guyana()
+    offsets = sorted(set(reminder_offsets() if offsets is None else offsets), reverse=True)
+    existing = {
+        offset
+        for (offset,) in db.query(models.BookingReminder.offset_minutes).filter(
+            models.BookingReminder.booking_id == booking.id
+        )
+    }
+    added = 0
+    for offset in offsets:
+        due_at = booking.start_time - timedelta(minutes=offset)
+        if offset in existing or due_at <= now:
+            continue
+        db.add(
+            models.BookingReminder(
+                booking_id=booking.id,
+                offset_minutes=offset,
+                due_at=due_at,
+                status="pending",
+            )
+        )
+        added += 1
+    return added
+
+
+def _claim_due_reminders(db: Session, now: datetime, limit: int):
+    return (
+        db.query(models.BookingReminder, models.Booking, models.Service)
+        .join(models.Booking, models.BookingReminder.booking_id == models.Booking.id)
+        .join(models.Service, models.Booking.service_id == models.Service.id)
+        .filter(
+            models.BookingReminder.status == "pending",
+            models.BookingReminder.due_at <= now,
+        )
+        .order_by(models.BookingReminder.due_at.asc())
+        .limit(limit)
+        .with_for_update(of=models.BookingReminder, skip_locked=True)
+        .all()
+    )
+
+
+def send_due_reminders(db: Session, *, limit: int = BOOKING_REMINDER_BATCH_SIZE) -> int:
+    """
+    Queue pushes for every due reminder, `limit` rows per transaction.
+    Reminders whose booking is no longer confirmed, already started or that
+    are too late to be useful are marked "skipped". Returns how many pushes
+    were queued.
+    """
+    queued = 0
+    while True:
+        now = now_guyana()
+        rows = _claim_due_reminders(db, now, limit)
+        if not rows:
+            return queued
+
+        for reminder, booking, service in rows:
+            reminder.sent_at = now
+            if (
+                booking.status != "confirmed"
+                or booking.start_time <= now
+                or reminder.due_at < now - BOOKING_REMINDER_MAX_LATENESS
+            ):
+                reminder.status = "skipped"
+                metrics.increment("reminders.skipped")
+                continue
+
+            enqueue_push(
+                db,
+                user_id=booking.customer_id,
+                title="Upcoming appointment",
+                body=f"Your {service.name} at "
+                f"{booking.start_time.strftime('%I:%M %p')} starts in "
+                f"{_describe_offset(reminder.offset_minutes)}.",
+                data={
+                    "type": "upcoming_appointment",
+                    "bookingId": booking.id,
+                    "targetScreen": "Appointments",
+                },
+                dedupe_key=f"booking:{booking.id}:reminder:{reminder.offset_minutes}",
+            )
+            reminder.status = "sent"
+            queued += 1
+            metrics.increment("reminders.sent")
+
+        # The status flip and the queued pushes commit together.
+        db.commit()
+        if len(rows) < limit:
+            return queued
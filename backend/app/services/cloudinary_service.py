@@ -6,6 +6,9 @@ from app.config import get_settings
 
 settings = get_settings()
 
+CATALOG_FOLDER = "bookitgy/catalog"
+BOOKING_MESSAGE_FOLDER = "bookitgy/booking_messages"
+
 # Configure Cloudinary once at import time
 cloudinary.config(
     cloud_name=settings.CLOUDINARY_CLOUD_NAME,
@@ -15,10 +18,10 @@ cloudinary.config(
 )
 
 
-def upload_avatar(file_path: str, public_id: Optional[str] = None) -> str:
+def upload_avatar(file, public_id: Optional[str] = None) -> str:
     """
     Upload an avatar image to Cloudinary and return the secure URL.
-    file_path: path to the local file (or tempfile) on disk.
+    file: path to a local file, or an open binary file object.
     public_id: optional stable ID (e.g. provider_{id}_avatar).
     """
     upload_options = {
@@ -29,14 +32,58 @@ def upload_avatar(file_path: str, public_id: Optional[str] = None) -> str:
     if public_id:
         upload_options["public_id"] = public_id
 
-    result = cloudinary.uploader.upload(file_path, **upload_options)
+    result = cloudinary.uploader.upload(file, **upload_options)
     return result["secure_url"]
 
 
-def upload_booking_message_image(file_path: str) -> dict:
-    """Upload a booking chat image attachment to Cloudinary."""
+def upload_catalog_image(file, public_id: Optional[str] = None) -> dict:
+    """Upload a provider catalog image (path or binary file object) to Cloudinary."""
+    upload_options = {"folder": CATALOG_FOLDER}
+    if public_id:
+        upload_options["public_id"] = public_id
+    return cloudinary.uploader.upload(file, **upload_options)
+
+
+def upload_booking_message_image(file) -> dict:
+    """Upload a booking chat image attachment (path or binary file object) to Cloudinary."""
     return cloudinary.uploader.upload(
-        file_path,
-        folder="bookitgy/booking_messages",
+        file,
+        folder=BOOKING_MESSAGE_FOLDER,
         resource_type="image",
     )
+
+
+def upload_image_derivative(
+    file,
+    variant: str,
+    *,
+    folder: str,
+    public_id: Optional[str] = None,
+) -> dict:
+    """
+    Upload a generated WebP rendition (thumbnail/medium) next to its original,
+    under "<folder>/<variant>/". Pass the original's content hash as
+    `public_id` so `destroy_stored_image` can find it again.
+    """
+    upload_options = {
+        "folder": f"{folder}/{variant}",
+        "resource_type": "image",
+        "format": "webp",
+    }
+    if public_id:
+        upload_options["public_id"] = public_id
+    return cloudinary.uploader.upload(file, **upload_options)
+
+
+def destroy_stored_image(public_id: str, variants=()) -> None:
+    """
+    Delete an original asset ("<folder>/<name>") and its renditions
+    ("<folder>/<variant>/<name>") from Cloudinary.
+    """
+    folder, _, name = public_id.rpartition("/")
+    public_ids = [public_id] + [
+        f"{folder}/{variant}/{name}" if folder else f"{variant}/{name}"
+        for variant in variants
+    ]
+    for asset_id in public_ids:
+        cloudinary.uploader.destroy(asset_id, resource_type="image", invalidate=True)
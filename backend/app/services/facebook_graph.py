@@ -0,0 +1,171 @@
+"""
+Facebook user access token verification against the Graph API.
+
+A Facebook sign-in needs two Graph calls: `debug_token` (is the token valid
+and issued to our app?) and `/me` (who is it?). They are independent, so
+on a cache miss `/me` runs on a small thread pool while `debug_token` runs
+in the caller, both over one keep-alive session. A verified profile is then
+cached under a SHA-256 of the token until the `expires_at` debug_token
+reports, capped at FACEBOOK_TOKEN_CACHE_SECONDS so a token revoked on
+Facebook's side stops working here within that window.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import requests
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+CACHE_MAX_ENTRIES = 10_000
+
+
+def _build_http_session(pool_size: int = 10) -> requests.Session:
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip, deflate"})
+    return session
+
+
+def _token_key(app_id: str, user_token: str) -> str:
+    return hashlib.sha256(f"{app_id}:{user_token}".encode()).hexdigest()
+
+
+class FacebookTokenVerifier:
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        *,
+        timeout: float = 10,
+        cache_seconds: Optional[int] = None,
+        session: Optional[requests.Session] = None,
+        clock: Callable[[], float] = time.time,
+        max_workers: int = 8,
+    ) -> None:
+        from app.config import get_settings
+
+        settings = get_settings()
+        self.base_url = (base_url or settings.FACEBOOK_GRAPH_URL).rstrip("/")
+        self.timeout = timeout
+        self.cache_seconds = (
+            settings.FACEBOOK_TOKEN_CACHE_SECONDS if cache_seconds is None else cache_seconds
+        )
+        self.session = session or _build_http_session(pool_size=max_workers * 2)
+        self._clock = clock
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="facebook-graph"
+        )
+        self._cache: dict[str, tuple[dict, float]] = {}
+        self._lock = threading.Lock()
+
+    def verify(self, user_token: str, *, app_id: str, app_secret: str, version: str) -> Optional[dict]:
+        """
+        Return {"id", "name", "email"} for a valid token issued to `app_id`,
+        or None when the token is invalid or Facebook can't be reached.
+        """
+        key = _token_key(app_id, user_token)
+        now = self._clock()
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is not None and now < cached[1]:
+            metrics.increment("facebook_tokens.cache_hits")
+            return dict(cached[0])
+
+        metrics.increment("facebook_tokens.cache_misses")
+        profile_future = self._executor.submit(
+            self._get,
+            f"{self.base_url}/{version}/me",
+            {"fields": "id,name,email", "access_token": user_token},
+        )
+        try:
+            debug_data = self._get(
+                f"{self.base_url}/{version}/debug_token",
+                {"input_token": user_token, "access_token": f"{app_id}|{app_secret}"},
+            ).get("data", {})
+            profile = profile_future.result()
+        except Exception as exc:
+            logger.warning("Facebook token verification failed: %s", exc)
+            metrics.increment("facebook_tokens.errors")
+            return None
+
+        if (
+            not debug_data.get("is_valid")
+            or str(debug_data.get("app_id") or "") != str(app_id)
+            or not debug_data.get("user_id")
+        ):
+            return None
+
+        fb_user_id = profile.get("id") or debug_data.get("user_id")
+        if not fb_user_id:
+            return None
+
+        result = {
+            "id": str(fb_user_id),
+            "name": (profile.get("name") or "").strip(),
+            "email": (profile.get("email") or "").strip().lower() or None,
+        }
+        self._store(key, result, debug_data.get("expires_at"), now)
+        return dict(result)
+
+    def _get(self, url: str, params: dict) -> dict:
+        response = self.session.get(url, params=params, timeout=self.timeout)
+        return response.json() if response.ok else {}
+
+    def _store(self, key: str, result: dict, expires_at, now: float) -> None:
+        if self.cache_seconds <= 0:
+            return
+        expires = now + self.cache_seconds
+        # expires_at is 0 for tokens that don't expire.
+        if expires_at:
+            expires = min(expires, float(expires_at))
+        if expires <= now:
+            return
+        with self._lock:
+            if len(self._cache) >= CACHE_MAX_ENTRIES:
+                self._evict(now)
+            self._cache[key] = (result, expires)
+
+    def _evict(self, now: float) -> None:
+        expired = [key for key, (_, expires) in self._cache.items() if expires <= now]
+        for key in expired:
+            del self._cache[key]
+        if len(self._cache) >= CACHE_MAX_ENTRIES:
+            # Soonest to expire first.
+            by_expiry = sorted(self._cache, key=lambda key: self._cache[key][1])
+            for key in by_expiry[: len(by_expiry) // 2]:
+                del self._cache[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+
+_verifier: Optional[FacebookTokenVerifier] = None
+_verifier_lock = threading.Lock()
+
+
+def get_facebook_verifier() -> FacebookTokenVerifier:
+    global _verifier
+    with _verifier_lock:
+        if _verifier is None:
+            _verifier = FacebookTokenVerifier()
+        return _verifier
+
+
+def set_facebook_verifier(verifier: Optional[FacebookTokenVerifier]) -> None:
+    global _verifier
+    with _verifier_lock:
+        _verifier = verifier
@@ -0,0 +1,154 @@
+"""
+In-process cache of Google's ID token signing keys (JWKS).
+
+Keys are kept for the `Cache-Control: max-age` Google sends (hours), so
+sign-ins verify locally instead of fetching the key set every time. A read
+that lands in the last REFRESH_AHEAD_SECONDS of the lifetime triggers a
+background refresh; a token signed with a `kid` we don't know yet (key
+rotation) forces a refetch, at most once per UNKNOWN_KID_REFETCH_SECONDS.
+Only one fetch runs at a time; concurrent callers wait for it. After a
+failed fetch the last key set keeps being served and nothing is fetched
+again for FETCH_RETRY_SECONDS.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from typing import Callable, Optional
+
+import requests
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_JWKS_URL = "https://www.googleapis.com/oauth2/v3/certs"
+DEFAULT_MAX_AGE_SECONDS = 300
+REFRESH_AHEAD_SECONDS = 300
+UNKNOWN_KID_REFETCH_SECONDS = 30
+FETCH_RETRY_SECONDS = 30
+
+_MAX_AGE_RE = re.compile(r"(?:^|,)\s*max-age\s*=\s*(\d+)", re.IGNORECASE)
+
+
+def parse_max_age(cache_control: Optional[str], default: int = DEFAULT_MAX_AGE_SECONDS) -> int:
+    match = _MAX_AGE_RE.search(cache_control or "")
+    return int(match.group(1)) if match else default
+
+
+class JWKSCache:
+    def __init__(
+        self,
+        url: str = GOOGLE_JWKS_URL,
+        *,
+        timeout: float = 10,
+        session: Optional[requests.Session] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.url = url
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self._clock = clock
+        self._keys: dict[str, dict] = {}
+        self._expires_at = 0.0
+        self._fetched_at: Optional[float] = None
+        self._retry_at = 0.0
+        self._fetch_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._refreshing = False
+
+    def get_key(self, kid: str) -> Optional[dict]:
+        """Return the JWK for `kid`, fetching the key set only when needed."""
+        now = self._clock()
+        key = self._keys.get(kid)
+        if key is not None and now < max(self._expires_at, self._retry_at):
+            if self._refresh_due(now):
+                self._refresh_in_background()
+            metrics.increment("google_jwks.hits")
+            return key
+
+        metrics.increment("google_jwks.misses")
+        fetched_at = self._fetched_at
+        with self._fetch_lock:
+            # Another caller may have fetched while we waited for the lock.
+            if self._fetched_at == fetched_at and self._should_fetch(kid):
+                self._fetch()
+            key = self._keys.get(kid)
+        return key
+
+    def _refresh_due(self, now: float) -> bool:
+        return now >= self._expires_at - REFRESH_AHEAD_SECONDS and now >= self._retry_at
+
+    def _should_fetch(self, kid: str) -> bool:
+        now = self._clock()
+        if now < self._retry_at:
+            # Backing off after a failed fetch.
+            return False
+        if now >= self._expires_at:
+            return True
+        # Unknown kid while the cache is fresh: refetch, but don't let
+        # made-up kids turn every request into a call to Google.
+        return kid not in self._keys and (
+            self._fetched_at is None or now - self._fetched_at >= UNKNOWN_KID_REFETCH_SECONDS
+        )
+
+    def _fetch(self) -> None:
+        try:
+            response = self.session.get(self.url, timeout=self.timeout)
+            response.raise_for_status()
+            payload = response.json()
+        except Exception as exc:
+            # Keep serving what we have; an expired set still verifies
+            # tokens signed by keys Google hasn't rotated out yet.
+            logger.warning("Google JWKS fetch failed: %s", exc)
+            metrics.increment("google_jwks.fetch_errors")
+            self._fetched_at = self._clock()
+            self._retry_at = self._fetched_at + FETCH_RETRY_SECONDS
+            return
+
+        keys = {key["kid"]: key for key in payload.get("keys", []) if key.get("kid")}
+        now = self._clock()
+        self._keys = keys
+        self._fetched_at = now
+        self._expires_at = now + parse_max_age(response.headers.get("Cache-Control"))
+        self._retry_at = 0.0
+        metrics.increment("google_jwks.fetches")
+
+    def _refresh_in_background(self) -> None:
+        with self._state_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run() -> None:
+            try:
+                with self._fetch_lock:
+                    if self._refresh_due(self._clock()):
+                        self._fetch()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="google-jwks-refresh", daemon=True).start()
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_google_jwks: Optional[JWKSCache] = None
+_google_jwks_lock = threading.Lock()
+
+
+def get_google_jwks() -> JWKSCache:
+    global _google_jwks
+    with _google_jwks_lock:
+        if _google_jwks is None:
+            _google_jwks = JWKSCache()
+        return _google_jwks
+
+
+def set_google_jwks(cache: Optional[JWKSCache]) -> None:
+    global _google_jwks
+    with _google_jwks_lock:
+        _google_jwks = cache
@@ -0,0 +1,132 @@
+"""
+Downscaled WebP renditions of uploaded images.
+
+Resizing and encoding run in a process pool so large uploads don't hold the
+GIL in the API workers; the renditions are then stored next to the original
+through cloudinary_service. Derivatives are best effort: a failure is logged
+and the caller keeps the original URL.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from io import BytesIO
+from typing import Callable, Optional
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# name -> longest edge in pixels
+DERIVATIVE_SIZES = {
+    "thumbnail": 320,
+    "medium": 1080,
+}
+WEBP_QUALITY = 80
+# Largest image (in pixels) decoded for renditions.
+MAX_RENDER_PIXELS = 20_000_000
+
+_pool: Optional[Executor] = None
+
+
+def render_webp(data: bytes, max_edge: int, quality: int = WEBP_QUALITY) -> bytes:
+    """Return `data` re-encoded as WebP, scaled to fit within `max_edge`."""
+    with Image.open(BytesIO(data)) as img:
+        # Checked here rather than via Image.MAX_IMAGE_PIXELS, which is
+        # process-wide and would change Pillow's limit for every caller.
+        if img.width * img.height > MAX_RENDER_PIXELS:
+            raise ValueError(f"Image too large to render ({img.width}x{img.height})")
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        out = BytesIO()
+        img.save(out, format="WEBP", quality=quality, method=4)
+    return out.getvalue()
+
+
+def render_derivatives(data: bytes, sizes: dict[str, int]) -> dict[str, bytes]:
+    return {name: render_webp(data, max_edge) for name, max_edge in sizes.items()}
+
+
+def _get_pool() -> Optional[Executor]:
+    global _pool
+    from app.config import get_settings
+
+    workers = get_settings().IMAGE_DERIVATIVE_WORKERS
+    if workers <= 0:
+        return None
+    if _pool is None:
+        # spawn: forking a process that runs the scheduler and DB pools is unsafe.
+        _pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_derivative_pool(wait: bool = True) -> None:
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait)
+
+
+async def render_derivative_payloads(
+    data: bytes,
+    *,
+    sizes: Optional[dict[str, int]] = None,
+) -> dict[str, bytes]:
+    """Render each size off the event loop. Returns {} if rendering fails."""
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            _get_pool(), render_derivatives, data, sizes or DERIVATIVE_SIZES
+        )
+    except Exception:
+        logger.exception("Image derivative rendering failed")
+        return {}
+
+
+async def store_derivatives(
+    rendered: dict[str, bytes],
+    store: Callable[[BytesIO, str], object],
+    *,
+    sizes: Optional[dict[str, int]] = None,
+) -> dict[str, Optional[str]]:
+    """
+    Store each rendition with `store(fileobj, name)`, which returns an upload
+    result (dict with secure_url, or a URL string). Returns {name: url or None}.
+    """
+    urls: dict[str, Optional[str]] = {name: None for name in sizes or DERIVATIVE_SIZES}
+    loop = asyncio.get_running_loop()
+
+    async def _store(name: str, payload: bytes):
+        fileobj = BytesIO(payload)
+        fileobj.name = f"{name}.webp"
+        try:
+            result = await loop.run_in_executor(None, store, fileobj, name)
+        except Exception:
+            logger.exception("Storing %s derivative failed", name)
+            return name, None
+        if isinstance(result, dict):
+            return name, result.get("secure_url")
+        return name, str(result) if result else None
+
+    for name, url in await asyncio.gather(*(_store(n, p) for n, p in rendered.items())):
+        urls[name] = url
+    return urls
+
+
+async def create_derivatives(
+    data: bytes,
+    store: Callable[[BytesIO, str], object],
+    *,
+    sizes: Optional[dict[str, int]] = None,
+) -> dict[str, Optional[str]]:
+    """Render and store each size; see store_derivatives. Returns {name: url or None}."""
+    sizes = sizes or DERIVATIVE_SIZES
+    rendered = await render_derivative_payloads(data, sizes=sizes)
+    return await store_derivatives(rendered, store, sizes=sizes)
@@ -0,0 +1,126 @@
+"""
+Password hashing (pbkdf2_sha256) off the request threads.
+
+The KDF runs in a small process pool so concurrent logins hash in parallel
+instead of queueing on the GIL, with at most PASSWORD_HASH_QUEUE_PER_WORKER
+calls in flight per worker; beyond that callers wait. A pool broken by a
+dead worker is replaced. PASSWORD_HASH_ROUNDS sets the work factor. A
+stored hash made with different rounds still verifies, and
+`verify_and_update` returns a replacement hash so login can upgrade it.
+"""
+from __future__ import annotations
+
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Optional
+
+from passlib.context import CryptContext
+
+from app.utils import metrics
+
+# In-flight jobs allowed per pool worker before callers block.
+PASSWORD_HASH_QUEUE_PER_WORKER = 4
+
+_pool: Optional[Executor] = None
+_pool_slots: Optional[threading.BoundedSemaphore] = None
+_pool_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def build_context(rounds: int) -> CryptContext:
+    # min == max == default: any other round count "needs update".
+    return CryptContext(
+        schemes=["pbkdf2_sha256"],
+        deprecated="auto",
+        pbkdf2_sha256__default_rounds=rounds,
+        pbkdf2_sha256__min_rounds=rounds,
+        pbkdf2_sha256__max_rounds=rounds,
+    )
+
+
+def _hash(password: str, rounds: int) -> str:
+    return build_context(rounds).hash(password)
+
+
+def _verify_and_update(password: str, hashed: str, rounds: int) -> tuple[bool, Optional[str]]:
+    return build_context(rounds).verify_and_update(password, hashed)
+
+
+def _settings():
+    from app.config import get_settings
+
+    return get_settings()
+
+
+def _get_pool() -> tuple[Optional[Executor], Optional[threading.BoundedSemaphore]]:
+    global _pool, _pool_slots
+    workers = _settings().PASSWORD_HASH_WORKERS
+    if workers <= 0:
+        return None, None
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that runs the scheduler and DB pools is unsafe.
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _pool_slots = threading.BoundedSemaphore(workers * PASSWORD_HASH_QUEUE_PER_WORKER)
+        return _pool, _pool_slots
+
+
+def _discard_pool(pool: Executor) -> None:
+    """Drop `pool` so the next call starts a fresh one (unless already replaced)."""
+    global _pool, _pool_slots
+    with _pool_lock:
+        if _pool is not pool:
+            return
+        _pool, _pool_slots = None, None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _run(fn, *args):
+    for attempt in range(2):
+        pool, slots = _get_pool()
+        if pool is None:
+            return fn(*args)
+        try:
+            with slots:
+                return pool.submit(fn, *args).result()
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); the executor refuses all
+            # further work, so replace it and retry once.
+            metrics.increment("passwords.pool_broken")
+            _discard_pool(pool)
+    # Broken twice in a row: hash here rather than fail the request.
+    return fn(*args)
+
+
+def hash_password(password: str) -> str:
+    metrics.increment("passwords.hashed")
+    return _run(_hash, password, _settings().PASSWORD_HASH_ROUNDS)
+
+
+def verify_and_update(password: str, hashed: Optional[str]) -> tuple[bool, Optional[str]]:
+    """
+    Check `password` against `hashed`. Returns (matches, new_hash), where
+    new_hash is set when the stored hash uses outdated parameters.
+    """
+    if not hashed:
+        return False, None
+    metrics.increment("passwords.verified")
+    try:
+        return _run(_verify_and_update, password, hashed, _settings().PASSWORD_HASH_ROUNDS)
+    except ValueError:
+        # Not a hash passlib recognises.
+        return False, None
+
+
+def shutdown_password_pool(wait: bool = True) -> None:
+    global _pool, _pool_slots
+    with _pool_lock:
+        pool, _pool, _pool_slots = _pool, None, None
+    if pool is not None:
+        pool.shutdown(wait=wait)
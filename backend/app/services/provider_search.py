@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from collections import defaultdict
+from typing import Optional
+
+from sqlalchemy import event, func, literal_column, or_, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.utils.time import now_guyana
+
+logger = logging.getLogger(__name__)
+
+# Minimum trigram similarity for a query word to match a document word. On
+# PostgreSQL the `%>` filter reads `pg_trgm.word_similarity_threshold`
+# (default 0.6), so search_provider_ids sets it to this value for its
+# transaction; that keeps SQLite and PostgreSQL tolerating the same typos.
+TRIGRAM_SIMILARITY_THRESHOLD = 0.3
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Documents rewritten in a session, applied to the in-process index once
+# (and only if) that session commits.
+_PENDING_KEY = "provider_search_pending"
+
+
+def _tokenize(value: Optional[str]) -> list[str]:
+    return TOKEN_PATTERN.findall((value or "").lower())
+
+
+def _trigrams(token: str) -> set[str]:
+    # Same padding as pg_trgm: two leading blanks, one trailing blank.
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _trigram_similarity(left: set[str], right: set[str]) -> float:
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+def _is_postgres(db: Session) -> bool:
+    bind = db.get_bind()
+    return bind.dialect.name == "postgresql"
+
+
+def build_search_document(db: Session, provider: models.Provider) -> str:
+    """Flatten the searchable provider fields into one normalized string."""
+    user = provider.user or (
+        db.query(models.User).filter(models.User.id == provider.user_id).first()
+    )
+    professions = [
+        row.name
+        for row in db.query(models.ProviderProfession.name)
+        .filter(models.ProviderProfession.provider_id == provider.id)
+        .all()
+    ]
+    services = [
+        row.name
+        for row in db.query(models.Service.name)
+        .filter(
+            models.Service.provider_id == provider.id,
+            models.Service.is_active.is_(True),
+        )
+        .all()
+    ]
+
+    parts = [
+        getattr(user, "username", None),
+        getattr(user, "location", None),
+        provider.bio,
+        *professions,
+        *services,
+    ]
+    return " ".join(_tokenize(" ".join(part for part in parts if part)))
+
+
+class _InvertedIndex:
+    """In-process trigram index used when the database has no pg_trgm."""
+
+    def __init__(self) -> None:
+        self._doc_tokens: dict[int, set[str]] = {}
+        self._token_docs: dict[str, set[int]] = defaultdict(set)
+        self._trigram_tokens: dict[str, set[str]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def upsert(self, provider_id: int, document: str) -> None:
+        with self._lock:
+            self._remove_locked(provider_id)
+            tokens = set(_tokenize(document))
+            self._doc_tokens[provider_id] = tokens
+            for token in tokens:
+                self._token_docs[token].add(provider_id)
+                for gram in _trigrams(token):
+                    self._trigram_tokens[gram].add(token)
+
+    def remove(self, provider_id: int) -> None:
+        with self._lock:
+            self._remove_locked(provider_id)
+
+    def _remove_locked(self, provider_id: int) -> None:
+        for token in self._doc_tokens.pop(provider_id, set()):
+            docs = self._token_docs.get(token)
+            if docs is None:
+                continue
+            docs.discard(provider_id)
+            if not docs:
+                del self._token_docs[token]
+                for gram in _trigrams(token):
+                    tokens = self._trigram_tokens.get(gram)
+                    if tokens is not None:
+                        tokens.discard(token)
+                        if not tokens:
+                            del self._trigram_tokens[gram]
+
+    def search(self, query: str, limit: int) -> list[tuple[int, float]]:
+        query_tokens = _tokenize(query)
+        if not query_tokens:
+            return []
+
+        scores: dict[int, float] = defaultdict(float)
+        with self._lock:
+            for query_token in query_tokens:
+                query_grams = _trigrams(query_token)
+                candidates: set[str] = set()
+                for gram in query_grams:
+                    candidates |= self._trigram_tokens.get(gram, set())
+
+                best_per_doc: dict[int, float] = {}
+                for token in candidates:
+                    if token.startswith(query_token):
+                        similarity = 1.0
+                    else:
+                        similarity = _trigram_similarity(query_grams, _trigrams(token))
+                    if similarity < TRIGRAM_SIMILARITY_THRESHOLD:
+                        continue
+                    for provider_id in self._token_docs.get(token, ()):
+                        if similarity > best_per_doc.get(provider_id, 0.0):
+                            best_per_doc[provider_id] = similarity
+
+                for provider_id, similarity in best_per_doc.items():
+                    scores[provider_id] += similarity
+
+        ranked = sorted(
+            ((provider_id, score / len(query_tokens)) for provider_id, score in scores.items()),
+            key=lambda item: (-item[1], item[0]),
+        )
+        return ranked[:limit]
+
+
+_indexes: dict[str, _InvertedIndex] = {}
+# Reentrant: building an index commits its backfill session, which runs the
+# after_commit hook below on the same thread.
+_indexes_lock = threading.RLock()
+
+
+def _index_key(db: Session) -> str:
+    # Without the driver, so the sync and async engines share one index.
+    url = db.get_bind().url
+    return str(url.set(drivername=url.get_backend_name()))
+
+
+def _load_index(db: Session) -> _InvertedIndex:
+    key = _index_key(db)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            return index
+
+        # Its own session, so a search request never commits the caller's.
+        with Session(bind=db.get_bind()) as backfill:
+            missing = (
+                backfill.query(models.Provider)
+                .outerjoin(
+                    models.ProviderSearchDocument,
+                    models.ProviderSearchDocument.provider_id == models.Provider.id,
+                )
+                .filter(models.ProviderSearchDocument.id.is_(None))
+                .all()
+            )
+            for provider in missing:
+                _write_document(backfill, provider)
+            if missing:
+                backfill.commit()
+
+            index = _InvertedIndex()
+            for provider_id, document in backfill.query(
+                models.ProviderSearchDocument.provider_id,
+                models.ProviderSearchDocument.document,
+            ).all():
+                index.upsert(provider_id, document)
+
+        _indexes[key] = index
+        return index
+
+
+def _write_document(db: Session, provider: models.Provider) -> str:
+    document = build_search_document(db, provider)
+    row = (
+        db.query(models.ProviderSearchDocument)
+        .filter(models.ProviderSearchDocument.provider_id == provider.id)
+        .first()
+    )
+    if row:
+        row.document = document
+        row.updated_at = now_guyana()
+    else:
+        db.add(
+            models.ProviderSearchDocument(
+                provider_id=provider.id,
+                document=document,
+            )
+        )
+    return document
+
+
+def refresh_provider_search_document(db: Session, provider_id: int) -> None:
+    """
+    Rebuild the search document for one provider.
+
+    The row is added to the caller's transaction; the caller is responsible
+    for committing. The in-process index picks the document up on commit.
+    """
+    provider = db.query(models.Provider).filter(models.Provider.id == provider_id).first()
+    if not provider:
+        return
+
+    document = _write_document(db, provider)
+    db.info.setdefault(_PENDING_KEY, {})[provider.id] = document
+
+
+def refresh_search_document_for_user(db: Session, user_id: int) -> None:
+    provider_id = (
+        db.query(models.Provider.id)
+        .filter(models.Provider.user_id == user_id)
+        .scalar()
+    )
+    if provider_id:
+        refresh_provider_search_document(db, provider_id)
+
+
+def search_provider_ids(db: Session, query: str, limit: int = 20) -> list[tuple[int, float]]:
+    """Return `(provider_id, score)` pairs ranked best-first."""
+    normalized = " ".join(_tokenize(query))
+    if not normalized:
+        return []
+
+    if not _is_postgres(db):
+        return _load_index(db).search(normalized, limit)
+
+    # SET LOCAL equivalent: `%>` keeps using the trigram index, with our
+    # threshold instead of the server's 0.6 default.
+    db.execute(
+        select(
+            func.set_config(
+                "pg_trgm.word_similarity_threshold",
+                str(TRIGRAM_SIMILARITY_THRESHOLD),
+                True,
+            )
+        )
+    )
+    document = models.ProviderSearchDocument.document
+    tsvector = func.to_tsvector(literal_column("'simple'"), document)
+    tsquery = func.plainto_tsquery(literal_column("'simple'"), normalized)
+    score = func.word_similarity(normalized, document) + func.ts_rank(tsvector, tsquery)
+    rows = (
+        db.query(models.ProviderSearchDocument.provider_id, score.label("score"))
+        .filter(or_(document.op("%>")(normalized), tsvector.op("@@")(tsquery)))
+        .order_by(score.desc(), models.ProviderSearchDocument.provider_id.asc())
+        .limit(limit)
+        .all()
+    )
+    return [(row.provider_id, float(row.score or 0.0)) for row in rows]
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_documents(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    # Under the lock, so an index being loaded concurrently either already
+    # read these rows or gets them applied once it is published.
+    with _indexes_lock:
+        index = _indexes.get(_index_key(session))
+        if index is None:
+            return
+        for provider_id, document in pending.items():
+            index.upsert(provider_id, document)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_documents(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
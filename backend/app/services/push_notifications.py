@@ -2,17 +2,30 @@ from __future__ import annotations
 
 import logging
 import re
-from typing import Iterable, Optional
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Sequence
 
 import requests
+import requests.adapters
+from sqlalchemy import func, or_
 from sqlalchemy.orm import Session
 
 from app import models
+from app.utils import metrics
 from app.utils.time import now_guyana
 
 logger = logging.getLogger(__name__)
 
-EXPO_PUSH_URL = "https://exp.host/--/api/v2/push/send"
+# Expo rejects push requests with more than 100 messages and receipt
+# requests with more than 1000 ids.
+EXPO_PUSH_BATCH_SIZE = 100
+EXPO_RECEIPT_BATCH_SIZE = 1000
+# Receipts are usually ready within 15 minutes and kept by Expo for 24 hours.
+PUSH_RECEIPT_MIN_AGE = timedelta(minutes=15)
+PUSH_RECEIPT_MAX_AGE = timedelta(hours=24)
+PUSH_RECEIPT_RECHECK_INTERVAL = timedelta(minutes=15)
 EXPO_TOKEN_PATTERN = re.compile(r"^(ExponentPushToken|ExpoPushToken)\[[^\]]+\]$")
 
 
@@ -98,94 +111,344 @@ def deactivate_push_token(
     return len(rows)
 
 
-def _active_tokens_for_user(db: Session, user_id: int) -> list[models.PushToken]:
+def _active_tokens_for_users(db: Session, user_ids: Iterable[int]) -> list[models.PushToken]:
     return (
         db.query(models.PushToken)
-        .filter(models.PushToken.user_id == user_id, models.PushToken.is_active.is_(True))
+        .filter(
+            models.PushToken.user_id.in_(list(user_ids)),
+            models.PushToken.is_active.is_(True),
+        )
+        .order_by(models.PushToken.id)
         .all()
     )
 
 
-def _deactivate_tokens(db: Session, tokens: Iterable[str]) -> None:
+def _deactivate_tokens(db: Session, tokens: Iterable[str]) -> int:
     tokens = [t for t in tokens if t]
     if not tokens:
-        return
+        return 0
     rows = db.query(models.PushToken).filter(models.PushToken.expo_push_token.in_(tokens)).all()
     for row in rows:
         row.is_active = False
     if rows:
         logger.info("Deactivating %s Expo push token(s)", len(rows))
+        metrics.increment("push.tokens_deactivated", len(rows))
         db.commit()
+    return len(rows)
 
 
-def send_push_to_user(
-    db: Session,
-    *,
-    user_id: int,
-    title: str,
-    body: str,
-    data: Optional[dict] = None,
-) -> None:
-    rows = _active_tokens_for_user(db, user_id)
-    logger.warning("ACTIVE PUSH TOKENS user_id=%s count=%s", user_id, len(rows))
-    if not rows:
-        return
+@dataclass
+class PushNotification:
+    user_id: int
+    title: str
+    body: str
+    data: Optional[dict] = None
 
-    invalid_tokens: list[str] = []
-    for row in rows:
-        token = row.expo_push_token
-        if not _is_valid_expo_token(token):
-            invalid_tokens.append(token)
-            continue
 
-        masked_token = _mask_expo_token(token)
-
-        payload = {
-            "to": token,
-            "sound": "default",
-            "title": title,
-            "body": body,
-            "data": data or {},
-            "channelId": "default",
-            "priority": "high",
-        }
-        logger.warning("Sending Expo push to token=%s", masked_token)
-        logger.warning(
-            "Expo push payload user_id=%s title=%s body=%s data=%s channelId=%s priority=%s sound=%s",
-            user_id,
-            payload["title"],
-            payload["body"],
-            payload["data"],
-            payload["channelId"],
-            payload["priority"],
-            payload["sound"],
-        )
+def _build_http_session(pool_size: int = 10) -> requests.Session:
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip, deflate"})
+    return session
+
+
+def _error_ticket(error: str, message: str) -> dict:
+    return {"status": "error", "message": message, "details": {"error": error}}
+
+
+class ExpoPushClient:
+    """
+    Sends Expo push messages in batches of up to EXPO_PUSH_BATCH_SIZE per
+    request over one keep-alive HTTP session. `send` returns one ticket per
+    message, in order; a failed request yields error tickets for its batch.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        *,
+        timeout: Optional[float] = None,
+        receipts_url: Optional[str] = None,
+        session: Optional[requests.Session] = None,
+        batch_size: int = EXPO_PUSH_BATCH_SIZE,
+    ) -> None:
+        from app.config import get_settings
+
+        settings = get_settings()
+        self.url = url or settings.EXPO_PUSH_URL
+        # https://exp.host/--/api/v2/push/send -> .../push/getReceipts
+        self.receipts_url = receipts_url or self.url.rsplit("/", 1)[0] + "/getReceipts"
+        self.timeout = timeout or settings.EXPO_PUSH_TIMEOUT_SECONDS
+        self.batch_size = batch_size
+        self.session = session or _build_http_session()
+
+    def send(self, messages: Sequence[dict]) -> list[dict]:
+        tickets: list[dict] = []
+        for start in range(0, len(messages), self.batch_size):
+            tickets.extend(self._send_batch(messages[start:start + self.batch_size]))
+        return tickets
+
+    def _send_batch(self, batch: Sequence[dict]) -> list[dict]:
         try:
-            response = requests.post(EXPO_PUSH_URL, json=payload, timeout=5)
-            status_code = getattr(response, "status_code", None)
-            logger.warning("Expo push response status_code=%s token=%s", status_code, masked_token)
-            raise_for_status = getattr(response, "raise_for_status", None)
-            if callable(raise_for_status):
-                raise_for_status()
+            response = self.session.post(self.url, json=list(batch), timeout=self.timeout)
+            response.raise_for_status()
             result = response.json() if response.content else {}
-            logger.warning("Expo push parsed response token=%s response=%s", masked_token, result)
-            data_items = []
-            if isinstance(result, dict):
-                payload_data = result.get("data")
-                if isinstance(payload_data, list):
-                    data_items = payload_data
-                elif isinstance(payload_data, dict):
-                    data_items = [payload_data]
-
-            for item in data_items:
-                if not isinstance(item, dict) or item.get("status") != "error":
-                    continue
-                details = item.get("details") or {}
-                if details.get("error") == "DeviceNotRegistered":
-                    invalid_tokens.append(token)
-                    break
         except Exception as exc:
-            logger.warning("Push send failed for user_id=%s token=%s error=%s", user_id, token, exc)
+            logger.warning("Expo push batch of %s failed: %s", len(batch), exc)
+            return [_error_ticket("RequestFailed", str(exc)) for _ in batch]
+
+        data = result.get("data") if isinstance(result, dict) else None
+        if isinstance(data, dict):
+            data = [data]
+        if not isinstance(data, list) or len(data) != len(batch):
+            logger.warning("Unexpected Expo push response for batch of %s: %s", len(batch), result)
+            return [_error_ticket("InvalidResponse", "Unexpected Expo response") for _ in batch]
+        return [item if isinstance(item, dict) else {} for item in data]
+
+    def get_receipts(self, ticket_ids: Sequence[str]) -> dict[str, dict]:
+        """Return {ticket id: receipt} for the receipts Expo has ready."""
+        receipts: dict[str, dict] = {}
+        for start in range(0, len(ticket_ids), EXPO_RECEIPT_BATCH_SIZE):
+            batch = list(ticket_ids[start:start + EXPO_RECEIPT_BATCH_SIZE])
+            try:
+                response = self.session.post(
+                    self.receipts_url,
+                    json={"ids": batch},
+                    timeout=self.timeout,
+                )
+                response.raise_for_status()
+                result = response.json() if response.content else {}
+            except Exception as exc:
+                logger.warning("Expo receipt request for %s ticket(s) failed: %s", len(batch), exc)
+                continue
+            data = result.get("data") if isinstance(result, dict) else None
+            if isinstance(data, dict):
+                receipts.update(
+                    (ticket_id, receipt)
+                    for ticket_id, receipt in data.items()
+                    if isinstance(receipt, dict)
+                )
+        return receipts
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_expo_client: Optional[ExpoPushClient] = None
+_expo_client_lock = threading.Lock()
+
+
+def get_expo_client() -> ExpoPushClient:
+    global _expo_client
+    with _expo_client_lock:
+        if _expo_client is None:
+            _expo_client = ExpoPushClient()
+        return _expo_client
+
+
+def set_expo_client(client: Optional[ExpoPushClient]) -> None:
+    global _expo_client
+    with _expo_client_lock:
+        _expo_client = client
+
+
+def _expo_message(token: str, notification: PushNotification) -> dict:
+    return {
+        "to": token,
+        "sound": "default",
+        "title": notification.title,
+        "body": notification.body,
+        "data": notification.data or {},
+        "channelId": "default",
+        "priority": "high",
+    }
+
+
+def send_push_to_users(
+    db: Session,
+    notifications: Iterable[PushNotification],
+) -> list[tuple[PushNotification, models.PushToken, dict]]:
+    """
+    Deliver `notifications` to every active token of their users, batching
+    across users. Tokens Expo reports as DeviceNotRegistered are deactivated.
+    Returns (notification, token row, Expo ticket) for every message sent.
+    """
+    notifications = list(notifications)
+    user_ids = {notification.user_id for notification in notifications}
+    if not user_ids:
+        return []
 
+    tokens_by_user: dict[int, list[models.PushToken]] = {}
+    for row in _active_tokens_for_users(db, user_ids):
+        tokens_by_user.setdefault(row.user_id, []).append(row)
+
+    invalid_tokens: set[str] = set()
+    targets: list[tuple[PushNotification, models.PushToken]] = []
+    messages: list[dict] = []
+    for notification in notifications:
+        user_tokens = tokens_by_user.get(notification.user_id, ())
+        metrics.observe("push.fanout_tokens_per_user", len(user_tokens))
+        for row in user_tokens:
+            if not _is_valid_expo_token(row.expo_push_token):
+                invalid_tokens.add(row.expo_push_token)
+                continue
+            targets.append((notification, row))
+            messages.append(_expo_message(row.expo_push_token, notification))
+
+    tickets = get_expo_client().send(messages) if messages else []
+    results = [
+        (notification, row, ticket)
+        for (notification, row), ticket in zip(targets, tickets)
+    ]
+    metrics.increment("push.messages_sent", len(messages))
+    pending_tickets: list[models.PushTicket] = []
+    for _notification, row, ticket in results:
+        if ticket.get("status") != "error":
+            if ticket.get("id"):
+                pending_tickets.append(
+                    models.PushTicket(
+                        ticket_id=ticket["id"],
+                        user_id=row.user_id,
+                        expo_push_token=row.expo_push_token,
+                    )
+                )
+            continue
+        metrics.increment("push.ticket_errors")
+        details = ticket.get("details") or {}
+        if details.get("error") == "DeviceNotRegistered":
+            invalid_tokens.add(row.expo_push_token)
+        else:
+            logger.warning(
+                "Expo push error user_id=%s token=%s error=%s",
+                row.user_id,
+                _mask_expo_token(row.expo_push_token),
+                ticket.get("message"),
+            )
+
+    logger.debug(
+        "Expo push sent notifications=%s messages=%s invalid=%s",
+        len(notifications),
+        len(messages),
+        len(invalid_tokens),
+    )
+    if pending_tickets:
+        db.add_all(pending_tickets)
+        db.commit()
     if invalid_tokens:
         _deactivate_tokens(db, invalid_tokens)
+    return results
+
+
+def process_push_receipts(db: Session, *, limit: int = EXPO_RECEIPT_BATCH_SIZE) -> dict:
+    """
+    Fetch receipts for tickets old enough to have one, deactivate tokens whose
+    receipt says DeviceNotRegistered, and drop settled or expired tickets.
+
+    Works through every due ticket `limit` at a time. Tickets Expo has no
+    receipt for yet are stamped `checked_at` and skipped for
+    PUSH_RECEIPT_RECHECK_INTERVAL, so they don't hold back newer ones.
+    """
+    now = now_guyana()
+    summary = {"checked": 0, "ok": 0, "errors": 0, "expired": 0, "deactivated": 0}
+    while True:
+        tickets = (
+            db.query(models.PushTicket)
+            .filter(
+                models.PushTicket.created_at <= now - PUSH_RECEIPT_MIN_AGE,
+                or_(
+                    models.PushTicket.checked_at.is_(None),
+                    models.PushTicket.checked_at <= now - PUSH_RECEIPT_RECHECK_INTERVAL,
+                ),
+            )
+            .order_by(models.PushTicket.created_at.asc())
+            .limit(limit)
+            .all()
+        )
+        if not tickets:
+            break
+        _process_receipt_batch(db, tickets, now, summary)
+        if len(tickets) < limit:
+            break
+    metrics.increment("push.receipt_errors", summary["errors"])
+    return summary
+
+
+def _process_receipt_batch(
+    db: Session,
+    tickets: list[models.PushTicket],
+    now: datetime,
+    summary: dict,
+) -> None:
+    summary["checked"] += len(tickets)
+    receipts = get_expo_client().get_receipts([ticket.ticket_id for ticket in tickets])
+    invalid_tokens: set[str] = set()
+    settled_ids: list[int] = []
+    not_ready_ids: list[int] = []
+    for ticket in tickets:
+        receipt = receipts.get(ticket.ticket_id)
+        if receipt is None:
+            if ticket.created_at <= now - PUSH_RECEIPT_MAX_AGE:
+                summary["expired"] += 1
+                settled_ids.append(ticket.id)
+            else:
+                not_ready_ids.append(ticket.id)
+            continue
+        settled_ids.append(ticket.id)
+        if receipt.get("status") != "error":
+            summary["ok"] += 1
+            continue
+        summary["errors"] += 1
+        details = receipt.get("details") or {}
+        if details.get("error") == "DeviceNotRegistered":
+            invalid_tokens.add(ticket.expo_push_token)
+        else:
+            logger.warning(
+                "Expo push receipt error user_id=%s error=%s message=%s",
+                ticket.user_id,
+                details.get("error"),
+                receipt.get("message"),
+            )
+
+    if settled_ids:
+        db.query(models.PushTicket).filter(
+            models.PushTicket.id.in_(settled_ids)
+        ).delete(synchronize_session=False)
+    if not_ready_ids:
+        db.query(models.PushTicket).filter(
+            models.PushTicket.id.in_(not_ready_ids)
+        ).update({models.PushTicket.checked_at: now}, synchronize_session=False)
+    if settled_ids or not_ready_ids:
+        db.commit()
+    summary["deactivated"] += _deactivate_tokens(db, invalid_tokens)
+
+
+def prune_stale_push_tokens(db: Session, *, max_idle_days: int) -> int:
+    """Delete tokens whose device hasn't re-registered in `max_idle_days`."""
+    cutoff = now_guyana() - timedelta(days=max_idle_days)
+    last_seen = func.coalesce(models.PushToken.last_seen_at, models.PushToken.created_at)
+    pruned = (
+        db.query(models.PushToken)
+        .filter(last_seen < cutoff)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    if pruned:
+        logger.info("Pruned %s stale Expo push token(s)", pruned)
+        metrics.increment("push.tokens_pruned", pruned)
+    return pruned
+
+
+def send_push_to_user(
+    db: Session,
+    *,
+    user_id: int,
+    title: str,
+    body: str,
+    data: Optional[dict] = None,
+) -> None:
+    send_push_to_users(
+        db,
+        [PushNotification(user_id=user_id, title=title, body=body, data=data)],
+    )
@@ -0,0 +1,372 @@
+"""
+Durable push notification queue backed by the push_jobs table.
+
+Callers `enqueue_push` inside their own transaction, so a push is queued if
+and only if the change that triggered it commits. Worker threads then claim
+due jobs with a conditional status UPDATE (plus FOR UPDATE SKIP LOCKED on
+PostgreSQL, so several API processes can share the queue), deliver them in batches through
+push_notifications.send_push_to_users and retry transient failures with
+exponential backoff. A dedupe key (e.g. "booking:42:cancelled") makes
+enqueueing idempotent, and each user is limited to
+PUSH_USER_RATE_LIMIT_PER_MINUTE deliveries; the excess is deferred.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import random
+import threading
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.push_notifications import PushNotification, send_push_to_users
+from app.utils import metrics
+from app.utils.time import now_guyana
+
+logger = logging.getLogger(__name__)
+
+PUSH_JOB_BATCH_SIZE = 100
+PUSH_JOB_MAX_ATTEMPTS = 6
+PUSH_JOB_BACKOFF_BASE_SECONDS = 30
+PUSH_JOB_BACKOFF_MAX_SECONDS = 60 * 60
+# Jobs left "processing" this long (worker died mid-send) are claimed again.
+PUSH_JOB_CLAIM_TIMEOUT = timedelta(minutes=5)
+PUSH_RATE_LIMIT_WINDOW = timedelta(minutes=1)
+# Expo errors worth retrying; anything else (e.g. DeviceNotRegistered) is final.
+TRANSIENT_PUSH_ERRORS = {"RequestFailed", "InvalidResponse", "MessageRateExceeded"}
+
+_WAKE_KEY = "push_queue_wake"
+
+
+def _insert_ignoring_duplicates(db: Session, values: dict) -> bool:
+    table = models.PushJob.__table__
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    stmt = insert(table).values(**values).on_conflict_do_nothing(index_elements=["dedupe_key"])
+    return db.execute(stmt).rowcount == 1
+
+
+def enqueue_push(
+    db: Session,
+    *,
+    user_id: int,
+    title: str,
+    body: str,
+    data: Optional[dict] = None,
+    dedupe_key: Optional[str] = None,
+) -> bool:
+    """
+    Queue a push in the caller's transaction; it is delivered after commit.
+    Returns False if a job with `dedupe_key` was already queued.
+    """
+    now = now_guyana()
+    queued = _insert_ignoring_duplicates(
+        db,
+        {
+            "user_id": user_id,
+            "title": title,
+            "body": body,
+            "data": json.dumps(data or {}),
+            "dedupe_key": dedupe_key,
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+        },
+    )
+    if queued:
+        db.info[_WAKE_KEY] = True
+        metrics.increment("push.jobs_enqueued")
+    else:
+        metrics.increment("push.jobs_deduplicated")
+    return queued
+
+
+def _backoff(attempts: int) -> timedelta:
+    delay = min(PUSH_JOB_BACKOFF_MAX_SECONDS, PUSH_JOB_BACKOFF_BASE_SECONDS * 2 ** (attempts - 1))
+    return timedelta(seconds=delay + random.uniform(0, delay * 0.1))
+
+
+def _claim_due_jobs(db: Session, limit: int) -> list[models.PushJob]:
+    now = now_guyana()
+    due = (
+        (models.PushJob.status == "pending") & (models.PushJob.next_attempt_at <= now)
+    ) | (
+        (models.PushJob.status == "processing")
+        & (models.PushJob.locked_at <= now - PUSH_JOB_CLAIM_TIMEOUT)
+    )
+    candidates = (
+        db.query(models.PushJob.id, models.PushJob.status, models.PushJob.locked_at)
+        .filter(due)
+        .order_by(models.PushJob.next_attempt_at.asc())
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    # SKIP LOCKED keeps PostgreSQL workers apart; the conditional UPDATE is
+    # what makes a claim exclusive everywhere else (SQLite ignores FOR
+    # UPDATE), since only one worker can move a row off the state it read.
+    claimed_ids = []
+    for job_id, status, locked_at in candidates:
+        claimed = (
+            db.query(models.PushJob)
+            .filter(
+                models.PushJob.id == job_id,
+                models.PushJob.status == status,
+                models.PushJob.locked_at.is_(None)
+                if locked_at is None
+                else models.PushJob.locked_at == locked_at,
+            )
+            .update({"status": "processing", "locked_at": now}, synchronize_session=False)
+        )
+        if claimed == 1:
+            claimed_ids.append(job_id)
+    db.commit()
+    if not claimed_ids:
+        return []
+    return (
+        db.query(models.PushJob)
+        .filter(models.PushJob.id.in_(claimed_ids))
+        .populate_existing()
+        .order_by(models.PushJob.next_attempt_at.asc())
+        .all()
+    )
+
+
+def _recent_sends_by_user(db: Session, user_ids: set[int]) -> dict[int, int]:
+    since = now_guyana() - PUSH_RATE_LIMIT_WINDOW
+    rows = (
+        db.query(models.PushJob.user_id, func.count(models.PushJob.id))
+        .filter(
+            models.PushJob.user_id.in_(user_ids),
+            models.PushJob.status == "sent",
+            models.PushJob.sent_at >= since,
+        )
+        .group_by(models.PushJob.user_id)
+        .all()
+    )
+    return {user_id: count for user_id, count in rows}
+
+
+def _retry_or_fail(job: models.PushJob, error: str) -> None:
+    job.attempts += 1
+    job.last_error = error[:500]
+    job.locked_at = None
+    if job.attempts >= PUSH_JOB_MAX_ATTEMPTS:
+        job.status = "failed"
+        metrics.increment("push.jobs_failed")
+        logger.warning("Push job %s failed after %s attempts: %s", job.id, job.attempts, error)
+        return
+    job.status = "pending"
+    job.next_attempt_at = now_guyana() + _backoff(job.attempts)
+    metrics.increment("push.jobs_retried")
+
+
+def process_push_jobs(db: Session, *, limit: int = PUSH_JOB_BATCH_SIZE) -> int:
+    """Claim and deliver up to `limit` due jobs. Returns how many were claimed."""
+    from app.config import get_settings
+
+    jobs = _claim_due_jobs(db, limit)
+    if not jobs:
+        return 0
+
+    rate_limit = get_settings().PUSH_USER_RATE_LIMIT_PER_MINUTE
+    sent_counts = _recent_sends_by_user(db, {job.user_id for job in jobs})
+    now = now_guyana()
+    deliver: list[tuple[models.PushJob, PushNotification]] = []
+    for job in jobs:
+        if rate_limit > 0 and sent_counts.get(job.user_id, 0) >= rate_limit:
+            # Deferred, not failed: doesn't count as an attempt.
+            job.status = "pending"
+            job.locked_at = None
+            job.next_attempt_at = now + PUSH_RATE_LIMIT_WINDOW
+            metrics.increment("push.jobs_rate_limited")
+            continue
+        sent_counts[job.user_id] = sent_counts.get(job.user_id, 0) + 1
+        deliver.append(
+            (
+                job,
+                PushNotification(
+                    user_id=job.user_id,
+                    title=job.title,
+                    body=job.body,
+                    data=json.loads(job.data) if job.data else None,
+                ),
+            )
+        )
+    db.commit()
+
+    if deliver:
+        try:
+            results = send_push_to_users(db, [notification for _job, notification in deliver])
+        except Exception as exc:
+            logger.exception("Push delivery batch failed")
+            db.rollback()
+            for job, _notification in deliver:
+                _retry_or_fail(job, str(exc))
+            db.commit()
+            return len(jobs)
+
+        tickets_by_notification: dict[int, list[dict]] = {}
+        for notification, _row, ticket in results:
+            tickets_by_notification.setdefault(id(notification), []).append(ticket)
+
+        sent_at = now_guyana()
+        for job, notification in deliver:
+            tickets = tickets_by_notification.get(id(notification), [])
+            errors = [
+                (ticket.get("details") or {}).get("error")
+                for ticket in tickets
+                if ticket.get("status") == "error"
+            ]
+            if tickets and len(errors) == len(tickets) and all(
+                error in TRANSIENT_PUSH_ERRORS for error in errors
+            ):
+                _retry_or_fail(job, ", ".join(sorted(set(errors))))
+                continue
+            # Delivered to at least one device (or the user has none left):
+            # retrying would duplicate the push on devices that got it.
+            job.status = "sent"
+            job.sent_at = sent_at
+            job.locked_at = None
+            job.last_error = ", ".join(sorted({e for e in errors if e})) or None
+            metrics.increment("push.jobs_sent")
+        db.commit()
+
+    return len(jobs)
+
+
+def prune_push_jobs(db: Session, *, older_than: timedelta = timedelta(days=7)) -> int:
+    cutoff = now_guyana() - older_than
+    pruned = (
+        db.query(models.PushJob)
+        .filter(
+            models.PushJob.status.in_(("sent", "failed")),
+            models.PushJob.created_at < cutoff,
+        )
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return pruned
+
+
+class PushQueueWorker:
+    """Threads that drain the queue, waking on enqueue or every poll interval."""
+
+    def __init__(self, session_factory, *, threads: int, poll_seconds: float) -> None:
+        self._session_factory = session_factory
+        self._thread_count = threads
+        self._poll_seconds = poll_seconds
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        for index in range(self._thread_count):
+            thread = threading.Thread(
+                target=self._run,
+                name=f"push-queue-{index}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def stop(self, wait: bool = True) -> None:
+        self._stopping.set()
+        self._wake.set()
+        if wait:
+            for thread in self._threads:
+                thread.join(timeout=self._poll_seconds + 10)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            claimed = 0
+            db = self._session_factory()
+            try:
+                claimed = process_push_jobs(db)
+            except Exception:
+                logger.exception("Push queue worker iteration failed")
+            finally:
+                db.close()
+            if not claimed:
+                self._wake.wait(self._poll_seconds)
+                self._wake.clear()
+
+
+_worker: Optional[PushQueueWorker] = None
+_worker_lock = threading.Lock()
+
+
+def start_push_worker() -> None:
+    """Start the delivery threads (PUSH_DISPATCH_MODE=background only)."""
+    global _worker
+    from app.config import get_settings
+    from app.database import SessionLocal
+
+    settings = get_settings()
+    if settings.PUSH_DISPATCH_MODE == "inline":
+        return
+    with _worker_lock:
+        if _worker is not None:
+            return
+        _worker = PushQueueWorker(
+            SessionLocal,
+            threads=settings.PUSH_QUEUE_WORKERS,
+            poll_seconds=settings.PUSH_QUEUE_POLL_SECONDS,
+        )
+        _worker.start()
+
+
+def stop_push_worker(wait: bool = True) -> None:
+    global _worker
+    with _worker_lock:
+        worker, _worker = _worker, None
+    if worker is not None:
+        worker.stop(wait=wait)
+
+
+def drain_push_queue(bind) -> int:
+    """Deliver everything currently due using a fresh session on `bind`."""
+    total = 0
+    db = Session(bind=bind, expire_on_commit=False)
+    try:
+        while True:
+            claimed = process_push_jobs(db)
+            total += claimed
+            if claimed < PUSH_JOB_BATCH_SIZE:
+                return total
+    finally:
+        db.close()
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_after_commit(session: Session) -> None:
+    if not session.info.pop(_WAKE_KEY, False):
+        return
+    from app.config import get_settings
+
+    if get_settings().PUSH_DISPATCH_MODE == "inline":
+        try:
+            drain_push_queue(session.get_bind())
+        except Exception:
+            logger.exception("Inline push queue drain failed")
+        return
+    worker = _worker
+    if worker is not None:
+        worker.notify()
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_wake(session: Session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_WAKE_KEY, None)
@@ -0,0 +1,161 @@
+"""
+Per-request SQL statement counting and N+1 detection.
+
+QueryStatsMiddleware gives each HTTP request a QueryStats (via a
+contextvar, which follows the request into threadpool dependencies and the
+async engine's greenlets); a cursor-level listener on every Engine adds
+each statement's fingerprint and duration to it. Then:
+
+- outside prod (QUERY_STATS_HEADERS) responses carry `X-Query-Count` and
+  `Server-Timing: db;dur=<ms>`;
+- requests over QUERY_COUNT_LOG_THRESHOLD statements, or repeating one
+  fingerprint QUERY_REPEAT_LOG_THRESHOLD times (the N+1 shape), are logged
+  with their most repeated fingerprints.
+
+`count_queries()` collects every statement run in the process while it is
+open; the `query_budget` test fixture uses it.
+"""
+from __future__ import annotations
+
+import contextlib
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_IN_LIST_RE = re.compile(r"\bIN\s*\((?:[^()]*)\)", re.IGNORECASE)
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+
+
+def fingerprint(statement: str) -> str:
+    """`statement` with literals and IN lists collapsed, for grouping."""
+    normalized = _WHITESPACE_RE.sub(" ", statement).strip()
+    normalized = _STRING_RE.sub("?", normalized)
+    normalized = _NUMBER_RE.sub("?", normalized)
+    return _IN_LIST_RE.sub("IN (...)", normalized)
+
+
+class QueryStats:
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, duration: float) -> None:
+        key = fingerprint(statement)
+        with self._lock:
+            self.count += 1
+            self.duration += duration
+            self.fingerprints[key] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Fingerprints run at least `threshold` times, most repeated first."""
+        with self._lock:
+            return [(key, n) for key, n in self.fingerprints.most_common() if n >= threshold]
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+_collectors: list[QueryStats] = []
+_collectors_lock = threading.Lock()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_stats_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_stats_started", None)
+    duration = time.perf_counter() - started if started is not None else 0.0
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, duration)
+    if _collectors:
+        with _collectors_lock:
+            collectors = list(_collectors)
+        for collector in collectors:
+            collector.record(statement, duration)
+
+
+@contextlib.contextmanager
+def count_queries() -> Iterator[QueryStats]:
+    """Collect every statement executed in this process inside the block."""
+    stats = QueryStats()
+    with _collectors_lock:
+        _collectors.append(stats)
+    try:
+        yield stats
+    finally:
+        with _collectors_lock:
+            _collectors.remove(stats)
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware tracking the SQL each HTTP request runs."""
+
+    def __init__(self, app, *, headers=None, count_threshold=None, repeat_threshold=None) -> None:
+        from app.config import get_settings
+
+        settings = get_settings()
+        self.app = app
+        self.headers = settings.QUERY_STATS_HEADERS if headers is None else headers
+        self.count_threshold = (
+            settings.QUERY_COUNT_LOG_THRESHOLD if count_threshold is None else count_threshold
+        )
+        self.repeat_threshold = (
+            settings.QUERY_REPEAT_LOG_THRESHOLD if repeat_threshold is None else repeat_threshold
+        )
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_with_stats(message) -> None:
+            if message["type"] == "http.response.start" and self.headers:
+                headers = list(message.get("headers") or [])
+                headers.append((b"x-query-count", str(stats.count).encode()))
+                headers.append(
+                    (b"server-timing", f"db;dur={stats.duration * 1000:.1f}".encode())
+                )
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current.reset(token)
+            self._report(scope, stats)
+
+    def _report(self, scope, stats: QueryStats) -> None:
+        metrics.observe("db.queries_per_request", stats.count)
+        repeated = stats.repeated(self.repeat_threshold)
+        if stats.count <= self.count_threshold and not repeated:
+            return
+        metrics.increment("db.query_heavy_requests")
+        logger.warning(
+            "%s %s ran %s SQL statements in %.1f ms; repeated: %s",
+            scope.get("method"),
+            scope.get("path"),
+            stats.count,
+            stats.duration * 1000,
+            "; ".join(f"{n}x {key[:200]}" for key, n in repeated[:3]) or "none",
+        )
@@ -0,0 +1,362 @@
+"""
+Token-bucket rate limiting for the auth and other expensive endpoints.
+
+Each RateLimitRule matches a method + path and keys its buckets by client
+IP (taken from X-Forwarded-For when the peer is one of TRUSTED_PROXIES)
+or, for authenticated routes, by the bearer token's user id. A request
+that finds its bucket empty gets a 429 with Retry-After before it touches
+the database or the password KDF.
+
+Two backends are available:
+
+- "memory": buckets live in this process (tests, single-worker dev).
+- "database": buckets live in the rate_limit_buckets table and are updated
+  with one atomic upsert, so every API worker shares the same limits.
+
+RATE_LIMITS overrides rules by name, e.g. "login=5/60,availability=off".
+"""
+from __future__ import annotations
+
+import ipaddress
+import json
+import logging
+import math
+import re
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from sqlalchemy import case, func
+from starlette.concurrency import run_in_threadpool
+
+from app import models
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+MEMORY_BACKEND_MAX_BUCKETS = 50_000
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    name: str
+    methods: frozenset
+    path: str  # route template, e.g. "/providers/{provider_id}/availability"
+    capacity: int
+    period_seconds: float
+    key: str = "ip"  # "ip" or "user" (falls back to ip when unauthenticated)
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.capacity / self.period_seconds
+
+    @property
+    def pattern(self) -> re.Pattern:
+        return re.compile("^" + re.sub(r"\{[^/]+\}", "[^/]+", self.path) + "$")
+
+
+DEFAULT_RULES = (
+    RateLimitRule("login", frozenset({"POST"}), "/auth/login", 10, 60),
+    RateLimitRule("login_by_email", frozenset({"POST"}), "/auth/login_by_email", 10, 60),
+    RateLimitRule("forgot_password", frozenset({"POST"}), "/auth/forgot-password", 5, 300),
+    RateLimitRule("google", frozenset({"POST"}), "/auth/google", 20, 60),
+    RateLimitRule(
+        "availability",
+        frozenset({"GET"}),
+        "/providers/{provider_id}/availability",
+        60,
+        60,
+        key="user",
+    ),
+)
+
+
+def parse_rule_overrides(raw: str, rules=DEFAULT_RULES) -> list[RateLimitRule]:
+    """Apply "name=capacity/period_seconds" or "name=off" overrides to `rules`."""
+    overrides = {}
+    for item in (raw or "").split(","):
+        if not item.strip():
+            continue
+        name, _, value = item.partition("=")
+        overrides[name.strip()] = value.strip().lower()
+
+    unknown = set(overrides) - {rule.name for rule in rules}
+    if unknown:
+        raise ValueError(f"Unknown rate limit rule(s): {', '.join(sorted(unknown))}")
+
+    result = []
+    for rule in rules:
+        value = overrides.get(rule.name)
+        if value is None:
+            result.append(rule)
+            continue
+        if value == "off":
+            continue
+        capacity, _, period = value.partition("/")
+        result.append(replace(rule, capacity=int(capacity), period_seconds=float(period)))
+    return result
+
+
+@dataclass
+class Decision:
+    allowed: bool
+    retry_after: float = 0.0
+
+
+class InMemoryRateLimitBackend:
+    name = "memory"
+
+    def __init__(self, clock=time.monotonic) -> None:
+        self._clock = clock
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, rule: RateLimitRule) -> Decision:
+        now = self._clock()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (rule.capacity, now))
+            tokens = min(rule.capacity, tokens + (now - updated) * rule.refill_per_second)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > MEMORY_BACKEND_MAX_BUCKETS:
+                self._evict(now)
+        if allowed:
+            return Decision(True)
+        return Decision(False, (1 - tokens) / rule.refill_per_second)
+
+    def _evict(self, now: float) -> None:
+        # Oldest first; an idle bucket is as good as a full one.
+        idle = sorted(self._buckets.items(), key=lambda item: item[1][1])
+        for key, _ in idle[: len(idle) // 2]:
+            del self._buckets[key]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class DatabaseRateLimitBackend:
+    name = "database"
+
+    def __init__(self, session_factory=None, clock=time.time) -> None:
+        if session_factory is None:
+            from app.database import SessionLocal
+
+            session_factory = SessionLocal
+        self._session_factory = session_factory
+        self._clock = clock
+
+    def consume(self, key: str, rule: RateLimitRule) -> Decision:
+        table = models.RateLimitBucket.__table__
+        now = self._clock()
+        db = self._session_factory()
+        try:
+            if db.get_bind().dialect.name == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+
+                least = func.least
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+
+                least = func.min
+
+            stmt = insert(table).values(
+                key=key, tokens=rule.capacity - 1, allowed=True, refreshed_at=now
+            )
+            available = least(
+                rule.capacity,
+                table.c.tokens + (now - table.c.refreshed_at) * rule.refill_per_second,
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["key"],
+                set_={
+                    "tokens": case((available >= 1, available - 1), else_=available),
+                    "allowed": available >= 1,
+                    "refreshed_at": now,
+                },
+            ).returning(table.c.tokens, table.c.allowed)
+            tokens, allowed = db.execute(stmt).one()
+            db.commit()
+        finally:
+            db.close()
+        if allowed:
+            return Decision(True)
+        return Decision(False, (1 - tokens) / rule.refill_per_second)
+
+
+def prune_rate_limit_buckets(db, *, older_than_seconds: float = 24 * 60 * 60) -> int:
+    cutoff = time.time() - older_than_seconds
+    pruned = (
+        db.query(models.RateLimitBucket)
+        .filter(models.RateLimitBucket.refreshed_at < cutoff)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return pruned
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def _configured_backend() -> str:
+    from app.config import get_settings
+    from app.database import is_postgres
+
+    backend = get_settings().RATE_LIMIT_BACKEND
+    if backend:
+        return backend
+    return "database" if is_postgres else "memory"
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            backend = _configured_backend()
+            _backend = (
+                DatabaseRateLimitBackend() if backend == "database" else InMemoryRateLimitBackend()
+            )
+        return _backend
+
+
+def set_backend(backend) -> None:
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def parse_trusted_proxies(raw: str):
+    """TRUSTED_PROXIES as a list of networks, or None for "*" (trust any peer)."""
+    networks = []
+    for item in (raw or "").split(","):
+        item = item.strip()
+        if item == "*":
+            return None
+        if item:
+            networks.append(ipaddress.ip_network(item, strict=False))
+    return networks
+
+
+def _is_trusted(address: str, trusted) -> bool:
+    if trusted is None:
+        return True
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted)
+
+
+def _client_ip(scope, trusted=()) -> str:
+    """
+    The caller's address. Behind trusted proxies this is the right-most
+    X-Forwarded-For hop that isn't itself a trusted proxy; anything left of
+    that could have been sent by the client.
+    """
+    client = scope.get("client")
+    address = client[0] if client else "unknown"
+    if not _is_trusted(address, trusted):
+        return address
+
+    forwarded = []
+    for name, value in scope.get("headers") or ():
+        if name == b"x-forwarded-for":
+            forwarded.extend(hop.strip() for hop in value.decode("latin-1").split(","))
+    for hop in reversed([hop for hop in forwarded if hop]):
+        address = hop
+        if not _is_trusted(hop, trusted):
+            break
+    return address
+
+
+def _user_id(scope) -> Optional[str]:
+    for name, value in scope.get("headers") or ():
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return None
+            from app.auth.jwt import decode_token
+
+            try:
+                uid = decode_token(token.strip()).get("uid")
+            except Exception:
+                return None
+            return str(uid) if uid is not None else None
+    return None
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying `rules` before the request reaches a route."""
+
+    def __init__(self, app, rules=None, backend=None, trusted_proxies=None) -> None:
+        from app.config import get_settings
+
+        settings = get_settings()
+        self.app = app
+        if rules is None:
+            rules = (
+                parse_rule_overrides(settings.RATE_LIMITS) if settings.RATE_LIMIT_ENABLED else []
+            )
+        if trusted_proxies is None:
+            trusted_proxies = settings.TRUSTED_PROXIES
+        self._rules = [(rule, rule.pattern) for rule in rules]
+        self._backend = backend
+        self._trusted_proxies = parse_trusted_proxies(trusted_proxies)
+
+    def _match(self, scope) -> Optional[RateLimitRule]:
+        method = scope.get("method")
+        path = scope.get("path", "")
+        for rule, pattern in self._rules:
+            if method in rule.methods and pattern.match(path):
+                return rule
+        return None
+
+    async def __call__(self, scope, receive, send) -> None:
+        rule = self._match(scope) if scope["type"] == "http" else None
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        subject = None
+        if rule.key == "user":
+            user_id = _user_id(scope)
+            subject = f"user:{user_id}" if user_id else None
+        subject = subject or f"ip:{_client_ip(scope, self._trusted_proxies)}"
+        key = f"{rule.name}:{subject}"
+
+        backend = self._backend or get_backend()
+        try:
+            if isinstance(backend, InMemoryRateLimitBackend):
+                decision = backend.consume(key, rule)
+            else:
+                decision = await run_in_threadpool(backend.consume, key, rule)
+        except Exception:
+            # Fail open: a limiter outage shouldn't take logins down with it.
+            logger.exception("Rate limit check failed for %s", rule.name)
+            await self.app(scope, receive, send)
+            return
+
+        if decision.allowed:
+            await self.app(scope, receive, send)
+            return
+
+        metrics.increment("rate_limit.throttled")
+        metrics.increment(f"rate_limit.throttled.{rule.name}")
+        retry_after = max(1, math.ceil(decision.retry_after))
+        body = json.dumps({"detail": "Too many requests. Please try again later."}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(retry_after).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
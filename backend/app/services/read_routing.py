@@ -0,0 +1,166 @@
+"""
+Decides whether a read-only request may use the read replica.
+
+get_read_db / get_async_read_db (app.database) hand out a replica session
+unless:
+
+- no replica is configured (DATABASE_READ_URL is empty);
+- the caller committed a write in the last DATABASE_READ_STICKY_SECONDS,
+  so they read their own writes from the primary. Writers are tracked per
+  process: get_current_user_from_header tags the session with the user id
+  and a commit that flushed changes records it;
+- the replica is more than DATABASE_READ_MAX_LAG_SECONDS behind, or the
+  lag check failed. Lag is measured at most every
+  DATABASE_READ_LAG_CHECK_SECONDS.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+SESSION_USER_KEY = "read_routing.user_id"
+_WROTE_KEY = "read_routing.wrote"
+MAX_TRACKED_WRITERS = 50_000
+
+_POSTGRES_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+_recent_writes: dict[int, float] = {}
+_writes_lock = threading.Lock()
+
+
+def record_write(user_id: int, now: Optional[float] = None) -> None:
+    now = time.monotonic() if now is None else now
+    with _writes_lock:
+        _recent_writes[user_id] = now
+        if len(_recent_writes) > MAX_TRACKED_WRITERS:
+            _prune_writes(now)
+
+
+def _prune_writes(now: float) -> None:
+    from app.config import get_settings
+
+    cutoff = now - get_settings().DATABASE_READ_STICKY_SECONDS
+    for user_id in [uid for uid, at in _recent_writes.items() if at < cutoff]:
+        del _recent_writes[user_id]
+
+
+def wrote_recently(user_id: Optional[int], now: Optional[float] = None) -> bool:
+    if user_id is None:
+        return False
+    from app.config import get_settings
+
+    with _writes_lock:
+        written_at = _recent_writes.get(user_id)
+    if written_at is None:
+        return False
+    now = time.monotonic() if now is None else now
+    return now - written_at < get_settings().DATABASE_READ_STICKY_SECONDS
+
+
+def clear() -> None:
+    with _writes_lock:
+        _recent_writes.clear()
+
+
+@event.listens_for(Session, "after_flush")
+def _note_write(session: Session, flush_context) -> None:
+    if session.new or session.dirty or session.deleted:
+        session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _record_committed_write(session: Session) -> None:
+    if session.info.pop(_WROTE_KEY, False):
+        user_id = session.info.get(SESSION_USER_KEY)
+        if user_id is not None:
+            record_write(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_write(session: Session) -> None:
+    session.info.pop(_WROTE_KEY, None)
+
+
+class ReplicaLagMonitor:
+    """Caches the replica's replay lag; None means unknown (check failed)."""
+
+    def __init__(self, engine, *, check_interval: float, clock: Callable[[], float] = time.monotonic):
+        self._engine = engine
+        self._check_interval = check_interval
+        self._clock = clock
+        self._lag: Optional[float] = None
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def needs_check(self) -> bool:
+        return self._checked_at is None or self._clock() - self._checked_at >= self._check_interval
+
+    def check(self) -> Optional[float]:
+        with self._lock:
+            if not self.needs_check():
+                return self._lag
+            try:
+                if self._engine.dialect.name == "postgresql":
+                    with self._engine.connect() as conn:
+                        lag = float(conn.execute(_POSTGRES_LAG_SQL).scalar() or 0)
+                else:
+                    lag = 0.0
+            except Exception as exc:
+                logger.warning("Read replica lag check failed: %s", exc)
+                metrics.increment("db.read.lag_check_errors")
+                lag = None
+            self._lag = lag
+            self._checked_at = self._clock()
+            if lag is not None:
+                metrics.observe("db.read.replica_lag_seconds", lag)
+            return lag
+
+    def lag(self) -> Optional[float]:
+        return self.check() if self.needs_check() else self._lag
+
+
+def use_replica(user_id: Optional[int], monitor: Optional[ReplicaLagMonitor]) -> bool:
+    """True when this read may go to the replica; records why when it can't."""
+    if monitor is None:
+        return False
+    from app.config import get_settings
+
+    if wrote_recently(user_id):
+        metrics.increment("db.read.primary.recent_write")
+        return False
+    lag = monitor.lag()
+    if lag is None or lag > get_settings().DATABASE_READ_MAX_LAG_SECONDS:
+        metrics.increment("db.read.primary.replica_lagging")
+        return False
+    metrics.increment("db.read.replica")
+    return True
+
+
+def request_user_id(request) -> Optional[int]:
+    """The `uid` of the request's bearer token, without verifying the user."""
+    authorization = request.headers.get("authorization") or ""
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    from app.auth.jwt import decode_token
+
+    try:
+        uid = decode_token(token.strip()).get("uid")
+    except Exception:
+        return None
+    try:
+        return int(uid)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,231 @@
+"""
+Per-user pub/sub for pushing chat messages and notifications to connected
+clients (see GET /events/stream).
+
+Events are queued on the SQLAlchemy session with `publish_after_commit` and
+only fan out once the surrounding transaction commits, so subscribers never
+see rows that were rolled back.
+
+Two backends are available:
+
+- "memory": fan-out within this process only (tests, single-worker dev).
+- "postgres": events are sent with pg_notify and every worker LISTENs on the
+  same channel, then fans out to its own local subscribers.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import select
+import threading
+from typing import Any, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+PG_CHANNEL = "bookitgy_events"
+_PENDING_KEY = "realtime_pending_events"
+
+
+def user_channel(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+class Subscription:
+    """A single connected client. Safe to deliver to from any thread."""
+
+    def __init__(self, broker: "InMemoryBroker", channel: str, loop: asyncio.AbstractEventLoop):
+        self.broker = broker
+        self.channel = channel
+        self._loop = loop
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=256)
+
+    def deliver(self, payload: dict) -> None:
+        self._loop.call_soon_threadsafe(self._put, payload)
+
+    def _put(self, payload: dict) -> None:
+        if self._queue.full():
+            # Slow consumer: drop the oldest event rather than grow unbounded.
+            self._queue.get_nowait()
+        self._queue.put_nowait(payload)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class InMemoryBroker:
+    name = "memory"
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscribers: dict[str, set[Subscription]] = {}
+
+    def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(self, channel, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if not subscribers:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                self._subscribers.pop(subscription.channel, None)
+
+    def subscriber_count(self, channel: str) -> int:
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+    def _fan_out(self, channel: str, payload: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.deliver(payload)
+            except RuntimeError:
+                # The subscriber's event loop has shut down.
+                self.unsubscribe(subscription)
+
+    def publish(self, bind, channel: str, payload: dict) -> None:
+        self._fan_out(channel, payload)
+
+
+class PostgresBroker(InMemoryBroker):
+    """Cross-worker delivery via PostgreSQL LISTEN/NOTIFY."""
+
+    name = "postgres"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._listener: Optional[threading.Thread] = None
+        self._listener_lock = threading.Lock()
+
+    def subscribe(self, channel: str) -> Subscription:
+        self._ensure_listener()
+        return super().subscribe(channel)
+
+    def publish(self, bind, channel: str, payload: dict) -> None:
+        message = json.dumps({"channel": channel, "payload": payload}, default=str)
+        with bind.connect() as conn:
+            conn.execute(text("SELECT pg_notify(:pg_channel, :message)"), {
+                "pg_channel": PG_CHANNEL,
+                "message": message,
+            })
+            conn.commit()
+
+    def _ensure_listener(self) -> None:
+        with self._listener_lock:
+            if self._listener and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(
+                target=self._listen_forever,
+                name="realtime-pg-listener",
+                daemon=True,
+            )
+            self._listener.start()
+
+    def _listen_forever(self) -> None:
+        from app.database import engine
+
+        while True:
+            raw = None
+            try:
+                raw = engine.raw_connection()
+                dbapi_conn = raw.driver_connection
+                dbapi_conn.autocommit = True
+                cursor = dbapi_conn.cursor()
+                cursor.execute(f"LISTEN {PG_CHANNEL}")
+                while True:
+                    if select.select([dbapi_conn], [], [], 30) == ([], [], []):
+                        continue
+                    dbapi_conn.poll()
+                    while dbapi_conn.notifies:
+                        notify = dbapi_conn.notifies.pop(0)
+                        self._dispatch(notify.payload)
+            except Exception:
+                logger.exception("Realtime LISTEN connection failed; reconnecting")
+            finally:
+                if raw is not None:
+                    try:
+                        raw.invalidate()
+                    except Exception:
+                        pass
+            threading.Event().wait(1)
+
+    def _dispatch(self, raw_message: str) -> None:
+        try:
+            message = json.loads(raw_message)
+        except ValueError:
+            logger.warning("Ignoring malformed realtime notify payload")
+            return
+        self._fan_out(message.get("channel", ""), message.get("payload") or {})
+
+
+_broker: Optional[InMemoryBroker] = None
+_broker_lock = threading.Lock()
+
+
+def _configured_backend() -> str:
+    from app.config import get_settings
+    from app.database import is_postgres
+
+    backend = get_settings().REALTIME_BACKEND
+    if backend:
+        return backend
+
+    return "postgres" if is_postgres else "memory"
+
+
+def get_broker() -> InMemoryBroker:
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            backend = _configured_backend()
+            _broker = PostgresBroker() if backend == "postgres" else InMemoryBroker()
+        return _broker
+
+
+def set_broker(broker: Optional[InMemoryBroker]) -> None:
+    global _broker
+    with _broker_lock:
+        _broker = broker
+
+
+def publish_after_commit(db: Session, user_id: int, event_type: str, data: dict[str, Any]) -> None:
+    """Queue an event for `user_id`, delivered once `db` commits."""
+    db.info.setdefault(_PENDING_KEY, []).append(
+        (user_channel(user_id), {"type": event_type, "data": data})
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_pending_events(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    broker = get_broker()
+    bind = session.get_bind()
+    for channel, payload in pending:
+        try:
+            broker.publish(bind, channel, payload)
+        except Exception:
+            logger.exception("Failed to publish realtime event channel=%s", channel)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_pending_events(session: Session, transaction) -> None:
+    # Runs after after_commit, so anything left here was rolled back.
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
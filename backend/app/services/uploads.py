@@ -0,0 +1,325 @@
+"""
+Bounded-memory image upload pipeline shared by the avatar, catalog and chat
+attachment routes:
+
+1. stream the request body into a SpooledTemporaryFile in fixed-size chunks,
+   rejecting as soon as the size limit is crossed and hashing (SHA-256) as
+   it goes so duplicates can be recognised without another pass;
+2. read format, dimensions and integrity in a single Pillow pass;
+3. run the blocking Cloudinary upload in the threadpool so the event loop
+   stays free.
+
+Each stage is timed and reported to clients via the Server-Timing header.
+Downscaled WebP renditions are rendered alongside the original upload by
+app.services.image_derivatives and stored once it succeeds, and
+`upload_deduplicated` skips storage entirely for bytes that were uploaded
+before (see models.StoredImage).
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import time
+from contextlib import contextmanager
+from functools import partial
+from dataclasses import dataclass, field
+from tempfile import SpooledTemporaryFile
+from typing import Any, Callable, Iterable, Optional
+
+from fastapi import HTTPException, Response, UploadFile, status
+from PIL import Image, UnidentifiedImageError
+from starlette.concurrency import run_in_threadpool
+
+from app.services.image_derivatives import (
+    DERIVATIVE_SIZES,
+    render_derivative_payloads,
+    store_derivatives,
+)
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Uploads up to this size stay in memory; larger ones spill to a temp file.
+UPLOAD_SPOOL_MAX_MEMORY = 1024 * 1024
+
+DEFAULT_IMAGE_FORMATS = frozenset({"JPEG", "PNG", "WEBP"})
+
+# Avatars are only ever shown small, so skip the medium rendition.
+AVATAR_DERIVATIVE_SIZES = {"thumbnail": DERIVATIVE_SIZES["thumbnail"]}
+
+
+@dataclass
+class UploadTimer:
+    stages: list[tuple[str, float]] = field(default_factory=list)
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, (time.perf_counter() - started) * 1000.0))
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{name};dur={duration:.1f}" for name, duration in self.stages)
+
+    def apply(self, response: Response) -> None:
+        if self.stages:
+            response.headers["Server-Timing"] = self.server_timing()
+            logger.debug("Upload timings %s", self.server_timing())
+
+
+@dataclass
+class ImageUpload:
+    file: Any
+    size: int
+    content_type: Optional[str]
+    format: str
+    width: int
+    height: int
+    sha256: str = ""
+
+    def close(self) -> None:
+        try:
+            self.file.close()
+        except Exception:
+            pass
+
+
+async def spool_upload(
+    file: UploadFile,
+    *,
+    max_bytes: int,
+    too_large_detail: str,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+):
+    """
+    Copy `file` into a spooled temp file, failing fast past `max_bytes`.
+    Returns (spooled file, size, sha256 hex digest).
+    """
+    declared_size = getattr(file, "size", None)
+    if declared_size is not None and declared_size > max_bytes:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=too_large_detail)
+
+    spooled = SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MAX_MEMORY)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=too_large_detail)
+            digest.update(chunk)
+            spooled.write(chunk)
+    except BaseException:
+        spooled.close()
+        raise
+
+    spooled.seek(0)
+    return spooled, size, digest.hexdigest()
+
+
+def inspect_image(
+    fileobj,
+    *,
+    max_dimension: int,
+    dimension_detail: str,
+    allowed_formats: Iterable[str] = DEFAULT_IMAGE_FORMATS,
+) -> tuple[str, int, int]:
+    """Return (format, width, height) after one open + verify of `fileobj`."""
+    try:
+        with Image.open(fileobj) as img:
+            img_format = (img.format or "").upper()
+            width, height = img.size
+            img.verify()
+    except UnidentifiedImageError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Uploaded file is not a valid image.",
+        )
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Could not read uploaded image.",
+        )
+    finally:
+        fileobj.seek(0)
+
+    if img_format not in set(allowed_formats):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid image format. Allowed: JPEG, PNG, WEBP.",
+        )
+
+    if width > max_dimension or height > max_dimension:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=dimension_detail,
+        )
+
+    return img_format, int(width), int(height)
+
+
+async def receive_image_upload(
+    file: UploadFile,
+    *,
+    timer: UploadTimer,
+    max_bytes: int,
+    max_dimension: int,
+    too_large_detail: str,
+    dimension_detail: str = "Image dimensions are too large.",
+) -> ImageUpload:
+    with timer.stage("receive"):
+        spooled, size, sha256 = await spool_upload(
+            file,
+            max_bytes=max_bytes,
+            too_large_detail=too_large_detail,
+        )
+
+    try:
+        with timer.stage("validate"):
+            img_format, width, height = inspect_image(
+                spooled,
+                max_dimension=max_dimension,
+                dimension_detail=dimension_detail,
+            )
+    except BaseException:
+        spooled.close()
+        raise
+
+    return ImageUpload(
+        file=spooled,
+        size=size,
+        content_type=file.content_type,
+        format=img_format,
+        width=width,
+        height=height,
+        sha256=sha256,
+    )
+
+
+def upload_result_url(result) -> Optional[str]:
+    if isinstance(result, dict):
+        return result.get("secure_url")
+    return str(result) if result else None
+
+
+async def run_blocking_upload(
+    upload_fn: Callable[..., Any],
+    upload: ImageUpload,
+    *,
+    timer: UploadTimer,
+    error_detail: str,
+    **kwargs,
+):
+    """Run a blocking storage upload (e.g. Cloudinary) off the event loop."""
+    with timer.stage("upload"):
+        try:
+            upload.file.seek(0)
+            return await run_in_threadpool(upload_fn, upload.file, **kwargs)
+        except Exception:
+            logger.exception("Image upload failed")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=error_detail,
+            )
+
+
+async def upload_with_derivatives(
+    upload_fn: Callable[..., Any],
+    upload: ImageUpload,
+    *,
+    timer: UploadTimer,
+    error_detail: str,
+    store_derivative: Callable[[Any, str], Any],
+    sizes: Optional[dict[str, int]] = None,
+    **kwargs,
+):
+    """
+    Upload the original while its WebP renditions render; `kwargs` go to
+    `upload_fn`. The renditions are only stored once the original is, so a
+    failed upload leaves nothing behind in storage. Returns (original upload
+    result, {rendition name: url or None}).
+    """
+    sizes = sizes or DERIVATIVE_SIZES
+    upload.file.seek(0)
+    data = upload.file.read()
+    upload.file.seek(0)
+
+    async def _render():
+        with timer.stage("derivatives"):
+            return await render_derivative_payloads(data, sizes=sizes)
+
+    rendering = asyncio.ensure_future(_render())
+    try:
+        result = await run_blocking_upload(
+            upload_fn, upload, timer=timer, error_detail=error_detail, **kwargs
+        )
+    except BaseException:
+        rendering.cancel()
+        raise
+
+    rendered = await rendering
+    with timer.stage("derivative_upload"):
+        derivative_urls = await store_derivatives(rendered, store_derivative, sizes=sizes)
+    return result, derivative_urls
+
+
+async def upload_deduplicated(
+    db,
+    upload: ImageUpload,
+    *,
+    kind: str,
+    upload_fn: Callable[..., Any],
+    store_derivative: Callable[..., Any],
+    timer: UploadTimer,
+    error_detail: str,
+    sizes: Optional[dict[str, int]] = None,
+    counted: bool = True,
+):
+    """
+    Return a referenced models.StoredImage for the upload's bytes, uploading
+    the original and its renditions only if this content hash is new for
+    `kind`. Assets are named after the hash so the same bytes always map to
+    the same remote object. Pass counted=False for images that are never
+    released (avatars). Returns None if storage gave back no URL.
+    """
+    from app import crud
+
+    with timer.stage("dedupe"):
+        existing = crud.get_stored_image(db, kind, upload.sha256)
+        if existing is not None:
+            existing = crud.reference_stored_image(db, existing, counted=counted)
+    if existing is not None:
+        return existing
+
+    result, derivatives = await upload_with_derivatives(
+        upload_fn,
+        upload,
+        timer=timer,
+        error_detail=error_detail,
+        store_derivative=partial(store_derivative, public_id=upload.sha256),
+        sizes=sizes,
+        public_id=upload.sha256,
+    )
+    url = upload_result_url(result)
+    if not url:
+        return None
+
+    return crud.acquire_stored_image(
+        db,
+        kind=kind,
+        content_hash=upload.sha256,
+        url=url,
+        public_id=result.get("public_id") if isinstance(result, dict) else None,
+        thumbnail_url=derivatives.get("thumbnail"),
+        medium_url=derivatives.get("medium"),
+        byte_size=upload.size,
+        width=upload.width,
+        height=upload.height,
+        counted=counted,
+    )
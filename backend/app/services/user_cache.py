@@ -0,0 +1,172 @@
+"""
+Short-lived in-process cache of the authenticated user and their provider.
+
+Every authenticated request resolves the bearer token's user, and provider
+routes then look up the provider row as well. Both are cached here per
+user id for AUTH_USER_CACHE_TTL_SECONDS as detached snapshots; a hit is
+merged into the request's session without a SELECT (`Session.merge(...,
+load=False)`), so routes can still modify and commit the objects as usual.
+
+Entries are tied to the token_version they were loaded with and dropped
+whenever a User or Provider row is written through the ORM (suspension,
+deletion, password change, profile edits), via the session hooks below.
+Other processes see such changes after at most one TTL. Each invalidation
+also bumps a per-user generation: a request that misses reads it before
+loading the user and passes it to `store_user`, which skips the store if a
+change was invalidated in between, rather than caching the stale row.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.utils import metrics
+
+_INVALIDATE_KEY = "user_cache_invalidate"
+_MISSING = object()
+
+
+@dataclass
+class _Entry:
+    user: object
+    token_version: Optional[int]
+    expires_at: float
+    provider: object = field(default=_MISSING)
+
+
+_entries: dict[int, _Entry] = {}
+_generations: dict[int, int] = {}
+_lock = threading.Lock()
+
+
+def _ttl() -> float:
+    from app.config import get_settings
+
+    return get_settings().AUTH_USER_CACHE_TTL_SECONDS
+
+
+def _snapshot(instance):
+    """Detached copy of `instance` holding only its column values."""
+    mapper = inspect(instance).mapper
+    copy = mapper.class_()
+    for attr in mapper.column_attrs:
+        set_committed_value(copy, attr.key, getattr(instance, attr.key))
+    make_transient_to_detached(copy)
+    return copy
+
+
+def _live_entry(user_id: int) -> Optional[_Entry]:
+    entry = _entries.get(user_id)
+    if entry is not None and entry.expires_at <= time.monotonic():
+        with _lock:
+            if _entries.get(user_id) is entry:
+                del _entries[user_id]
+        return None
+    return entry
+
+
+def get_user(db: Session, user_id: int, token_version: Optional[int]):
+    """Cached user for `user_id`, attached to `db`, or None on a miss."""
+    entry = _live_entry(user_id)
+    if entry is None or entry.token_version != token_version:
+        metrics.increment("auth_cache.user_misses")
+        return None
+    metrics.increment("auth_cache.user_hits")
+    return db.merge(entry.user, load=False)
+
+
+def generation(user_id: int) -> int:
+    """Read before loading a user on a miss; see `store_user`."""
+    with _lock:
+        return _generations.get(user_id, 0)
+
+
+def store_user(user, loaded_generation: Optional[int] = None) -> None:
+    """
+    Cache `user`. With `loaded_generation` (from `generation()` before the
+    SELECT), nothing is stored if the user was invalidated since.
+    """
+    ttl = _ttl()
+    if ttl <= 0 or user is None or user.id is None:
+        return
+    entry = _Entry(
+        user=_snapshot(user),
+        token_version=user.token_version,
+        expires_at=time.monotonic() + ttl,
+    )
+    with _lock:
+        if loaded_generation is not None and _generations.get(user.id, 0) != loaded_generation:
+            metrics.increment("auth_cache.stale_stores_skipped")
+            return
+        _entries[user.id] = entry
+
+
+def get_provider(db: Session, user_id: int, loader: Callable[[Session, int], object]):
+    """
+    The provider row for `user_id` (or None), from the cache when the user
+    entry is live, otherwise via `loader(db, user_id)`.
+    """
+    entry = _live_entry(user_id)
+    if entry is not None and entry.provider is not _MISSING:
+        metrics.increment("auth_cache.provider_hits")
+        if entry.provider is None:
+            return None
+        return db.merge(entry.provider, load=False)
+
+    metrics.increment("auth_cache.provider_misses")
+    provider = loader(db, user_id)
+    if entry is not None:
+        entry.provider = _snapshot(provider) if provider is not None else None
+    return provider
+
+
+def invalidate_user(user_id: Optional[int]) -> None:
+    if user_id is None:
+        return
+    with _lock:
+        _entries.pop(user_id, None)
+        _generations[user_id] = _generations.get(user_id, 0) + 1
+
+
+def clear() -> None:
+    with _lock:
+        _entries.clear()
+
+
+def _affected_user_id(instance) -> Optional[int]:
+    table = getattr(instance, "__tablename__", None)
+    if table == "users":
+        return instance.id
+    if table == "providers":
+        return instance.user_id
+    return None
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session: Session, flush_context) -> None:
+    changed = session.info.setdefault(_INVALIDATE_KEY, set())
+    for instance in list(session.dirty) + list(session.deleted) + list(session.new):
+        user_id = _affected_user_id(instance)
+        if user_id is not None:
+            changed.add(user_id)
+            # Invalidate straight away too, so a concurrent request can't
+            # cache the pre-commit row; the after_commit pass catches
+            # anything that loaded it in between.
+            invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    for user_id in session.info.pop(_INVALIDATE_KEY, ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session: Session) -> None:
+    session.info.pop(_INVALIDATE_KEY, None)
@@ -0,0 +1,129 @@
+"""
+Connection pool configuration and instrumentation.
+
+Engines built with `pool_kwargs` use a QueuePool subclass that times each
+checkout, and `instrument_engine` hooks the pool events. Per pool name
+("primary", "async", ...) this records in app.utils.metrics:
+
+- db.pool.<name>.checkouts / .checkins        counters
+- db.pool.<name>.wait_seconds                 distribution of checkout waits
+- db.pool.<name>.checked_out                  distribution of connections in
+                                              use at each checkout (max = peak)
+- db.pool.<name>.connects / .closes / .invalidations   connection churn
+- db.pool.<name>.timeouts                     checkouts that hit pool_timeout
+
+`pool_status` reports the live size / in-use / overflow of each pool.
+"""
+import logging
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+SLOW_CHECKOUT_SECONDS = 1.0
+
+_engines = {}
+
+
+def _timed_connect(pool, connect):
+    name = pool.logging_name or "default"
+    started = time.perf_counter()
+    try:
+        connection = connect()
+    except exc.TimeoutError:
+        metrics.increment(f"db.pool.{name}.timeouts")
+        logger.warning(
+            "Database pool %s exhausted: %s connections in use, waited %.1fs",
+            name,
+            pool.checkedout(),
+            time.perf_counter() - started,
+        )
+        raise
+    waited = time.perf_counter() - started
+    metrics.observe(f"db.pool.{name}.wait_seconds", waited)
+    if waited >= SLOW_CHECKOUT_SECONDS:
+        logger.warning(
+            "Slow database pool checkout on %s: %.2fs (%s in use)",
+            name,
+            waited,
+            pool.checkedout(),
+        )
+    return connection
+
+
+class InstrumentedQueuePool(QueuePool):
+    def connect(self):
+        return _timed_connect(self, super().connect)
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    def connect(self):
+        return _timed_connect(self, super().connect)
+
+
+def pool_kwargs(settings, name: str, *, use_async: bool = False) -> dict:
+    """create_engine / create_async_engine arguments for an instrumented pool."""
+    return {
+        "poolclass": InstrumentedAsyncAdaptedQueuePool if use_async else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_logging_name": name,
+    }
+
+
+def instrument_engine(engine, name: str) -> None:
+    """Record pool events for `engine` (a sync Engine) under `name`."""
+    _engines[name] = engine
+    prefix = f"db.pool.{name}"
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.increment(f"{prefix}.checkouts")
+        checked_out = getattr(engine.pool, "checkedout", None)
+        if checked_out is not None:
+            metrics.observe(f"{prefix}.checked_out", checked_out())
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        metrics.increment(f"{prefix}.checkins")
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        metrics.increment(f"{prefix}.connects")
+
+    @event.listens_for(engine, "close")
+    def _on_close(dbapi_connection, connection_record):
+        metrics.increment(f"{prefix}.closes")
+
+    @event.listens_for(engine, "close_detached")
+    def _on_close_detached(dbapi_connection):
+        metrics.increment(f"{prefix}.closes")
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.increment(f"{prefix}.invalidations")
+
+
+def pool_status() -> dict:
+    """{pool name: size / checked_out / overflow / checked_in} for QueuePools."""
+    status = {}
+    for name, engine in _engines.items():
+        pool = engine.pool
+        if not isinstance(pool, QueuePool):
+            status[name] = {"pool": type(pool).__name__}
+            continue
+        status[name] = {
+            "pool": type(pool).__name__,
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "checked_in": pool.checkedin(),
+        }
+    return status
@@ -0,0 +1,162 @@
+"""Geohash and great-circle distance helpers for provider location queries."""
+from __future__ import annotations
+
+import math
+from typing import Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+GEOHASH_PRECISION = 9  # ~5m x 5m cells
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode_geohash(lat: float, long: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range = [-90.0, 90.0]
+    long_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        value_range, value = (long_range, long) if even else (lat_range, lat)
+        mid = (value_range[0] + value_range[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            value_range[0] = mid
+        else:
+            bits <<= 1
+            value_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+def geohash_for(lat: Optional[float], long: Optional[float]) -> Optional[str]:
+    if lat is None or long is None:
+        return None
+    return encode_geohash(lat, long)
+
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """Return the (lat, long) size in degrees of a geohash cell."""
+    total_bits = 5 * precision
+    long_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** long_bits)
+
+
+def haversine_km(lat1: float, long1: float, lat2: float, long2: float) -> float:
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = math.radians(lat2 - lat1)
+    d_lambda = math.radians(long2 - long1)
+    a = (
+        math.sin(d_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat: float, long: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """Return (min_lat, min_long, max_lat, max_long) enclosing the radius."""
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(lat))
+    if cos_lat < 1e-6:
+        long_delta = 180.0
+    else:
+        long_delta = min(180.0, math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)))
+    return (
+        max(-90.0, lat - lat_delta),
+        max(-180.0, long - long_delta),
+        min(90.0, lat + lat_delta),
+        min(180.0, long + long_delta),
+    )
+
+
+def _cells_at_precision(
+    min_lat: float,
+    min_long: float,
+    max_lat: float,
+    max_long: float,
+    precision: int,
+) -> set[str]:
+    lat_step, long_step = geohash_cell_size(precision)
+    cells = set()
+    lat = min_lat
+    while True:
+        long = min_long
+        while True:
+            cells.add(encode_geohash(lat, long, precision))
+            if long >= max_long:
+                break
+            long = min(max_long, long + long_step)
+        if lat >= max_lat:
+            break
+        lat = min(max_lat, lat + lat_step)
+    return cells
+
+
+def covering_geohash_prefixes(
+    min_lat: float,
+    min_long: float,
+    max_lat: float,
+    max_long: float,
+    *,
+    max_cells: int = 16,
+) -> list[str]:
+    """
+    Return the most precise set of geohash prefixes (at most `max_cells`)
+    whose cells together cover the bounding box.
+    """
+    best = [""]
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        lat_step, long_step = geohash_cell_size(precision)
+        estimated = (
+            (math.ceil((max_lat - min_lat) / lat_step) + 1)
+            * (math.ceil((max_long - min_long) / long_step) + 1)
+        )
+        if estimated > max_cells * 4:
+            break
+        cells = _cells_at_precision(min_lat, min_long, max_lat, max_long, precision)
+        if len(cells) > max_cells:
+            break
+        best = sorted(cells)
+    return best
+
+
+def geohash_precision_for_zoom(zoom: int) -> int:
+    """Pick a geohash precision whose cells are a few map tiles wide."""
+    if zoom <= 2:
+        return 1
+    if zoom <= 4:
+        return 2
+    if zoom <= 7:
+        return 3
+    if zoom <= 9:
+        return 4
+    if zoom <= 12:
+        return 5
+    if zoom <= 14:
+        return 6
+    return 7
+
+
+def parse_lat_long(value: str) -> Tuple[float, float]:
+    """Parse a "lat,long" query value, raising ValueError when invalid."""
+    parts = [part.strip() for part in (value or "").split(",")]
+    if len(parts) != 2:
+        raise ValueError("near must be formatted as 'lat,long'")
+    try:
+        lat, long = float(parts[0]), float(parts[1])
+    except ValueError:
+        raise ValueError("near must be formatted as 'lat,long'")
+    if not (-90.0 <= lat <= 90.0):
+        raise ValueError("Latitude must be between -90 and 90 degrees")
+    if not (-180.0 <= long <= 180.0):
+        raise ValueError("Longitude must be between -180 and 180 degrees")
+    return lat, long
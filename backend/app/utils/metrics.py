@@ -0,0 +1,60 @@
+"""
+In-process counters and distributions for operational metrics.
+
+Values are per worker process and reset on restart; they are exposed to
+admins via GET /admin/metrics.
+"""
+import threading
+from typing import Dict
+
+
+class _Distribution:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "max": self.max,
+            "avg": self.total / self.count if self.count else 0.0,
+        }
+
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = {}
+_distributions: Dict[str, _Distribution] = {}
+
+
+def increment(name: str, value: float = 1) -> None:
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name: str, value: float) -> None:
+    with _lock:
+        _distributions.setdefault(name, _Distribution()).observe(value)
+
+
+def snapshot() -> dict:
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "distributions": {name: dist.as_dict() for name, dist in _distributions.items()},
+        }
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _distributions.clear()
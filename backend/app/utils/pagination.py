@@ -0,0 +1,20 @@
+"""Opaque keyset cursors for endpoints ordered by (timestamp, id)."""
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_keyset_cursor(sort_value: datetime, row_id: int) -> str:
+    raw = json.dumps([sort_value.isoformat(), int(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_keyset_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_keyset_cursor; raises ValueError on malformed input."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError("Invalid cursor")
@@ -2,47 +2,27 @@ from datetime import date, datetime, timedelta
 from sqlalchemy.orm import Session
 
 from app.database import SessionLocal, _ensure_tables_initialized
-from app import models
 from app import crud
 from app.crud import generate_monthly_bills
-from app.services.push_notifications import send_push_to_user
+from app.config import get_settings
+from app.services.push_notifications import process_push_receipts, prune_stale_push_tokens
+from app.services.booking_reminders import send_due_reminders
+from app.services.push_queue import prune_push_jobs
+from app.services.rate_limit import prune_rate_limit_buckets
 from app.utils.time import now_guyana
 
 
 def send_upcoming_reminders():
     """
-    Send push reminder to clients 1 hour before their appointment.
-    Runs regularly via APScheduler.
+    Queue appointment reminder pushes that have come due (see
+    BOOKING_REMINDER_OFFSETS_MINUTES). Runs regularly via APScheduler.
     """
+    _ensure_tables_initialized()
     db: Session = SessionLocal()
-
-    now = now_guyana()
-    reminder_window_start = now + timedelta(hours=1) - timedelta(minutes=1)
-    reminder_window_end = now + timedelta(hours=1) + timedelta(minutes=1)
-
-    rows = (
-        db.query(models.Booking, models.Service, models.User)
-        .join(models.Service, models.Booking.service_id == models.Service.id)
-        .join(models.User, models.Booking.customer_id == models.User.id)
-        .filter(
-            models.Booking.status == "confirmed",
-            models.Booking.start_time >= reminder_window_start,
-            models.Booking.start_time <= reminder_window_end,
-        )
-        .all()
-    )
-
-    for booking, service, customer in rows:
-        send_push_to_user(
-            db,
-            user_id=customer.id,
-            title="Upcoming appointment",
-            body=f"Your {service.name} at "
-            f"{booking.start_time.strftime('%I:%M %p')} starts in 1 hour.",
-            data={"type": "upcoming_appointment", "bookingId": booking.id, "targetScreen": "Appointments"},
-        )
-
-    db.close()
+    try:
+        send_due_reminders(db)
+    finally:
+        db.close()
 
 
 def run_billing_job(
@@ -106,11 +86,52 @@ def auto_suspend_unpaid_providers_job():
         db.close()
 
 
+def push_token_hygiene_job():
+    """
+    Check Expo delivery receipts, drop tokens that are dead or stale and
+    clear out old finished push jobs.
+    """
+    _ensure_tables_initialized()
+    db: Session = SessionLocal()
+    try:
+        process_push_receipts(db)
+        prune_stale_push_tokens(
+            db,
+            max_idle_days=get_settings().PUSH_TOKEN_RETENTION_DAYS,
+        )
+        prune_push_jobs(db)
+    finally:
+        db.close()
+
+
+def prune_refresh_tokens_job():
+    """Delete refresh tokens that are revoked or past the inactivity window."""
+    _ensure_tables_initialized()
+    db: Session = SessionLocal()
+    try:
+        crud.prune_refresh_tokens(
+            db,
+            inactivity_days=get_settings().REFRESH_TOKEN_INACTIVITY_DAYS,
+        )
+    finally:
+        db.close()
+
+
+def prune_rate_limit_buckets_job():
+    """Delete rate limit buckets that have been idle for a day."""
+    _ensure_tables_initialized()
+    db: Session = SessionLocal()
+    try:
+        prune_rate_limit_buckets(db)
+    finally:
+        db.close()
+
+
 def registerCronJobs(scheduler):
     """
     Register all recurring scheduled tasks.
     """
-    # 1-hour reminders: run every minute
+    # Appointment reminders: run every minute
     scheduler.add_job(send_upcoming_reminders, "interval", minutes=1)
 
     # Monthly statements: run on the 1st for the previous month's activity
@@ -122,5 +143,14 @@ def registerCronJobs(scheduler):
     # Monthly billing cycle reset: ensure rows exist for the new month
     scheduler.add_job(ensure_monthly_billing_cycles_job, "cron", day=1, hour=0, minute=5)
 
+    # Expo receipts and push token pruning
+    scheduler.add_job(push_token_hygiene_job, "interval", minutes=15)
+
+    # Refresh token retention: daily, off-peak
+    scheduler.add_job(prune_refresh_tokens_job, "cron", hour=3, minute=30)
+
+    # Idle rate limit buckets (database backend)
+    scheduler.add_job(prune_rate_limit_buckets_job, "interval", hours=1)
+
     # Auto-suspend unpaid providers on the 15th
     scheduler.add_job(auto_suspend_unpaid_providers_job, "cron", day=15, hour=0, minute=5)
@@ -0,0 +1,106 @@
+"""
+Measure password login throughput (logins/sec) and latency through
+crud.authenticate_user against a throwaway SQLite database.
+
+Usage (from backend/):
+    python -m scripts.bench_login --logins 400 --concurrency 16 --workers 4 --rounds 29000
+
+--concurrency request threads log in at once, as the API threadpool would
+during a burst; --workers is PASSWORD_HASH_WORKERS (0 hashes in the calling
+thread) and --rounds is PASSWORD_HASH_ROUNDS. Run it with a few --workers
+values to size the pool for the host's cores.
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PASSWORD = "BenchPass1"
+
+
+def _configure_env(db_path: Path, workers: int, rounds: int) -> None:
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("CORS_ALLOW_ORIGINS", "http://localhost")
+    os.environ.setdefault("JWT_SECRET_KEY", "bench-" + "x" * 32)
+    os.environ["PASSWORD_HASH_WORKERS"] = str(workers)
+    os.environ["PASSWORD_HASH_ROUNDS"] = str(rounds)
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def _seed(session, models, crud, count: int) -> list[str]:
+    hashed = crud.hash_password(PASSWORD)
+    emails = [f"bench_login_{i}@example.com" for i in range(count)]
+    session.add_all(
+        models.User(username=f"bench_login_{i}", email=email, hashed_password=hashed)
+        for i, email in enumerate(emails)
+    )
+    session.commit()
+    return emails
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=400)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--rounds", type=int, default=29000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    tmp.close()
+    db_path = Path(tmp.name)
+    _configure_env(db_path, args.workers, args.rounds)
+
+    from app import crud, models
+    from app.database import Base, SessionLocal, engine
+    from app.services import password_hasher
+
+    Base.metadata.create_all(bind=engine)
+    latencies: list[float] = []
+
+    def login(index: int) -> None:
+        session = SessionLocal()
+        try:
+            started = time.perf_counter()
+            user = crud.authenticate_user(session, emails[index % len(emails)], PASSWORD)
+            latencies.append(time.perf_counter() - started)
+            assert user is not None
+        finally:
+            session.close()
+
+    try:
+        session = SessionLocal()
+        try:
+            emails = _seed(session, models, crud, args.users)
+        finally:
+            session.close()
+        # Warm the pool so process start-up isn't counted.
+        crud.verify_password(PASSWORD, crud.hash_password(PASSWORD))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as threads:
+            list(threads.map(login, range(args.logins)))
+        elapsed = time.perf_counter() - started
+    finally:
+        password_hasher.shutdown_password_pool()
+        engine.dispose()
+        db_path.unlink(missing_ok=True)
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{args.logins} logins in {elapsed:.2f}s -> {args.logins / elapsed:.1f} logins/sec "
+        f"(p50 {statistics.median(latencies) * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms; "
+        f"{args.concurrency} threads, {args.workers} hash workers, {args.rounds} rounds)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Measure booking chat send throughput (messages/sec) through
+crud.send_booking_message against a throwaway SQLite database.
+
+Usage (from backend/):
+    python -m scripts.bench_send_booking_message --messages 500 --push-latency-ms 100
+
+The recipient has an active Expo token and the Expo HTTP call is replaced by
+a sleep of --push-latency-ms, so the number reflects how much push delivery
+blocks the request path. Pushes go through the push_jobs queue and the
+background workers, which are drained before the script exits.
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+def _configure_env(db_path: Path) -> None:
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("CORS_ALLOW_ORIGINS", "http://localhost")
+    os.environ.setdefault("JWT_SECRET_KEY", "bench-" + "x" * 32)
+    os.environ.setdefault("PUSH_DISPATCH_MODE", "background")
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+class _FakeExpoResponse:
+    status_code = 200
+    content = b"{}"
+
+    def __init__(self, count):
+        self._count = count
+
+    def raise_for_status(self):
+        return None
+
+    def json(self):
+        return {"data": [{"status": "ok", "id": "bench"}] * self._count}
+
+
+class _FakeExpoSession:
+    def __init__(self, latency_seconds):
+        self._latency_seconds = latency_seconds
+
+    def post(self, _url, json=None, **_kwargs):
+        time.sleep(self._latency_seconds)
+        return _FakeExpoResponse(len(json or []))
+
+    def close(self):
+        return None
+
+
+def _seed(session, models):
+    provider_user = models.User(username="bench_provider", is_provider=True)
+    client_user = models.User(username="bench_client")
+    session.add_all([provider_user, client_user])
+    session.commit()
+
+    provider = models.Provider(user_id=provider_user.id, account_number="ACC-BENCH")
+    session.add(provider)
+    session.commit()
+
+    service = models.Service(provider_id=provider.id, name="Bench", price_gyd=1000, duration_minutes=60)
+    session.add(service)
+    session.commit()
+
+    booking = models.Booking(
+        customer_id=client_user.id,
+        service_id=service.id,
+        start_time=datetime.utcnow() + timedelta(days=1),
+        end_time=datetime.utcnow() + timedelta(days=1, hours=1),
+        status="confirmed",
+    )
+    session.add(booking)
+    session.add(
+        models.PushToken(
+            user_id=provider_user.id,
+            expo_push_token="ExponentPushToken[bench-provider]",
+            is_active=True,
+        )
+    )
+    session.commit()
+    return booking, client_user
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--push-latency-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    tmp.close()
+    db_path = Path(tmp.name)
+    _configure_env(db_path)
+
+    from app import crud, models
+    from app.database import Base, SessionLocal, engine
+    from app.services import push_notifications, push_queue
+
+    push_notifications.set_expo_client(
+        push_notifications.ExpoPushClient(
+            url="http://expo.invalid",
+            session=_FakeExpoSession(args.push_latency_ms / 1000.0),
+        )
+    )
+
+    Base.metadata.create_all(bind=engine)
+    push_queue.start_push_worker()
+    session = SessionLocal()
+    try:
+        booking, client_user = _seed(session, models)
+
+        started = time.perf_counter()
+        for i in range(args.messages):
+            crud.send_booking_message(
+                session,
+                booking_id=booking.id,
+                sender_user_id=client_user.id,
+                text=f"bench message {i}",
+                attachment=None,
+            )
+        elapsed = time.perf_counter() - started
+        push_queue.stop_push_worker(wait=True)
+    finally:
+        session.close()
+        engine.dispose()
+        db_path.unlink(missing_ok=True)
+
+    print(
+        f"{args.messages} messages in {elapsed:.2f}s "
+        f"-> {args.messages / elapsed:.1f} messages/sec "
+        f"(push latency {args.push_latency_ms:.0f} ms)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,15 @@
+import contextlib
+import itertools
+import json
 import sys
 import tempfile
 import sys
 import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+from urllib.parse import parse_qs
 
 import pytest
 
@@ -17,10 +24,17 @@ def _reload_app_modules():
         "app.database",
         "app.models",
         "app.crud",
+        "app.security",
         "app.main",
         "app.routes.auth",
         "app.routes.providers",
         "app.routes.bookings",
+        "app.routes.conversations",
+        "app.routes.notifications",
+        "app.routes.admin",
+        "app.routes.events",
+        "app.routes.profile",
+        "app.routes.users",
         "app.workers.cron",
     ]:
         sys.modules.pop(module_name, None)
@@ -36,9 +50,17 @@ def db_session(monkeypatch):
     monkeypatch.setenv("DATABASE_URL", f"sqlite:///{test_db_path}")
     monkeypatch.setenv("CORS_ALLOW_ORIGINS", "http://localhost")
     monkeypatch.setenv("JWT_SECRET_KEY", "x" * 32)
+    monkeypatch.setenv("PUSH_DISPATCH_MODE", "inline")
+    monkeypatch.setenv("IMAGE_DERIVATIVE_WORKERS", "0")
+    monkeypatch.setenv("PASSWORD_HASH_WORKERS", "0")
 
     _reload_app_modules()
 
+    from app.services import rate_limit, user_cache
+
+    user_cache.clear()
+    rate_limit.set_backend(None)
+
     import app.config as config
 
     config.get_settings.cache_clear()
@@ -58,3 +80,203 @@ def db_session(monkeypatch):
         database.engine.dispose()
         if test_db_path.exists():
             test_db_path.unlink()
+
+
+class FakeExpoServer:
+    """
+    Local stand-in for the Expo push API. Tokens containing "unregistered"
+    get a DeviceNotRegistered ticket; receipts are served from `receipts`.
+    Every request is recorded.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.receipts = {}
+        self._ticket_ids = itertools.count(1)
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"[]")
+                server.requests.append(
+                    {"path": self.path, "client_port": self.client_address[1], "body": payload}
+                )
+                if self.path.endswith("/getReceipts"):
+                    data = {
+                        ticket_id: server.receipts[ticket_id]
+                        for ticket_id in payload["ids"]
+                        if ticket_id in server.receipts
+                    }
+                else:
+                    data = [server.ticket_for(message) for message in payload]
+                body = json.dumps({"data": data}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}/--/api/v2/push/send"
+
+    def ticket_for(self, message):
+        if "unregistered" in message.get("to", ""):
+            return {
+                "status": "error",
+                "message": "not registered",
+                "details": {"error": "DeviceNotRegistered"},
+            }
+        return {"status": "ok", "id": f"ticket-{next(self._ticket_ids)}-{message['to']}"}
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class FakeGraphServer:
+    """
+    Local stand-in for the Facebook Graph API's debug_token and /me
+    endpoints. Register tokens with `add_token`; anything else is invalid.
+    Each request sleeps `delay` seconds, and `max_in_flight` records how
+    many requests were being served at once.
+    """
+
+    def __init__(self, app_id="test-fb-app", delay=0.0):
+        self.app_id = app_id
+        self.delay = delay
+        self.tokens = {}
+        self.requests = []
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                path, _, query = self.path.partition("?")
+                params = {key: values[0] for key, values in parse_qs(query).items()}
+                with server._lock:
+                    server.requests.append({"path": path, "params": params})
+                    server._in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server._in_flight)
+                try:
+                    time.sleep(server.delay)
+                    status, data = server.respond(path, params)
+                finally:
+                    with server._lock:
+                        server._in_flight -= 1
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def add_token(self, token, *, user_id, name="FB User", email=None, expires_at=0):
+        self.tokens[token] = {
+            "user_id": user_id,
+            "name": name,
+            "email": email,
+            "expires_at": expires_at,
+        }
+
+    def respond(self, path, params):
+        if path.endswith("/debug_token"):
+            token = self.tokens.get(params.get("input_token"))
+            if token is None:
+                return 200, {"data": {"is_valid": False}}
+            return 200, {
+                "data": {
+                    "is_valid": True,
+                    "app_id": self.app_id,
+                    "user_id": token["user_id"],
+                    "expires_at": token["expires_at"],
+                }
+            }
+        if path.endswith("/me"):
+            token = self.tokens.get(params.get("access_token"))
+            if token is None:
+                return 400, {"error": {"message": "Invalid OAuth access token."}}
+            profile = {"id": token["user_id"], "name": token["name"]}
+            if token["email"]:
+                profile["email"] = token["email"]
+            return 200, profile
+        return 404, {"error": {"message": "Unknown path"}}
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture()
+def fake_expo():
+    from app.services import push_notifications
+
+    server = FakeExpoServer().start()
+    client = push_notifications.ExpoPushClient(url=server.url, timeout=5)
+    push_notifications.set_expo_client(client)
+    try:
+        yield server, client
+    finally:
+        push_notifications.set_expo_client(None)
+        client.close()
+        server.stop()
+
+
+@pytest.fixture()
+def fake_graph():
+    from app.services import facebook_graph
+
+    server = FakeGraphServer().start()
+    verifier = facebook_graph.FacebookTokenVerifier(base_url=server.url, timeout=5)
+    facebook_graph.set_facebook_verifier(verifier)
+    try:
+        yield server, verifier
+    finally:
+        facebook_graph.set_facebook_verifier(None)
+        verifier.close()
+        server.stop()
+
+
+@pytest.fixture()
+def query_budget():
+    """
+    `with query_budget(n): ...` fails the test if the block runs more than
+    n SQL statements, listing the most repeated ones.
+    """
+    from app.services.query_stats import count_queries
+
+    @contextlib.contextmanager
+    def budget(limit):
+        with count_queries() as stats:
+            yield stats
+        repeated = "\n".join(f"  {n}x {key}" for key, n in stats.fingerprints.most_common(5))
+        assert stats.count <= limit, (
+            f"{stats.count} SQL statements, budget is {limit}. Most repeated:\n{repeated}"
+        )
+
+    return budget
@@ -0,0 +1,92 @@
+import pytest
+from fastapi import HTTPException
+
+
+def _create_provider(db, models, username: str, lat: float, long: float):
+    user = models.User(
+        username=username,
+        email=f'{username}@example.com',
+        hashed_password='x',
+        is_provider=True,
+        lat=lat,
+        long=long,
+    )
+    db.add(user)
+    db.flush()
+    provider = models.Provider(user_id=user.id, account_number=f'ACC-{username}')
+    db.add(provider)
+    db.flush()
+    return provider
+
+
+def _seed(db, models):
+    admin_user = models.User(
+        username='admin',
+        email='admin@example.com',
+        hashed_password='x',
+        is_admin=True,
+    )
+    db.add(admin_user)
+    georgetown = [
+        _create_provider(db, models, f'gt{i}', 6.80 + i * 0.001, -58.15 - i * 0.001)
+        for i in range(3)
+    ]
+    linden = _create_provider(db, models, 'linden', 6.0081, -58.3071)
+    _create_provider(db, models, 'faraway', 10.65, -61.51)
+    db.commit()
+    return admin_user, georgetown, linden
+
+
+def test_provider_map_clusters_when_zoomed_out(db_session):
+    db, models, _ = db_session
+    admin_user, georgetown, linden = _seed(db, models)
+
+    from app.routes import admin as admin_routes
+
+    result = admin_routes.get_provider_location_map(
+        min_lat=5.5,
+        min_long=-59.0,
+        max_lat=7.5,
+        max_long=-57.5,
+        zoom=8,
+        db=db,
+        _=admin_user,
+    )
+
+    assert result['providers'] == []
+    counts = sorted(cluster['count'] for cluster in result['clusters'])
+    assert counts == [1, 3]
+    assert all(len(cluster['geohash']) == result['precision'] for cluster in result['clusters'])
+
+
+def test_provider_map_returns_individual_providers_when_zoomed_in(db_session):
+    db, models, _ = db_session
+    admin_user, georgetown, linden = _seed(db, models)
+
+    from app.routes import admin as admin_routes
+
+    result = admin_routes.get_provider_location_map(
+        min_lat=6.79,
+        min_long=-58.16,
+        max_lat=6.81,
+        max_long=-58.14,
+        zoom=16,
+        db=db,
+        _=admin_user,
+    )
+
+    assert result['clusters'] == []
+    assert [row['provider_id'] for row in result['providers']] == [p.id for p in georgetown]
+    assert result['truncated'] is False
+
+    with pytest.raises(HTTPException) as exc:
+        admin_routes.get_provider_location_map(
+            min_lat=7.0,
+            min_long=-58.0,
+            max_lat=6.0,
+            max_long=-57.0,
+            zoom=5,
+            db=db,
+            _=admin_user,
+        )
+    assert exc.value.status_code == 400
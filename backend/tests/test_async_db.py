@@ -0,0 +1,87 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+
+def test_async_urls_use_async_drivers(db_session):
+    from app.database import to_async_url
+
+    assert to_async_url("sqlite:///./dev.db").drivername == "sqlite+aiosqlite"
+    url = to_async_url("postgresql://user:pw@db.example.com/bookitgy?sslmode=require")
+    assert url.drivername == "postgresql+asyncpg"
+    assert dict(url.query) == {"ssl": "require"}
+
+
+def test_async_session_runs_crud_functions(db_session):
+    session, models, crud = db_session
+    user = models.User(username="async_reader")
+    session.add(user)
+    session.commit()
+    crud.create_notification(session, user_id=user.id, type="chat_message", title="Hi", body="Hello")
+    session.commit()
+
+    from app.database import get_async_db
+
+    async def read():
+        async for db in get_async_db():
+            return await db.run_sync(crud.get_unread_notification_count, user_id=user.id)
+
+    assert asyncio.run(read()) == 1
+
+
+def test_listing_routes_are_async(db_session):
+    session, models, _crud = db_session
+    from app.main import app
+    from app.security import get_current_user_async, get_current_user_from_header
+
+    user = models.User(username="async_lister")
+    session.add(user)
+    session.commit()
+
+    app.dependency_overrides[get_current_user_from_header] = lambda: user
+    app.dependency_overrides[get_current_user_async] = lambda: user
+    client = TestClient(app)
+    try:
+        endpoints = {route.path: route.endpoint for route in app.routes if hasattr(route, "endpoint")}
+        for path in (
+            "/notifications/me",
+            "/conversations/me",
+            "/bookings/me",
+            "/providers",
+            "/providers/{provider_id}/availability",
+        ):
+            assert asyncio.iscoroutinefunction(endpoints[path]), path
+
+        assert client.get("/bookings/me").json() == []
+        assert client.get("/notifications/me/unread-count").json() == {"unread_count": 0}
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_async_routes_authenticate_on_the_async_session(db_session):
+    session, models, _crud = db_session
+    from app.auth.jwt import create_access_token
+    from app.main import app
+    from app.utils import metrics
+
+    user = models.User(username="async_auth", email="async_auth@example.com", is_provider=True)
+    session.add(user)
+    session.commit()
+    session.add(models.Provider(user_id=user.id, account_number="ACC-ASYNC"))
+    session.commit()
+    token = create_access_token({"sub": user.email, "uid": user.id, "tv": user.token_version})
+    headers = {"Authorization": f"Bearer {token}"}
+    client = TestClient(app)
+    client.get("/providers")
+
+    metrics.reset()
+    assert client.get("/notifications/me/unread-count", headers=headers).json() == {
+        "unread_count": 0
+    }
+    assert client.get("/providers/me/bookings", headers=headers).status_code == 200
+    assert client.get("/bookings/me").status_code == 401
+    assert client.get("/events/stream").status_code == 401
+
+    counters = metrics.snapshot()["counters"]
+    assert counters.get("db.pool.primary.checkouts", 0) == 0
+    assert counters["db.pool.async.checkouts"] >= 2
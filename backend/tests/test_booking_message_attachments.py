@@ -41,7 +41,7 @@ def _create_booking_graph(session, models):
 def _build_client(session):
     from app.main import app
     from app.database import get_db
-    from app.security import get_current_user_from_header
+    from app.security import get_current_user_async, get_current_user_from_header
 
     current = {"user": None}
 
@@ -56,6 +56,7 @@ def _build_client(session):
 
     app.dependency_overrides[get_db] = override_get_db
     app.dependency_overrides[get_current_user_from_header] = override_user
+    app.dependency_overrides[get_current_user_async] = override_user
 
     return app, TestClient(app), current
 
@@ -76,6 +77,14 @@ def test_upload_booking_message_attachment(db_session, monkeypatch):
         return {"secure_url": "https://cdn.example.com/chat-upload.jpg"}
 
     monkeypatch.setattr("app.routes.bookings.upload_booking_message_image", fake_upload)
+    derivatives = {}
+
+    def fake_derivative(fileobj, variant, *, folder):
+        with Image.open(fileobj) as img:
+            derivatives[variant] = (img.format, folder)
+        return {"secure_url": f"https://cdn.example.com/{variant}.webp"}
+
+    monkeypatch.setattr("app.routes.bookings.upload_image_derivative", fake_derivative)
 
     current["user"] = client_user
     response = client.post(
@@ -88,6 +97,15 @@ def test_upload_booking_message_attachment(db_session, monkeypatch):
     assert payload["file_url"] == "https://cdn.example.com/chat-upload.jpg"
     assert payload["width"] == 40
     assert payload["height"] == 30
+    assert payload["file_size_bytes"] == len(_image_bytes("JPEG"))
+    assert payload["thumbnail_url"] == "https://cdn.example.com/thumbnail.webp"
+    assert payload["medium_url"] == "https://cdn.example.com/medium.webp"
+    assert derivatives == {
+        "thumbnail": ("WEBP", "bookitgy/booking_messages"),
+        "medium": ("WEBP", "bookitgy/booking_messages"),
+    }
+    assert "upload;dur=" in response.headers["Server-Timing"]
+    assert "derivatives;dur=" in response.headers["Server-Timing"]
 
     current["user"] = outsider_user
     forbidden = client.post(
@@ -104,3 +122,87 @@ def test_upload_booking_message_attachment(db_session, monkeypatch):
     assert invalid.status_code == 400
 
     app.dependency_overrides.clear()
+
+
+def test_upload_booking_message_attachment_rejects_oversized_and_corrupt_files(db_session, monkeypatch):
+    session, models, _crud = db_session
+    _provider_user, client_user, _outsider_user, booking = _create_booking_graph(session, models)
+    app, client, current = _build_client(session)
+
+    uploads = []
+    monkeypatch.setattr(
+        "app.routes.bookings.upload_booking_message_image",
+        lambda fileobj: uploads.append(fileobj.read()) or {"secure_url": "https://cdn.example.com/x.jpg"},
+    )
+    monkeypatch.setattr("app.routes.bookings.MAX_BOOKING_MESSAGE_IMAGE_SIZE", 1024)
+
+    current["user"] = client_user
+    too_large = client.post(
+        f"/bookings/messages/attachments?booking_id={booking.id}",
+        files={"file": ("big.jpg", b"\xff" * 4096, "image/jpeg")},
+    )
+    assert too_large.status_code == 400
+    assert "too large" in too_large.json()["detail"]
+
+    corrupt = client.post(
+        f"/bookings/messages/attachments?booking_id={booking.id}",
+        files={"file": ("broken.png", _image_bytes("PNG")[:60], "image/png")},
+    )
+    assert corrupt.status_code == 400
+    assert uploads == []
+
+    app.dependency_overrides.clear()
+
+
+def test_spool_upload_stops_reading_past_the_limit():
+    import asyncio
+
+    from fastapi import HTTPException
+    from app.services.uploads import spool_upload
+
+    class _ChunkedUpload:
+        size = None
+        content_type = "image/jpeg"
+
+        def __init__(self):
+            self.reads = 0
+
+        async def read(self, size=-1):
+            self.reads += 1
+            return b"x" * size
+
+    upload = _ChunkedUpload()
+    try:
+        asyncio.run(spool_upload(upload, max_bytes=100_000, too_large_detail="too large", chunk_size=64 * 1024))
+    except HTTPException as exc:
+        assert exc.status_code == 400
+    else:
+        raise AssertionError("expected oversized upload to be rejected")
+    assert upload.reads == 2
+
+
+def test_failed_attachment_upload_stores_no_derivatives(db_session, monkeypatch):
+    session, models, _crud = db_session
+    _provider_user, client_user, _outsider_user, booking = _create_booking_graph(session, models)
+    app, client, current = _build_client(session)
+
+    def failing_upload(_path):
+        raise RuntimeError("storage unavailable")
+
+    stored = []
+
+    def fake_derivative(fileobj, variant, *, folder):
+        stored.append(variant)
+        return {"secure_url": f"https://cdn.example.com/{variant}.webp"}
+
+    monkeypatch.setattr("app.routes.bookings.upload_booking_message_image", failing_upload)
+    monkeypatch.setattr("app.routes.bookings.upload_image_derivative", fake_derivative)
+
+    current["user"] = client_user
+    response = client.post(
+        f"/bookings/messages/attachments?booking_id={booking.id}",
+        files={"file": ("chat.jpg", _image_bytes("JPEG"), "image/jpeg")},
+    )
+    assert response.status_code == 500
+    assert stored == []
+    app.dependency_overrides.clear()
@@ -60,7 +60,7 @@ def _create_booking_graph(session, models):
 def _build_client(session):
     from app.main import app
     from app.database import get_db
-    from app.security import get_current_user_from_header
+    from app.security import get_current_user_async, get_current_user_from_header
 
     current = {"user": None}
 
@@ -75,6 +75,7 @@ def _build_client(session):
 
     app.dependency_overrides[get_db] = override_get_db
     app.dependency_overrides[get_current_user_from_header] = override_user
+    app.dependency_overrides[get_current_user_async] = override_user
 
     return app, TestClient(app), current
 
@@ -235,3 +236,87 @@ def test_booking_messaging_rejections(db_session):
     assert r.json()["detail"] == "Messaging is unavailable because this appointment is completed."
 
     app.dependency_overrides.clear()
+
+
+def test_booking_messages_cursor_pagination(db_session):
+    session, models, _crud = db_session
+    provider_user, client_user, _outsider, booking, _other = _create_booking_graph(session, models)
+    app, client, current = _build_client(session)
+
+    current["user"] = client_user
+    sent_ids = []
+    for i in range(5):
+        r = _send(client, client_user, booking.id, text=f"msg {i}")
+        assert r.status_code == 200
+        sent_ids.append(r.json()["id"])
+
+    latest = client.get(f"/bookings/{booking.id}/messages", params={"limit": 2}).json()
+    assert [m["id"] for m in latest["messages"]] == sent_ids[3:]
+    assert latest["has_more"] is True
+
+    older = client.get(
+        f"/bookings/{booking.id}/messages",
+        params={"limit": 2, "before_id": sent_ids[3]},
+    ).json()
+    assert [m["id"] for m in older["messages"]] == sent_ids[1:3]
+    assert older["has_more"] is True
+
+    oldest = client.get(
+        f"/bookings/{booking.id}/messages",
+        params={"limit": 2, "before_id": sent_ids[1]},
+    ).json()
+    assert [m["id"] for m in oldest["messages"]] == sent_ids[:1]
+    assert oldest["has_more"] is False
+
+    poll = client.get(
+        f"/bookings/{booking.id}/messages",
+        params={"after_id": sent_ids[-1]},
+    ).json()
+    assert poll["messages"] == []
+    assert poll["has_more"] is False
+
+    current["user"] = provider_user
+    reply = _send(client, provider_user, booking.id, text="reply").json()
+    poll = client.get(
+        f"/bookings/{booking.id}/messages",
+        params={"after_id": sent_ids[-1]},
+    ).json()
+    assert [m["id"] for m in poll["messages"]] == [reply["id"]]
+
+    both = client.get(
+        f"/bookings/{booking.id}/messages",
+        params={"after_id": sent_ids[0], "before_id": sent_ids[-1]},
+    )
+    assert both.status_code == 400
+
+    app.dependency_overrides.clear()
+
+
+def test_send_booking_message_commits_once_and_queues_push(db_session):
+    from sqlalchemy import event
+
+    session, models, crud = db_session
+    provider_user, client_user, _outsider, booking, _other = _create_booking_graph(session, models)
+
+    commits = []
+    listener = lambda _session: commits.append(1)
+    event.listen(session, "after_commit", listener)
+    try:
+        message = crud.send_booking_message(
+            session,
+            booking_id=booking.id,
+            sender_user_id=client_user.id,
+            text="Running late",
+            attachment=None,
+        )
+    finally:
+        event.remove(session, "after_commit", listener)
+
+    assert len(commits) == 1
+    notification = session.query(models.Notification).one()
+    assert notification.user_id == provider_user.id
+    assert notification.message_id == message.id
+    job = session.query(models.PushJob).one()
+    assert job.user_id == provider_user.id
+    assert job.dedupe_key == f"message:{message.id}"
+    assert '"messageId": %d' % message.id in job.data
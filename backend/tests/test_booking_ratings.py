@@ -6,7 +6,7 @@ from fastapi.testclient import TestClient
 def _build_client(session):
     from app.main import app
     from app.database import get_db
-    from app.security import get_current_user_from_header
+    from app.security import get_current_user_async, get_current_user_from_header
 
     current = {"user": None}
 
@@ -18,6 +18,7 @@ def _build_client(session):
 
     app.dependency_overrides[get_db] = override_get_db
     app.dependency_overrides[get_current_user_from_header] = override_user
+    app.dependency_overrides[get_current_user_async] = override_user
     return app, TestClient(app), current
 
 
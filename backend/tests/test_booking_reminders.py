@@ -0,0 +1,150 @@
+from datetime import timedelta
+
+
+def _background_mode(monkeypatch):
+    import app.config as config
+
+    monkeypatch.setenv("PUSH_DISPATCH_MODE", "background")
+    config.get_settings.cache_clear()
+
+
+def _create_booking(session, models, *, starts_in, status="confirmed", name="reminder"):
+    from app.utils.time import now_guyana
+
+    provider_user = models.User(username=f"{name}_provider", is_provider=True)
+    customer = models.User(username=f"{name}_customer")
+    session.add_all([provider_user, customer])
+    session.commit()
+    provider = models.Provider(user_id=provider_user.id, account_number=f"ACC-{name}")
+    session.add(provider)
+    session.commit()
+    service = models.Service(
+        provider_id=provider.id, name="Haircut", price_gyd=1000, duration_minutes=60
+    )
+    session.add(service)
+    session.commit()
+
+    start = now_guyana() + starts_in
+    booking = models.Booking(
+        customer_id=customer.id,
+        service_id=service.id,
+        start_time=start,
+        end_time=start + timedelta(hours=1),
+        status=status,
+    )
+    session.add(booking)
+    session.commit()
+    return booking
+
+
+def _make_due(session, models, offset_minutes):
+    from app.utils.time import now_guyana
+
+    reminder = (
+        session.query(models.BookingReminder)
+        .filter(models.BookingReminder.offset_minutes == offset_minutes)
+        .one()
+    )
+    reminder.due_at = now_guyana() - timedelta(minutes=1)
+    session.commit()
+    return reminder
+
+
+def test_schedule_skips_past_offsets_and_existing_rows(db_session):
+    session, models, _crud = db_session
+    from app.services import booking_reminders
+
+    booking = _create_booking(session, models, starts_in=timedelta(hours=3))
+
+    assert booking_reminders.schedule_booking_reminders(session, booking, offsets=[1440, 60]) == 1
+    session.commit()
+    assert booking_reminders.schedule_booking_reminders(session, booking, offsets=[1440, 60]) == 0
+
+    reminder = session.query(models.BookingReminder).one()
+    assert reminder.offset_minutes == 60
+    assert reminder.due_at == booking.start_time - timedelta(hours=1)
+    assert reminder.status == "pending"
+
+
+def test_due_reminders_are_queued_exactly_once(db_session, monkeypatch):
+    session, models, _crud = db_session
+    from app.services import booking_reminders
+
+    _background_mode(monkeypatch)
+    booking = _create_booking(session, models, starts_in=timedelta(days=2))
+    booking_reminders.schedule_booking_reminders(session, booking, offsets=[1440, 60])
+    session.commit()
+
+    # Nothing is due yet.
+    assert booking_reminders.send_due_reminders(session) == 0
+
+    reminder = _make_due(session, models, 1440)
+    assert booking_reminders.send_due_reminders(session) == 1
+    assert booking_reminders.send_due_reminders(session) == 0
+
+    session.refresh(reminder)
+    assert reminder.status == "sent"
+    assert reminder.sent_at is not None
+    job = session.query(models.PushJob).one()
+    assert job.user_id == booking.customer_id
+    assert job.dedupe_key == f"booking:{booking.id}:reminder:1440"
+    assert "starts in 24 hours" in job.body
+
+    pending = (
+        session.query(models.BookingReminder)
+        .filter(models.BookingReminder.status == "pending")
+        .one()
+    )
+    assert pending.offset_minutes == 60
+
+
+def test_reminders_for_cancelled_or_overdue_bookings_are_skipped(db_session, monkeypatch):
+    session, models, _crud = db_session
+    from app.services import booking_reminders
+    from app.utils.time import now_guyana
+
+    _background_mode(monkeypatch)
+    cancelled = _create_booking(session, models, starts_in=timedelta(days=2), name="cancelled")
+    late = _create_booking(session, models, starts_in=timedelta(hours=20), name="late")
+    booking_reminders.schedule_booking_reminders(session, cancelled, offsets=[60])
+    session.add(
+        models.BookingReminder(
+            booking_id=late.id,
+            offset_minutes=1440,
+            due_at=now_guyana() - timedelta(hours=4),
+            status="pending",
+        )
+    )
+    cancelled.status = "cancelled"
+    session.commit()
+    reminder = session.query(models.BookingReminder).filter_by(booking_id=cancelled.id).one()
+    reminder.due_at = now_guyana() - timedelta(minutes=1)
+    session.commit()
+
+    assert booking_reminders.send_due_reminders(session) == 0
+    session.expire_all()
+    statuses = {row.status for row in session.query(models.BookingReminder).all()}
+    assert statuses == {"skipped"}
+    assert session.query(models.PushJob).count() == 0
+
+
+def test_send_due_reminders_works_through_batches(db_session, monkeypatch):
+    session, models, _crud = db_session
+    from app.services import booking_reminders
+    from app.utils.time import now_guyana
+
+    _background_mode(monkeypatch)
+    booking = _create_booking(session, models, starts_in=timedelta(days=3))
+    for offset in range(1, 6):
+        session.add(
+            models.BookingReminder(
+                booking_id=booking.id,
+                offset_minutes=offset,
+                due_at=now_guyana() - timedelta(minutes=offset),
+                status="pending",
+            )
+        )
+    session.commit()
+
+    assert booking_reminders.send_due_reminders(session, limit=2) == 5
+    assert session.query(models.PushJob).count() == 5
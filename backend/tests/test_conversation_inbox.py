@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+
+def _create_booking(session, models, provider_user, client_user, account_number):
+    provider = (
+        session.query(models.Provider)
+        .filter(models.Provider.user_id == provider_user.id)
+        .first()
+    )
+    if not provider:
+        provider = models.Provider(user_id=provider_user.id, account_number=account_number)
+        session.add(provider)
+        session.commit()
+
+    service = models.Service(
+        provider_id=provider.id,
+        name="Inbox Service",
+        price_gyd=1000,
+        duration_minutes=60,
+    )
+    session.add(service)
+    session.commit()
+
+    booking = models.Booking(
+        customer_id=client_user.id,
+        service_id=service.id,
+        start_time=datetime.utcnow() + timedelta(hours=4),
+        end_time=datetime.utcnow() + timedelta(hours=5),
+        status="confirmed",
+    )
+    session.add(booking)
+    session.commit()
+    return booking
+
+
+def _client(session, current):
+    from app.main import app
+    from app.database import get_db
+    from app.security import get_current_user_async, get_current_user_from_header
+
+    def override_get_db():
+        yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user_from_header] = lambda: current["user"]
+    app.dependency_overrides[get_current_user_async] = lambda: current["user"]
+    return app, TestClient(app)
+
+
+def test_inbox_lists_conversations_with_unread_counts_and_pagination(db_session):
+    session, models, crud = db_session
+
+    provider_user = models.User(username="inbox_provider", is_provider=True, avatar_url="https://cdn/p.jpg")
+    alice = models.User(username="inbox_alice")
+    bob = models.User(username="inbox_bob", avatar_url="https://cdn/b.jpg")
+    session.add_all([provider_user, alice, bob])
+    session.commit()
+
+    alice_booking = _create_booking(session, models, provider_user, alice, "ACC-INBOX")
+    bob_booking = _create_booking(session, models, provider_user, bob, "ACC-INBOX")
+
+    def send(booking, sender, text):
+        return crud.send_booking_message(
+            session,
+            booking_id=booking.id,
+            sender_user_id=sender.id,
+            text=text,
+            attachment=None,
+        )
+
+    send(alice_booking, alice, "hi from alice")
+    send(alice_booking, alice, "are you there?")
+    send(bob_booking, bob, "hi from bob")
+    send(alice_booking, provider_user, "yes!")
+
+    current = {"user": provider_user}
+    app, client = _client(session, current)
+    try:
+        inbox = client.get("/conversations/me").json()
+        assert [row["booking_id"] for row in inbox["conversations"]] == [alice_booking.id, bob_booking.id]
+        first, second = inbox["conversations"]
+        assert first["last_message"]["text"] == "yes!"
+        assert first["counterpart"]["username"] == "inbox_alice"
+        assert first["unread_count"] == 2
+        assert first["role"] == "provider"
+        assert second["counterpart"]["avatar_url"] == "https://cdn/b.jpg"
+        assert second["unread_count"] == 1
+        assert inbox["next_cursor"] is None
+
+        page = client.get("/conversations/me", params={"limit": 1}).json()
+        assert [row["booking_id"] for row in page["conversations"]] == [alice_booking.id]
+        assert page["next_cursor"]
+        page = client.get(
+            "/conversations/me",
+            params={"limit": 1, "cursor": page["next_cursor"]},
+        ).json()
+        assert [row["booking_id"] for row in page["conversations"]] == [bob_booking.id]
+        assert page["next_cursor"] is None
+
+        assert client.get("/conversations/me", params={"cursor": "garbage"}).status_code == 400
+
+        client.post("/bookings/messages/read", json={"booking_id": alice_booking.id})
+        inbox = client.get("/conversations/me").json()
+        assert inbox["conversations"][0]["unread_count"] == 0
+
+        current["user"] = alice
+        inbox = client.get("/conversations/me").json()
+        assert [row["booking_id"] for row in inbox["conversations"]] == [alice_booking.id]
+        assert inbox["conversations"][0]["unread_count"] == 1
+        assert inbox["conversations"][0]["counterpart"]["username"] == "inbox_provider"
+    finally:
+        app.dependency_overrides.clear()
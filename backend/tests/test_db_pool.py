@@ -0,0 +1,67 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+
+def _pool_engine(monkeypatch, name, **env):
+    import app.config as config
+    from app.utils.db_pool import instrument_engine, pool_kwargs
+
+    for key, value in env.items():
+        monkeypatch.setenv(key, str(value))
+    config.get_settings.cache_clear()
+    settings = config.get_settings()
+
+    engine = create_engine(
+        settings.DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        **pool_kwargs(settings, name),
+    )
+    instrument_engine(engine, name)
+    return engine
+
+
+def test_pool_is_configured_from_settings(db_session):
+    import app.database as database
+    from app.utils.db_pool import InstrumentedQueuePool
+
+    pool = database.engine.pool
+    assert isinstance(pool, InstrumentedQueuePool)
+    assert pool.size() == database.settings.DB_POOL_SIZE
+    assert pool._pre_ping is database.settings.DB_POOL_PRE_PING
+    assert pool._recycle == database.settings.DB_POOL_RECYCLE_SECONDS
+
+
+def test_pool_records_checkouts_churn_and_exhaustion(db_session, monkeypatch):
+    from app.utils import db_pool, metrics
+
+    metrics.reset()
+    engine = _pool_engine(
+        monkeypatch,
+        "test",
+        DB_POOL_SIZE=1,
+        DB_MAX_OVERFLOW=0,
+        DB_POOL_TIMEOUT_SECONDS=0.1,
+    )
+    try:
+        held = engine.connect()
+        held.execute(text("SELECT 1"))
+        assert db_pool.pool_status()["test"]["checked_out"] == 1
+
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+        held.close()
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    finally:
+        engine.dispose()
+
+    snapshot = metrics.snapshot()
+    counters = snapshot["counters"]
+    assert counters["db.pool.test.checkouts"] == 2
+    assert counters["db.pool.test.checkins"] == 2
+    assert counters["db.pool.test.connects"] == 1
+    assert counters["db.pool.test.closes"] == 1
+    assert counters["db.pool.test.timeouts"] == 1
+    assert snapshot["distributions"]["db.pool.test.wait_seconds"]["count"] == 2
+    assert snapshot["distributions"]["db.pool.test.checked_out"]["max"] == 1
@@ -29,7 +29,17 @@ class _MockResponse:
         return self._data
 
 
+class _MockGraphSession:
+    def __init__(self, get):
+        self.get = get
+
+    def close(self):
+        pass
+
+
 def _mock_facebook_calls(monkeypatch, auth_routes, *, fb_user_id="fb-1", fb_email="fb@example.com", is_valid=True):
+    from app.services import facebook_graph
+
     def fake_get(url, params=None, timeout=10):
         if url.endswith("/debug_token"):
             return _MockResponse(
@@ -49,7 +59,10 @@ def _mock_facebook_calls(monkeypatch, auth_routes, *, fb_user_id="fb-1", fb_emai
             return _MockResponse(True, payload)
         return _MockResponse(False, {})
 
-    monkeypatch.setattr(auth_routes.requests, "get", fake_get)
+    verifier = facebook_graph.FacebookTokenVerifier(
+        session=_MockGraphSession(fake_get), cache_seconds=0
+    )
+    monkeypatch.setattr(facebook_graph, "_verifier", verifier)
 
 
 def _base_payload(**overrides):
@@ -0,0 +1,82 @@
+import time
+
+from fastapi.testclient import TestClient
+
+
+def _verify(verifier, token):
+    return verifier.verify(
+        token, app_id="test-fb-app", app_secret="test-fb-secret", version="v19.0"
+    )
+
+
+def test_verified_tokens_are_cached_until_they_expire(db_session, fake_graph):
+    server, verifier = fake_graph
+    now = [1_000_000.0]
+    verifier._clock = lambda: now[0]
+    server.add_token("tok-1", user_id="fb-1", email="One@Example.com", expires_at=now[0] + 60)
+
+    assert _verify(verifier, "tok-1") == {"id": "fb-1", "name": "FB User", "email": "one@example.com"}
+    assert len(server.requests) == 2
+
+    now[0] += 59
+    assert _verify(verifier, "tok-1")["id"] == "fb-1"
+    assert len(server.requests) == 2
+
+    now[0] += 1
+    assert _verify(verifier, "tok-1")["id"] == "fb-1"
+    assert len(server.requests) == 4
+
+
+def test_invalid_tokens_are_not_cached(db_session, fake_graph):
+    server, verifier = fake_graph
+
+    assert _verify(verifier, "nope") is None
+    server.add_token("nope", user_id="fb-2")
+    assert _verify(verifier, "nope")["id"] == "fb-2"
+    assert len(server.requests) == 4
+
+
+def test_graph_calls_run_concurrently(db_session, fake_graph):
+    server, verifier = fake_graph
+    server.delay = 0.3
+    server.add_token("tok-slow", user_id="fb-3")
+
+    started = time.perf_counter()
+    assert _verify(verifier, "tok-slow")["id"] == "fb-3"
+    elapsed = time.perf_counter() - started
+
+    assert server.max_in_flight == 2
+    assert elapsed < 0.55
+
+
+def test_facebook_complete_uses_the_graph_api(db_session, fake_graph, monkeypatch):
+    session, models, _crud = db_session
+    server, _verifier = fake_graph
+    server.add_token("fb-user-token", user_id="fb-graph-1", email="graph@example.com")
+
+    from app.main import app
+    from app.database import get_db
+    from app.routes import auth as auth_routes
+
+    def override_get_db():
+        yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    monkeypatch.setattr(auth_routes.settings, "FACEBOOK_APP_ID", "test-fb-app")
+    monkeypatch.setattr(auth_routes.settings, "FACEBOOK_APP_SECRET", "test-fb-secret")
+    client = TestClient(app)
+    try:
+        payload = {"facebook_access_token": "fb-user-token", "phone": "592 555 0101"}
+        resp = client.post("/auth/facebook/complete", json=payload)
+        assert resp.status_code == 200
+        assert resp.json()["user"]["email"] == "graph@example.com"
+
+        # Logging in again with the same token is served from the cache.
+        assert client.post("/auth/facebook/complete", json=payload).status_code == 200
+        assert len(server.requests) == 2
+        assert {request["path"] for request in server.requests} == {
+            "/v19.0/debug_token",
+            "/v19.0/me",
+        }
+    finally:
+        app.dependency_overrides.clear()
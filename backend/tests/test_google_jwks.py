@@ -0,0 +1,139 @@
+import threading
+import time
+
+from app.services import google_jwks
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class _Session:
+    """Serves `keys` with `max_age`; counts (and optionally slows) fetches."""
+
+    def __init__(self, keys, *, max_age=3600, delay=0.0):
+        self.keys = keys
+        self.max_age = max_age
+        self.delay = delay
+        self.calls = 0
+        self.fail = False
+
+    def get(self, url, timeout):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("offline")
+        session = self
+
+        class _Response:
+            headers = {"Cache-Control": f"public, max-age={session.max_age}, must-revalidate"}
+
+            @staticmethod
+            def raise_for_status():
+                return None
+
+            @staticmethod
+            def json():
+                return {"keys": [{"kid": kid, "kty": "RSA"} for kid in session.keys]}
+
+        return _Response()
+
+
+def test_parse_max_age():
+    assert google_jwks.parse_max_age("public, max-age=19742, must-revalidate") == 19742
+    assert google_jwks.parse_max_age("no-cache") == google_jwks.DEFAULT_MAX_AGE_SECONDS
+    assert google_jwks.parse_max_age(None, default=7) == 7
+
+
+def test_keys_are_cached_for_max_age():
+    clock = _Clock()
+    session = _Session(["kid-1"], max_age=3600)
+    cache = google_jwks.JWKSCache(session=session, clock=clock)
+
+    assert cache.get_key("kid-1")["kid"] == "kid-1"
+    clock.now += 1000
+    assert cache.get_key("kid-1")["kid"] == "kid-1"
+    assert session.calls == 1
+
+    clock.now += 3000
+    assert cache.get_key("kid-1")["kid"] == "kid-1"
+    assert session.calls == 2
+
+
+def test_unknown_kid_refetches_at_most_once_per_interval():
+    clock = _Clock()
+    session = _Session(["kid-1"])
+    cache = google_jwks.JWKSCache(session=session, clock=clock)
+    cache.get_key("kid-1")
+
+    # Google rotated in kid-2.
+    session.keys = ["kid-1", "kid-2"]
+    clock.now += google_jwks.UNKNOWN_KID_REFETCH_SECONDS
+    assert cache.get_key("kid-2")["kid"] == "kid-2"
+    assert session.calls == 2
+
+    assert cache.get_key("made-up") is None
+    assert cache.get_key("made-up") is None
+    assert session.calls == 2
+
+
+def test_concurrent_misses_share_one_fetch():
+    session = _Session(["kid-1"], delay=0.2)
+    cache = google_jwks.JWKSCache(session=session)
+    results = []
+
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_key("kid-1")))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert session.calls == 1
+    assert [key["kid"] for key in results] == ["kid-1"] * 8
+
+
+def test_refresh_ahead_runs_in_background_and_failures_keep_old_keys():
+    clock = _Clock()
+    session = _Session(["kid-1"], max_age=3600)
+    cache = google_jwks.JWKSCache(session=session, clock=clock)
+    cache.get_key("kid-1")
+
+    clock.now += 3600 - google_jwks.REFRESH_AHEAD_SECONDS + 1
+    assert cache.get_key("kid-1")["kid"] == "kid-1"
+    deadline = time.monotonic() + 5
+    while session.calls < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert session.calls == 2
+
+    session.fail = True
+    clock.now += 3600
+    assert cache.get_key("kid-1")["kid"] == "kid-1"
+    assert session.calls == 3
+
+
+def test_failed_fetch_backs_off_and_serves_stale_keys():
+    clock = _Clock()
+    session = _Session(["kid-1"], max_age=3600)
+    cache = google_jwks.JWKSCache(session=session, clock=clock)
+    cache.get_key("kid-1")
+
+    session.fail = True
+    clock.now += 3600
+    for _ in range(5):
+        assert cache.get_key("kid-1")["kid"] == "kid-1"
+        assert cache.get_key("kid-2") is None
+    assert session.calls == 2
+
+    session.fail = False
+    session.keys = ["kid-1", "kid-2"]
+    clock.now += google_jwks.FETCH_RETRY_SECONDS
+    assert cache.get_key("kid-2")["kid"] == "kid-2"
+    assert session.calls == 3
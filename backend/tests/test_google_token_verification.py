@@ -22,6 +22,35 @@ def _load_auth_routes(monkeypatch):
     return auth_routes
 
 
+class _FakeJWKSSession:
+    def __init__(self, keys):
+        self.keys = keys
+
+    def get(self, *_args, **_kwargs):
+        keys = self.keys
+
+        class _Response:
+            headers = {"Cache-Control": "public, max-age=3600"}
+
+            @staticmethod
+            def raise_for_status():
+                return None
+
+            @staticmethod
+            def json():
+                return {"keys": keys}
+
+        return _Response()
+
+
+def _use_google_keys(monkeypatch, keys):
+    from app.services import google_jwks
+
+    cache = google_jwks.JWKSCache(session=_FakeJWKSSession(keys))
+    monkeypatch.setattr(google_jwks, "_google_jwks", cache)
+    return cache
+
+
 def test_google_client_ids_parses_csv_and_trims(monkeypatch):
     auth_routes = _load_auth_routes(monkeypatch)
 
@@ -69,14 +98,7 @@ def test_verify_google_id_token_disables_builtin_audience_validation(monkeypatch
         },
     )
 
-    class _Response:
-        ok = True
-
-        @staticmethod
-        def json():
-            return {"keys": [{"kid": "kid-1", "kty": "RSA", "n": "x", "e": "AQAB"}]}
-
-    monkeypatch.setattr(auth_routes.requests, "get", lambda *_args, **_kwargs: _Response())
+    _use_google_keys(monkeypatch, [{"kid": "kid-1", "kty": "RSA", "n": "x", "e": "AQAB"}])
 
     def _fake_decode(token, key, algorithms, audience, issuer, options):
         assert token == "dummy-token"
@@ -121,14 +143,7 @@ def test_verify_google_id_token_rejects_invalid_manual_audience(monkeypatch):
         },
     )
 
-    class _Response:
-        ok = True
-
-        @staticmethod
-        def json():
-            return {"keys": [{"kid": "kid-1", "kty": "RSA", "n": "x", "e": "AQAB"}]}
-
-    monkeypatch.setattr(auth_routes.requests, "get", lambda *_args, **_kwargs: _Response())
+    _use_google_keys(monkeypatch, [{"kid": "kid-1", "kty": "RSA", "n": "x", "e": "AQAB"}])
     monkeypatch.setattr(
         auth_routes.jwt,
         "decode",
@@ -0,0 +1,63 @@
+import asyncio
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from app.services import image_derivatives
+from app.services.image_derivatives import create_derivatives, render_webp
+
+
+def _image_bytes(size, fmt="PNG"):
+    image = Image.new("RGB", size, color=(200, 40, 90))
+    buf = BytesIO()
+    image.save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def test_render_webp_downscales_to_longest_edge():
+    original = _image_bytes((2000, 1000))
+
+    rendered = render_webp(original, 320)
+
+    with Image.open(BytesIO(rendered)) as img:
+        assert img.format == "WEBP"
+        assert img.size == (320, 160)
+    assert len(rendered) < len(original)
+
+
+def test_render_webp_limits_pixels_without_touching_pillow_globals(monkeypatch):
+    default_limit = Image.MAX_IMAGE_PIXELS
+    monkeypatch.setattr(image_derivatives, "MAX_RENDER_PIXELS", 100 * 100)
+
+    with pytest.raises(ValueError):
+        render_webp(_image_bytes((200, 100)), 320)
+    render_webp(_image_bytes((100, 100)), 320)
+    assert Image.MAX_IMAGE_PIXELS == default_limit
+
+
+def test_render_webp_never_upscales():
+    rendered = render_webp(_image_bytes((100, 80)), 320)
+
+    with Image.open(BytesIO(rendered)) as img:
+        assert img.size == (100, 80)
+
+
+def test_create_derivatives_is_best_effort(db_session):
+    stored = []
+
+    def store(fileobj, name):
+        if name == "medium":
+            raise RuntimeError("storage unavailable")
+        stored.append((name, fileobj.name))
+        return {"secure_url": f"https://cdn.example.com/{name}.webp"}
+
+    urls = asyncio.run(create_derivatives(_image_bytes((1600, 1200)), store))
+
+    assert urls == {"thumbnail": "https://cdn.example.com/thumbnail.webp", "medium": None}
+    assert stored == [("thumbnail", "thumbnail.webp")]
+
+    assert asyncio.run(create_derivatives(b"not an image", store)) == {
+        "thumbnail": None,
+        "medium": None,
+    }
@@ -0,0 +1,131 @@
+from fastapi.testclient import TestClient
+
+
+def _build_client(session, user):
+    from app.main import app
+    from app.database import get_db
+    from app.security import get_current_user_async, get_current_user_from_header
+
+    def override_get_db():
+        try:
+            yield session
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user_from_header] = lambda: user
+    app.dependency_overrides[get_current_user_async] = lambda: user
+    return app, TestClient(app)
+
+
+def _notify(session, crud, user_id, count):
+    for index in range(count):
+        crud.create_notification(
+            session,
+            user_id=user_id,
+            type="chat_message",
+            title=f"Message {index}",
+            body="Hello",
+        )
+    session.commit()
+
+
+def test_notifications_are_paginated_by_keyset_cursor(db_session):
+    session, models, crud = db_session
+    user = models.User(username="inbox_pages")
+    other = models.User(username="inbox_other")
+    session.add_all([user, other])
+    session.commit()
+    _notify(session, crud, user.id, 5)
+    _notify(session, crud, other.id, 2)
+
+    app, client = _build_client(session, user)
+    try:
+        first = client.get("/notifications/me", params={"limit": 2})
+        assert first.status_code == 200
+        first_page = first.json()
+        assert [n["title"] for n in first_page["notifications"]] == ["Message 4", "Message 3"]
+        assert first_page["next_cursor"]
+
+        seen = [n["id"] for n in first_page["notifications"]]
+        cursor = first_page["next_cursor"]
+        while cursor:
+            page = client.get("/notifications/me", params={"limit": 2, "cursor": cursor}).json()
+            seen.extend(n["id"] for n in page["notifications"])
+            cursor = page["next_cursor"]
+        assert len(seen) == len(set(seen)) == 5
+
+        bad = client.get("/notifications/me", params={"cursor": "not-a-cursor"})
+        assert bad.status_code == 400
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_unread_counter_tracks_inserts_and_reads(db_session):
+    session, models, crud = db_session
+    user = models.User(username="inbox_badge")
+    session.add(user)
+    session.commit()
+    _notify(session, crud, user.id, 3)
+
+    assert crud.get_unread_notification_count(session, user_id=user.id) == 3
+
+    first = (
+        session.query(models.Notification)
+        .filter(models.Notification.user_id == user.id)
+        .order_by(models.Notification.id)
+        .first()
+    )
+    assert crud.mark_notification_read(session, notification_id=first.id, user_id=user.id)
+    # Marking the same notification again doesn't decrement twice.
+    assert crud.mark_notification_read(session, notification_id=first.id, user_id=user.id)
+    assert crud.get_unread_notification_count(session, user_id=user.id) == 2
+    assert not crud.mark_notification_read(session, notification_id=first.id, user_id=user.id + 1)
+
+    assert crud.mark_all_notifications_read(session, user_id=user.id) == 2
+    assert crud.get_unread_notification_count(session, user_id=user.id) == 0
+
+    _notify(session, crud, user.id, 1)
+    app, client = _build_client(session, user)
+    try:
+        response = client.get("/notifications/me/unread-count")
+        assert response.json() == {"unread_count": 1}
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_mark_all_read_keeps_a_concurrent_increment(db_session):
+    from sqlalchemy import event
+
+    session, models, crud = db_session
+    user = models.User(username="inbox_race")
+    session.add(user)
+    session.commit()
+    _notify(session, crud, user.id, 2)
+
+    delivered = []
+
+    # A notification lands right after the bulk UPDATE has picked its rows.
+    def deliver_concurrently(conn, cursor, statement, parameters, context, executemany):
+        if not delivered and statement.lstrip().upper().startswith("UPDATE NOTIFICATIONS"):
+            delivered.append(True)
+            conn.execute(
+                models.Notification.__table__.insert().values(
+                    user_id=user.id, type="chat_message", title="Late", body="Hello"
+                )
+            )
+            conn.execute(
+                models.User.__table__.update()
+                .where(models.User.id == user.id)
+                .values(unread_notification_count=models.User.unread_notification_count + 1)
+            )
+
+    engine = session.get_bind()
+    event.listen(engine, "after_cursor_execute", deliver_concurrently)
+    try:
+        assert crud.mark_all_notifications_read(session, user_id=user.id) == 2
+    finally:
+        event.remove(engine, "after_cursor_execute", deliver_concurrently)
+
+    assert delivered
+    assert crud.get_unread_notification_count(session, user_id=user.id) == 1
@@ -0,0 +1,76 @@
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+
+def _use_hash_settings(monkeypatch, **values):
+    import app.config as config
+
+    for name, value in values.items():
+        monkeypatch.setenv(name, str(value))
+    config.get_settings.cache_clear()
+
+
+def test_login_rehashes_when_rounds_change(db_session, monkeypatch):
+    session, models, crud = db_session
+
+    _use_hash_settings(monkeypatch, PASSWORD_HASH_ROUNDS=1000)
+    user = models.User(
+        username="rehash_user",
+        email="rehash@example.com",
+        hashed_password=crud.hash_password("Secret123!"),
+    )
+    session.add(user)
+    session.commit()
+    assert user.hashed_password.startswith("$pbkdf2-sha256$1000$")
+
+    _use_hash_settings(monkeypatch, PASSWORD_HASH_ROUNDS=2000)
+    assert crud.authenticate_user(session, "rehash@example.com", "wrong") is None
+    assert user.hashed_password.startswith("$pbkdf2-sha256$1000$")
+
+    assert crud.authenticate_user(session, "rehash@example.com", "Secret123!") is not None
+    session.refresh(user)
+    assert user.hashed_password.startswith("$pbkdf2-sha256$2000$")
+    assert crud.verify_password("Secret123!", user.hashed_password)
+
+
+def test_unrecognised_hashes_do_not_verify(db_session):
+    _session, _models, crud = db_session
+
+    assert not crud.verify_password("Secret123!", "not-a-hash")
+    assert not crud.verify_password("Secret123!", None)
+
+
+def test_hashing_runs_in_the_process_pool(db_session, monkeypatch):
+    _session, _models, crud = db_session
+    from app.services import password_hasher
+
+    _use_hash_settings(monkeypatch, PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_ROUNDS=1000)
+    try:
+        hashed = crud.hash_password("Secret123!")
+        assert password_hasher._pool is not None
+        assert crud.verify_password("Secret123!", hashed)
+        assert not crud.verify_password("Other123!", hashed)
+    finally:
+        password_hasher.shutdown_password_pool()
+
+
+def test_a_broken_pool_is_replaced(db_session, monkeypatch):
+    _session, _models, crud = db_session
+    from app.services import password_hasher
+
+    _use_hash_settings(monkeypatch, PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_ROUNDS=1000)
+    try:
+        crud.hash_password("Secret123!")
+        broken = password_hasher._pool
+        # A worker dying (e.g. OOM-killed) breaks the executor for good.
+        with pytest.raises(BrokenProcessPool):
+            broken.submit(os._exit, 1).result()
+
+        hashed = crud.hash_password("Secret123!")
+        assert password_hasher._pool is not None
+        assert password_hasher._pool is not broken
+        assert crud.verify_password("Secret123!", hashed)
+    finally:
+        password_hasher.shutdown_password_pool()
@@ -0,0 +1,95 @@
+from app import schemas
+from app.utils.geo import (
+    bounding_box,
+    covering_geohash_prefixes,
+    encode_geohash,
+    haversine_km,
+)
+
+
+def _create_provider(session, models, crud, username: str, lat=None, long=None):
+    user = models.User(
+        username=username,
+        email=f"{username}@example.com",
+        hashed_password="x",
+        is_provider=True,
+        lat=lat,
+        long=long,
+    )
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    return crud.create_provider_for_user(db=session, user=user)
+
+
+def test_geohash_and_haversine_helpers():
+    # Well-known reference value for the geohash algorithm.
+    assert encode_geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"
+
+    # Georgetown -> Linden is roughly 80km.
+    distance = haversine_km(6.8013, -58.1551, 6.0081, -58.3071)
+    assert 85 < distance < 95
+
+    box = bounding_box(6.8013, -58.1551, 10)
+    prefixes = covering_geohash_prefixes(*box)
+    assert prefixes and len(prefixes) <= 16
+    assert any(encode_geohash(6.8013, -58.1551).startswith(p) for p in prefixes)
+
+
+def test_geohash_tracks_user_coordinates(db_session):
+    session, models, crud = db_session
+
+    provider = _create_provider(session, models, crud, "geotracked", 6.8013, -58.1551)
+    user = provider.user
+    assert user.geohash == encode_geohash(6.8013, -58.1551)
+
+    crud.update_user(session, user.id, schemas.UserUpdate(lat=6.0081, long=-58.3071))
+    session.refresh(user)
+    assert user.geohash == encode_geohash(6.0081, -58.3071)
+
+    user.lat = None
+    session.commit()
+    assert user.geohash is None
+
+
+def test_list_providers_near_filters_and_sorts_by_distance(db_session):
+    session, models, crud = db_session
+
+    far = _create_provider(session, models, crud, "lindenpro", 6.0081, -58.3071)
+    mid = _create_provider(session, models, crud, "diamondpro", 6.7480, -58.1800)
+    close = _create_provider(session, models, crud, "stabroekpro", 6.8050, -58.1600)
+    _create_provider(session, models, crud, "nolocation")
+
+    results = crud.list_providers(session, near=(6.8013, -58.1551), radius_km=15)
+    assert [row["provider_id"] for row in results] == [close.id, mid.id]
+    assert results[0]["distance_km"] < results[1]["distance_km"] <= 15
+
+    wide = crud.list_providers(session, near=(6.8013, -58.1551), radius_km=150)
+    assert [row["provider_id"] for row in wide] == [close.id, mid.id, far.id]
+
+    assert len(crud.list_providers(session)) == 4
+
+
+def test_list_providers_route_validates_near(db_session):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.database import get_db
+
+    session, models, crud = db_session
+    provider = _create_provider(session, models, crud, "routepro", 6.8050, -58.1600)
+
+    def override_get_db():
+        yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        client = TestClient(app)
+        ok = client.get("/providers", params={"near": "6.8013,-58.1551", "radius_km": 5})
+        bad = client.get("/providers", params={"near": "somewhere"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert ok.status_code == 200
+    assert [row["provider_id"] for row in ok.json()] == [provider.id]
+    assert "distance_km" in ok.json()[0]
+    assert bad.status_code == 400
@@ -0,0 +1,137 @@
+from app import schemas
+
+
+def _create_provider(session, models, crud, username: str, *, location: str = "", bio: str = ""):
+    user = models.User(
+        username=username,
+        email=f"{username}@example.com",
+        hashed_password="x",
+        is_provider=True,
+        location=location,
+    )
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+
+    provider = crud.create_provider_for_user(db=session, user=user)
+    if bio:
+        crud.update_provider(session, provider.id, schemas.ProviderUpdate(bio=bio))
+    return provider
+
+
+def test_search_ranks_and_tolerates_typos(db_session):
+    session, models, crud = db_session
+
+    plumber = _create_provider(session, models, crud, "pipeking", location="Georgetown")
+    crud.set_professions_for_provider(session, plumber.id, ["Plumber"])
+    barber = _create_provider(session, models, crud, "sharpcuts", location="Linden")
+    crud.set_professions_for_provider(session, barber.id, ["Barber"])
+    crud.create_service_for_provider(
+        session,
+        barber.id,
+        schemas.ServiceCreate(name="Beard trim", description="", price_gyd=1500, duration_minutes=30),
+    )
+
+    results = crud.search_providers(session, "plumbr")
+    assert [row["provider_id"] for row in results] == [plumber.id]
+    assert results[0]["professions"] == ["Plumber"]
+
+    by_service = crud.search_providers(session, "beard")
+    assert [row["provider_id"] for row in by_service] == [barber.id]
+
+    by_location = crud.search_providers(session, "georgetwn")
+    assert [row["provider_id"] for row in by_location] == [plumber.id]
+
+    assert crud.search_providers(session, "electrician") == []
+
+
+def test_search_updates_incrementally(db_session):
+    session, models, crud = db_session
+
+    provider = _create_provider(session, models, crud, "handyhelp")
+    assert crud.search_providers(session, "tiling") == []
+
+    crud.set_professions_for_provider(session, provider.id, ["Tiling"])
+    assert [row["provider_id"] for row in crud.search_providers(session, "tiling")] == [provider.id]
+
+    crud.set_professions_for_provider(session, provider.id, ["Painting"])
+    assert crud.search_providers(session, "tiling") == []
+    assert [row["provider_id"] for row in crud.search_providers(session, "painter")] == [provider.id]
+
+    service = crud.create_service_for_provider(
+        session,
+        provider.id,
+        schemas.ServiceCreate(name="Roof repair", description="", price_gyd=5000, duration_minutes=120),
+    )
+    assert [row["provider_id"] for row in crud.search_providers(session, "roof")] == [provider.id]
+
+    crud.delete_service(session, provider.id, service.id)
+    assert crud.search_providers(session, "roof") == []
+
+
+def test_search_excludes_deleted_providers(db_session):
+    session, models, crud = db_session
+
+    provider = _create_provider(session, models, crud, "gonebaker", bio="Fresh bread daily")
+    assert [row["provider_id"] for row in crud.search_providers(session, "bread")] == [provider.id]
+
+    provider.user.is_deleted = True
+    session.commit()
+
+    assert crud.search_providers(session, "bread") == []
+
+
+def test_search_route_is_not_shadowed_by_provider_id(db_session):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.database import get_db
+
+    session, models, crud = db_session
+    provider = _create_provider(session, models, crud, "nailartist", bio="Gel nails")
+
+    def override_get_db():
+        yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        response = TestClient(app).get("/providers/search", params={"q": "nails"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert [row["provider_id"] for row in response.json()] == [provider.id]
+
+
+def test_rolled_back_edits_do_not_reach_the_index(db_session):
+    session, models, crud = db_session
+    from app.services.provider_search import refresh_provider_search_document
+
+    provider = _create_provider(session, models, crud, "rollbackpro")
+    assert crud.search_providers(session, "glazier") == []
+
+    session.add(models.ProviderProfession(provider_id=provider.id, name="Glazier"))
+    session.flush()
+    refresh_provider_search_document(session, provider.id)
+    session.rollback()
+
+    assert crud.search_providers(session, "glazier") == []
+    assert session.query(models.ProviderProfession).count() == 0
+
+    crud.set_professions_for_provider(session, provider.id, ["Glazier"])
+    assert [row["provider_id"] for row in crud.search_providers(session, "glazier")] == [provider.id]
+
+
+def test_loading_the_index_backfills_without_committing_the_caller(db_session):
+    session, models, crud = db_session
+    from sqlalchemy import event
+
+    provider = _create_provider(session, models, crud, "backfillpro", location="Berbice")
+    session.query(models.ProviderSearchDocument).delete()
+    session.commit()
+
+    commits = []
+    event.listen(session, "after_commit", lambda _session: commits.append(True))
+
+    assert [row["provider_id"] for row in crud.search_providers(session, "berbice")] == [provider.id]
+    assert commits == []
+    assert session.query(models.ProviderSearchDocument).count() == 1
@@ -37,35 +37,20 @@ def test_register_and_deactivate_push_token(db_session):
     assert refreshed.is_active is False
 
 
-def test_send_push_deactivates_invalid_tokens(db_session, monkeypatch):
+def test_send_push_deactivates_invalid_tokens(db_session, fake_expo):
     session, models, _crud = db_session
     from app.services import push_notifications
 
+    server, _client = fake_expo
     user = _seed_user(session, models, 2)
     push_notifications.upsert_push_token(
         session,
         user_id=user.id,
-        expo_push_token="ExponentPushToken[badtoken]",
+        expo_push_token="ExponentPushToken[unregistered]",
         platform="android",
         device_id="dev-2",
     )
 
-    class FakeResponse:
-        content = b"1"
-
-        def json(self):
-            return {
-                "data": {
-                    "status": "error",
-                    "details": {"error": "DeviceNotRegistered"},
-                }
-            }
-
-    monkeypatch.setattr(
-        "app.services.push_notifications.requests.post",
-        lambda *args, **kwargs: FakeResponse(),
-    )
-
     push_notifications.send_push_to_user(
         session,
         user_id=user.id,
@@ -74,10 +59,56 @@ def test_send_push_deactivates_invalid_tokens(db_session, monkeypatch):
         data={"type": "test"},
     )
 
+    assert len(server.requests) == 1
     row = session.query(models.PushToken).filter(models.PushToken.user_id == user.id).first()
     assert row.is_active is False
 
 
+def test_send_push_to_users_batches_across_users_on_one_connection(db_session, fake_expo):
+    session, models, _crud = db_session
+    from app.services import push_notifications
+
+    server, client = fake_expo
+    client.batch_size = 4
+    users = [_seed_user(session, models, 10 + idx) for idx in range(3)]
+    for user in users:
+        for device in ("a", "b"):
+            push_notifications.upsert_push_token(
+                session,
+                user_id=user.id,
+                expo_push_token=f"ExponentPushToken[{user.id}-{device}]",
+            )
+    push_notifications.upsert_push_token(
+        session,
+        user_id=users[1].id,
+        expo_push_token="ExponentPushToken[unregistered-1]",
+    )
+
+    results = push_notifications.send_push_to_users(
+        session,
+        [
+            push_notifications.PushNotification(user_id=user.id, title="Reminder", body=f"u{user.id}")
+            for user in users
+        ],
+    )
+
+    assert [len(request["body"]) for request in server.requests] == [4, 3]
+    assert len({request["client_port"] for request in server.requests}) == 1
+    assert len(results) == 7
+    for _notification, row, ticket in results:
+        if "unregistered" in row.expo_push_token:
+            assert ticket["details"]["error"] == "DeviceNotRegistered"
+        else:
+            assert ticket["id"].endswith(row.expo_push_token)
+
+    active = {
+        row.expo_push_token
+        for row in session.query(models.PushToken).filter(models.PushToken.is_active.is_(True))
+    }
+    assert "ExponentPushToken[unregistered-1]" not in active
+    assert len(active) == 6
+
+
 def test_deactivate_push_token_requires_identifier(db_session):
     session, models, _crud = db_session
     from app.services import push_notifications
@@ -90,3 +121,116 @@ def test_deactivate_push_token_requires_identifier(db_session):
         assert "required" in str(exc)
     else:
         assert False, "Expected ValueError when no identifier is provided"
+
+
+def test_push_receipts_deactivate_dead_tokens_and_prune_stale_ones(db_session, fake_expo):
+    session, models, _crud = db_session
+    from datetime import timedelta
+
+    from app.services import push_notifications
+    from app.utils import metrics
+    from app.utils.time import now_guyana
+
+    server, _client = fake_expo
+    metrics.reset()
+    user = _seed_user(session, models, 20)
+    for name in ("alive", "gone", "pending"):
+        push_notifications.upsert_push_token(
+            session,
+            user_id=user.id,
+            expo_push_token=f"ExponentPushToken[{name}]",
+        )
+
+    push_notifications.send_push_to_user(session, user_id=user.id, title="Hi", body="There")
+    tickets = {
+        ticket.expo_push_token: ticket
+        for ticket in session.query(models.PushTicket).all()
+    }
+    assert len(tickets) == 3
+    assert metrics.snapshot()["distributions"]["push.fanout_tokens_per_user"]["max"] == 3
+
+    # Nothing is old enough to have a receipt yet.
+    assert push_notifications.process_push_receipts(session)["checked"] == 0
+
+    for ticket in tickets.values():
+        ticket.created_at = now_guyana() - timedelta(minutes=20)
+    tickets["ExponentPushToken[pending]"].created_at = now_guyana() - timedelta(hours=2)
+    session.commit()
+    server.receipts = {
+        tickets["ExponentPushToken[alive]"].ticket_id: {"status": "ok"},
+        tickets["ExponentPushToken[gone]"].ticket_id: {
+            "status": "error",
+            "details": {"error": "DeviceNotRegistered"},
+        },
+    }
+
+    summary = push_notifications.process_push_receipts(session)
+
+    assert summary == {"checked": 3, "ok": 1, "errors": 1, "expired": 0, "deactivated": 1}
+    assert server.requests[-1]["path"].endswith("/getReceipts")
+    remaining = session.query(models.PushTicket).all()
+    assert [ticket.expo_push_token for ticket in remaining] == ["ExponentPushToken[pending]"]
+    gone = (
+        session.query(models.PushToken)
+        .filter(models.PushToken.expo_push_token == "ExponentPushToken[gone]")
+        .one()
+    )
+    assert gone.is_active is False
+
+    stale = (
+        session.query(models.PushToken)
+        .filter(models.PushToken.expo_push_token == "ExponentPushToken[alive]")
+        .one()
+    )
+    stale.last_seen_at = now_guyana() - timedelta(days=120)
+    session.commit()
+
+    assert push_notifications.prune_stale_push_tokens(session, max_idle_days=90) == 1
+    assert {row.expo_push_token for row in session.query(models.PushToken).all()} == {
+        "ExponentPushToken[gone]",
+        "ExponentPushToken[pending]",
+    }
+    assert metrics.snapshot()["counters"]["push.tokens_pruned"] == 1
+
+
+def test_push_receipts_work_through_every_batch_past_unready_tickets(db_session, fake_expo):
+    session, models, _crud = db_session
+    from datetime import timedelta
+
+    from app.services import push_notifications
+    from app.utils.time import now_guyana
+
+    server, _client = fake_expo
+    user = _seed_user(session, models, 21)
+    now = now_guyana()
+    for index in range(5):
+        session.add(
+            models.PushTicket(
+                ticket_id=f"ticket-{index}",
+                user_id=user.id,
+                expo_push_token="ExponentPushToken[batched]",
+                created_at=now - timedelta(minutes=60 - index),
+            )
+        )
+    session.commit()
+    # The two oldest tickets have no receipt yet.
+    server.receipts = {f"ticket-{index}": {"status": "ok"} for index in range(2, 5)}
+
+    summary = push_notifications.process_push_receipts(session, limit=2)
+
+    assert summary["checked"] == 5
+    assert summary["ok"] == 3
+    remaining = session.query(models.PushTicket).order_by(models.PushTicket.id).all()
+    assert [ticket.ticket_id for ticket in remaining] == ["ticket-0", "ticket-1"]
+    assert all(ticket.checked_at is not None for ticket in remaining)
+
+    # Not rechecked until the interval has passed.
+    assert push_notifications.process_push_receipts(session)["checked"] == 0
+    for ticket in remaining:
+        ticket.checked_at = now - push_notifications.PUSH_RECEIPT_RECHECK_INTERVAL
+    session.commit()
+    server.receipts["ticket-0"] = {"status": "ok"}
+
+    summary = push_notifications.process_push_receipts(session)
+    assert (summary["checked"], summary["ok"]) == (2, 1)
+    assert [ticket.ticket_id for ticket in session.query(models.PushTicket).all()] == ["ticket-1"]
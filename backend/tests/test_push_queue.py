@@ -0,0 +1,153 @@
+from datetime import timedelta
+
+
+def _background_mode(monkeypatch):
+    # No worker threads are started in tests, so jobs stay queued until
+    # process_push_jobs is called explicitly.
+    import app.config as config
+
+    monkeypatch.setenv("PUSH_DISPATCH_MODE", "background")
+    config.get_settings.cache_clear()
+
+
+def _seed_user_with_token(session, models, name):
+    from app.services import push_notifications
+
+    user = models.User(username=name)
+    session.add(user)
+    session.commit()
+    push_notifications.upsert_push_token(
+        session,
+        user_id=user.id,
+        expo_push_token=f"ExponentPushToken[{name}]",
+    )
+    return user
+
+
+def test_enqueue_is_idempotent_per_dedupe_key(db_session, monkeypatch, fake_expo):
+    session, models, _crud = db_session
+    from app.services import push_queue
+
+    _background_mode(monkeypatch)
+    server, _client = fake_expo
+    user = _seed_user_with_token(session, models, "queue_dedupe")
+
+    assert push_queue.enqueue_push(
+        session, user_id=user.id, title="Cancelled", body="b", dedupe_key="booking:1:canceled"
+    )
+    assert not push_queue.enqueue_push(
+        session, user_id=user.id, title="Cancelled", body="b", dedupe_key="booking:1:canceled"
+    )
+    session.commit()
+    assert server.requests == []
+
+    assert push_queue.process_push_jobs(session) == 1
+    job = session.query(models.PushJob).one()
+    assert job.status == "sent"
+    assert job.sent_at is not None
+    assert len(server.requests) == 1
+
+    assert push_queue.process_push_jobs(session) == 0
+
+
+def test_transient_failures_back_off_then_fail(db_session, monkeypatch):
+    session, models, _crud = db_session
+    from app.services import push_notifications, push_queue
+    from app.utils.time import now_guyana
+
+    _background_mode(monkeypatch)
+    # Nothing listens on port 9: every batch fails with RequestFailed.
+    push_notifications.set_expo_client(
+        push_notifications.ExpoPushClient(url="http://127.0.0.1:9/push/send", timeout=1)
+    )
+    user = _seed_user_with_token(session, models, "queue_retry")
+    try:
+        push_queue.enqueue_push(session, user_id=user.id, title="t", body="b")
+        session.commit()
+
+        assert push_queue.process_push_jobs(session) == 1
+        job = session.query(models.PushJob).one()
+        assert job.status == "pending"
+        assert job.attempts == 1
+        assert job.last_error == "RequestFailed"
+        first_delay = job.next_attempt_at - now_guyana()
+        assert timedelta(seconds=25) < first_delay <= timedelta(seconds=34)
+
+        # Not due yet.
+        assert push_queue.process_push_jobs(session) == 0
+
+        for _ in range(push_queue.PUSH_JOB_MAX_ATTEMPTS - 1):
+            job.next_attempt_at = now_guyana() - timedelta(seconds=1)
+            session.commit()
+            push_queue.process_push_jobs(session)
+            session.refresh(job)
+        assert job.status == "failed"
+        assert job.attempts == push_queue.PUSH_JOB_MAX_ATTEMPTS
+    finally:
+        push_notifications.set_expo_client(None)
+
+
+def test_per_user_rate_limit_defers_excess_jobs(db_session, monkeypatch, fake_expo):
+    session, models, _crud = db_session
+    from app.services import push_queue
+
+    _background_mode(monkeypatch)
+    monkeypatch.setenv("PUSH_USER_RATE_LIMIT_PER_MINUTE", "2")
+    server, _client = fake_expo
+    chatty = _seed_user_with_token(session, models, "queue_chatty")
+    quiet = _seed_user_with_token(session, models, "queue_quiet")
+
+    for idx in range(4):
+        push_queue.enqueue_push(session, user_id=chatty.id, title="m", body=str(idx))
+    push_queue.enqueue_push(session, user_id=quiet.id, title="m", body="q")
+    session.commit()
+
+    assert push_queue.process_push_jobs(session) == 5
+    # One Expo request for everything delivered in this pass.
+    assert [len(request["body"]) for request in server.requests] == [3]
+
+    statuses = {
+        (job.user_id, job.status)
+        for job in session.query(models.PushJob).all()
+    }
+    assert statuses == {(chatty.id, "sent"), (chatty.id, "pending"), (quiet.id, "sent")}
+    deferred = (
+        session.query(models.PushJob)
+        .filter(models.PushJob.status == "pending")
+        .all()
+    )
+    assert len(deferred) == 2
+    assert all(job.attempts == 0 for job in deferred)
+
+
+def test_a_job_is_claimed_by_only_one_worker(db_session, monkeypatch):
+    session, models, _crud = db_session
+    from sqlalchemy import event
+    from sqlalchemy.orm import sessionmaker
+
+    from app.services import push_queue
+
+    _background_mode(monkeypatch)
+    user = _seed_user_with_token(session, models, "queue_claim")
+    for idx in range(3):
+        push_queue.enqueue_push(session, user_id=user.id, title="m", body=str(idx))
+    session.commit()
+
+    factory = sessionmaker(bind=session.get_bind())
+    first, second = factory(), factory()
+    stolen = []
+
+    # Let `second` claim everything after `first` has read its candidates
+    # but before it marks them; SQLite ignores FOR UPDATE SKIP LOCKED.
+    @event.listens_for(first, "do_orm_execute")
+    def _race(orm_execute_state):
+        if orm_execute_state.is_update and not stolen:
+            stolen.extend(push_queue._claim_due_jobs(second, 10))
+
+    try:
+        assert push_queue._claim_due_jobs(first, 10) == []
+        assert len(stolen) == 3
+        assert {job.status for job in session.query(models.PushJob).all()} == {"processing"}
+    finally:
+        first.close()
+        second.close()
@@ -0,0 +1,119 @@
+import logging
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+
+from app.utils.time import now_guyana
+
+
+def _seed_providers(session, models, crud, count):
+    customer = models.User(username="budget_customer", email="budget_customer@example.com")
+    session.add(customer)
+    session.commit()
+
+    providers = []
+    for index in range(count):
+        user = models.User(
+            username=f"budget_provider_{index}",
+            email=f"budget_provider_{index}@example.com",
+            is_provider=True,
+        )
+        session.add(user)
+        session.commit()
+        provider = crud.create_provider_for_user(db=session, user=user)
+        crud.set_professions_for_provider(session, provider.id, ["Barber", "Stylist"])
+        service = models.Service(
+            provider_id=provider.id, name=f"Cut {index}", price_gyd=1000, duration_minutes=60
+        )
+        session.add(service)
+        session.commit()
+
+        start = now_guyana() + timedelta(days=index + 1)
+        session.add(
+            models.Booking(
+                customer_id=customer.id,
+                service_id=service.id,
+                start_time=start,
+                end_time=start + timedelta(hours=1),
+                status="confirmed",
+            )
+        )
+        session.commit()
+        providers.append((user, provider))
+    return customer, providers
+
+
+def _client_as(user):
+    from app.main import app
+    from app.security import get_current_user_async, get_current_user_from_header
+
+    app.dependency_overrides[get_current_user_from_header] = lambda: user
+    app.dependency_overrides[get_current_user_async] = lambda: user
+    client = TestClient(app)
+    # The first request creates the SQLite tables; keep it out of the budgets.
+    client.get("/providers")
+    return app, client
+
+
+def test_listing_endpoints_stay_within_query_budgets(db_session, query_budget):
+    session, models, crud = db_session
+    customer, providers = _seed_providers(session, models, crud, 5)
+    app, client = _client_as(customer)
+    try:
+        with query_budget(5):
+            response = client.get("/bookings/me")
+        assert len(response.json()) == 5
+
+        with query_budget(3):
+            response = client.get("/providers")
+        assert {tuple(item["professions"]) for item in response.json()} == {("Barber", "Stylist")}
+
+        with query_budget(5):
+            assert len(client.get("/providers/search", params={"q": "budget"}).json()) == 5
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_billing_cycles_stay_within_query_budget(db_session, query_budget):
+    session, models, crud = db_session
+    _customer, providers = _seed_providers(session, models, crud, 1)
+    provider_user, provider = providers[0]
+    session.add_all(
+        models.BillingCycle(account_number=provider.account_number, cycle_month=date(2024, month, 1))
+        for month in range(1, 7)
+    )
+    session.commit()
+
+    app, client = _client_as(provider_user)
+    try:
+        # Fees are computed per cycle, so the cost scales with `limit`.
+        with query_budget(40):
+            response = client.get("/providers/me/billing/cycles", params={"limit": 6})
+        assert len(response.json()["cycles"]) == 6
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_responses_carry_query_stats_and_n_plus_one_is_logged(db_session, caplog):
+    session, models, crud = db_session
+    from app.services import query_stats
+
+    customer, _providers = _seed_providers(session, models, crud, 3)
+    app, client = _client_as(customer)
+    try:
+        response = client.get("/bookings/me")
+        assert int(response.headers["X-Query-Count"]) >= 1
+        assert response.headers["Server-Timing"].startswith("db;dur=")
+    finally:
+        app.dependency_overrides.clear()
+
+    stats = query_stats.QueryStats()
+    for provider_id in (1, 2, 3):
+        stats.record(f"SELECT * FROM services WHERE provider_id = {provider_id}", 0.001)
+    stats.record("SELECT * FROM services WHERE id IN (1, 2, 3)", 0.001)
+    assert stats.repeated(3) == [("SELECT * FROM services WHERE provider_id = ?", 3)]
+
+    middleware = query_stats.QueryStatsMiddleware(None, count_threshold=10, repeat_threshold=3)
+    with caplog.at_level(logging.WARNING, logger="app.services.query_stats"):
+        middleware._report({"method": "GET", "path": "/bookings/me"}, stats)
+    assert "3x SELECT * FROM services WHERE provider_id = ?" in caplog.text
@@ -0,0 +1,151 @@
+import pytest
+from fastapi.testclient import TestClient
+
+
+def _build_client(session, monkeypatch, limits):
+    import app.config as config
+
+    monkeypatch.setenv("RATE_LIMITS", limits)
+    config.get_settings.cache_clear()
+
+    from app.main import app
+    from app.database import get_db
+
+    def override_get_db():
+        try:
+            yield session
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = override_get_db
+    return app, TestClient(app)
+
+
+def test_forgot_password_is_throttled_with_retry_after(db_session, monkeypatch):
+    session, _models, _crud = db_session
+    from app.utils import metrics
+
+    metrics.reset()
+    app, client = _build_client(session, monkeypatch, "forgot_password=2/60")
+    try:
+        payload = {"email": "nobody@example.com"}
+        assert client.post("/auth/forgot-password", json=payload).status_code == 200
+        assert client.post("/auth/forgot-password", json=payload).status_code == 200
+
+        throttled = client.post("/auth/forgot-password", json=payload)
+        assert throttled.status_code == 429
+        assert 1 <= int(throttled.headers["Retry-After"]) <= 30
+        assert throttled.json()["detail"]
+
+        # Other routes are unaffected.
+        assert client.get("/healthz").status_code == 200
+    finally:
+        app.dependency_overrides.clear()
+
+    counters = metrics.snapshot()["counters"]
+    assert counters["rate_limit.throttled.forgot_password"] == 1
+
+
+def test_memory_buckets_refill_over_time():
+    from app.services.rate_limit import DEFAULT_RULES, InMemoryRateLimitBackend
+
+    rule = next(rule for rule in DEFAULT_RULES if rule.name == "login")
+    now = [0.0]
+    backend = InMemoryRateLimitBackend(clock=lambda: now[0])
+
+    for _ in range(rule.capacity):
+        assert backend.consume("login:ip:1.2.3.4", rule).allowed
+    denied = backend.consume("login:ip:1.2.3.4", rule)
+    assert not denied.allowed
+    assert denied.retry_after == pytest.approx(rule.period_seconds / rule.capacity)
+    assert backend.consume("login:ip:5.6.7.8", rule).allowed
+
+    now[0] += denied.retry_after
+    assert backend.consume("login:ip:1.2.3.4", rule).allowed
+
+
+def test_database_buckets_are_shared_between_backends(db_session):
+    session, models, _crud = db_session
+    from sqlalchemy.orm import sessionmaker
+
+    from app.services.rate_limit import (
+        DatabaseRateLimitBackend,
+        RateLimitRule,
+        prune_rate_limit_buckets,
+    )
+
+    rule = RateLimitRule("test", frozenset({"POST"}), "/x", capacity=2, period_seconds=60)
+    now = [1000.0]
+    factory = sessionmaker(bind=session.get_bind())
+    first = DatabaseRateLimitBackend(factory, clock=lambda: now[0])
+    second = DatabaseRateLimitBackend(factory, clock=lambda: now[0])
+
+    assert first.consume("test:ip:1", rule).allowed
+    assert second.consume("test:ip:1", rule).allowed
+    denied = first.consume("test:ip:1", rule)
+    assert not denied.allowed
+    assert denied.retry_after == pytest.approx(30)
+
+    now[0] += 30
+    assert second.consume("test:ip:1", rule).allowed
+    assert session.query(models.RateLimitBucket).count() == 1
+
+    assert prune_rate_limit_buckets(session, older_than_seconds=0) == 1
+
+
+def test_rule_overrides():
+    from app.services.rate_limit import parse_rule_overrides
+
+    rules = {rule.name: rule for rule in parse_rule_overrides("login=3/30, availability=off")}
+    assert rules["login"].capacity == 3
+    assert rules["login"].period_seconds == 30
+    assert "availability" not in rules
+    assert rules["google"].capacity == 20
+
+    with pytest.raises(ValueError):
+        parse_rule_overrides("nope=1/1")
+
+
+def test_availability_buckets_are_per_user(db_session, monkeypatch):
+    session, _models, _crud = db_session
+    from app.auth.jwt import create_access_token
+
+    app, client = _build_client(session, monkeypatch, "availability=1/60")
+    first = {"Authorization": f"Bearer {create_access_token({'sub': 'a', 'uid': 1, 'tv': 0})}"}
+    second = {"Authorization": f"Bearer {create_access_token({'sub': 'b', 'uid': 2, 'tv': 0})}"}
+    try:
+        assert client.get("/providers/999/availability", headers=first).status_code != 429
+        assert client.get("/providers/999/availability", headers=first).status_code == 429
+        assert client.get("/providers/999/availability", headers=second).status_code != 429
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_forwarded_clients_get_their_own_buckets(db_session, monkeypatch):
+    session, _models, _crud = db_session
+
+    monkeypatch.setenv("TRUSTED_PROXIES", "*")
+    app, client = _build_client(session, monkeypatch, "forgot_password=1/60")
+    payload = {"email": "nobody@example.com"}
+    first = {"X-Forwarded-For": "203.0.113.7"}
+    second = {"X-Forwarded-For": "198.51.100.23"}
+    try:
+        assert client.post("/auth/forgot-password", json=payload, headers=first).status_code == 200
+        assert client.post("/auth/forgot-password", json=payload, headers=first).status_code == 429
+        assert client.post("/auth/forgot-password", json=payload, headers=second).status_code == 200
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_client_ip_only_trusts_forwarded_for_from_trusted_proxies():
+    from app.services.rate_limit import _client_ip, parse_trusted_proxies
+
+    trusted = parse_trusted_proxies("10.0.0.0/8")
+    forwarded = [(b"x-forwarded-for", b"1.1.1.1, 203.0.113.7, 10.1.2.3")]
+
+    # The spoofable left-most hop is skipped; trusted hops are walked past.
+    assert _client_ip({"client": ("10.0.0.5", 1), "headers": forwarded}, trusted) == "203.0.113.7"
+    # A direct, untrusted peer can't pick its own bucket.
+    assert _client_ip({"client": ("8.8.8.8", 1), "headers": forwarded}, trusted) == "8.8.8.8"
+    assert _client_ip({"client": ("10.0.0.5", 1), "headers": []}, trusted) == "10.0.0.5"
+    assert _client_ip({"client": ("8.8.8.8", 1), "headers": forwarded}, []) == "8.8.8.8"
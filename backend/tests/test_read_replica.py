@@ -0,0 +1,95 @@
+import tempfile
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+@pytest.fixture()
+def replica(db_session, monkeypatch):
+    """A second SQLite database wired in as the read replica."""
+    _session, models, _crud = db_session
+    import app.database as database
+    from app.services import read_routing
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    tmp.close()
+    path = Path(tmp.name)
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    database.Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine, expire_on_commit=False)
+    monitor = read_routing.ReplicaLagMonitor(engine, check_interval=60)
+
+    monkeypatch.setattr(database, "ReadSessionLocal", factory)
+    monkeypatch.setattr(database, "replica_monitor", monitor)
+    read_routing.clear()
+    try:
+        yield factory, monitor
+    finally:
+        read_routing.clear()
+        engine.dispose()
+        path.unlink(missing_ok=True)
+
+
+def _service_names(client, headers=None):
+    response = client.get("/providers/1/services", headers=headers or {})
+    assert response.status_code == 200
+    return [service["name"] for service in response.json()]
+
+
+def test_listing_reads_go_to_the_replica(db_session, replica):
+    session, models, _crud = db_session
+    factory, _monitor = replica
+    from app.main import app
+
+    session.add(models.Service(provider_id=1, name="Primary cut", duration_minutes=30))
+    session.commit()
+    with factory() as replica_session:
+        replica_session.add(models.Service(provider_id=1, name="Replica cut", duration_minutes=30))
+        replica_session.commit()
+
+    assert _service_names(TestClient(app)) == ["Replica cut"]
+
+
+def test_recent_writers_and_lagging_replicas_fall_back_to_the_primary(db_session, replica):
+    session, models, _crud = db_session
+    factory, monitor = replica
+    from app.auth.jwt import create_access_token
+    from app.main import app
+    from app.services import read_routing
+    from app.utils import metrics
+
+    metrics.reset()
+    session.add(models.Service(provider_id=1, name="Primary cut", duration_minutes=30))
+    session.commit()
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'w', 'uid': 7, 'tv': 0})}"}
+
+    # A commit on a session tagged with the user marks them as a writer.
+    session.info[read_routing.SESSION_USER_KEY] = 7
+    session.add(models.Service(provider_id=2, name="Other", duration_minutes=30))
+    session.commit()
+    assert _service_names(client, headers) == ["Primary cut"]
+    assert _service_names(client) == []
+
+    monitor._lag = 120.0
+    assert _service_names(client) == ["Primary cut"]
+
+    counters = metrics.snapshot()["counters"]
+    assert counters["db.read.primary.recent_write"] == 1
+    assert counters["db.read.primary.replica_lagging"] == 1
+    assert counters["db.read.replica"] == 1
+
+
+def test_without_a_replica_reads_use_the_primary(db_session):
+    session, models, _crud = db_session
+    import app.database as database
+    from app.main import app
+
+    assert database.replica_monitor is None
+    session.add(models.Service(provider_id=1, name="Primary cut", duration_minutes=30))
+    session.commit()
+
+    assert _service_names(TestClient(app)) == ["Primary cut"]
@@ -0,0 +1,126 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.services import realtime
+
+
+def _create_booking(session, models):
+    provider_user = models.User(username="rt_provider", is_provider=True)
+    client_user = models.User(username="rt_client")
+    session.add_all([provider_user, client_user])
+    session.commit()
+
+    provider = models.Provider(user_id=provider_user.id, account_number="ACC-RT")
+    session.add(provider)
+    session.commit()
+
+    service = models.Service(
+        provider_id=provider.id,
+        name="Realtime Service",
+        price_gyd=1000,
+        duration_minutes=60,
+    )
+    session.add(service)
+    session.commit()
+
+    booking = models.Booking(
+        customer_id=client_user.id,
+        service_id=service.id,
+        start_time=datetime.utcnow() + timedelta(hours=4),
+        end_time=datetime.utcnow() + timedelta(hours=5),
+        status="confirmed",
+    )
+    session.add(booking)
+    session.commit()
+    return provider_user, client_user, booking
+
+
+def test_chat_message_and_notification_are_published_after_commit(db_session):
+    session, models, crud = db_session
+    provider_user, client_user, booking = _create_booking(session, models)
+    broker = realtime.InMemoryBroker()
+    realtime.set_broker(broker)
+
+    async def scenario():
+        provider_sub = broker.subscribe(realtime.user_channel(provider_user.id))
+        client_sub = broker.subscribe(realtime.user_channel(client_user.id))
+
+        message = crud.send_booking_message(
+            session,
+            booking_id=booking.id,
+            sender_user_id=client_user.id,
+            text="On my way",
+            attachment=None,
+        )
+
+        provider_events = [await provider_sub.get(timeout=1), await provider_sub.get(timeout=1)]
+        client_event = await client_sub.get(timeout=1)
+        assert await client_sub.get(timeout=0.05) is None
+
+        provider_sub.close()
+        client_sub.close()
+        return message, provider_events, client_event
+
+    try:
+        message, provider_events, client_event = asyncio.run(scenario())
+    finally:
+        realtime.set_broker(None)
+
+    assert [event["type"] for event in provider_events] == ["chat_message", "notification"]
+    assert provider_events[0]["data"]["message"]["id"] == message.id
+    assert provider_events[0]["data"]["message"]["text"] == "On my way"
+    assert provider_events[1]["data"]["message_id"] == message.id
+    assert client_event["type"] == "chat_message"
+    assert broker.subscriber_count(realtime.user_channel(provider_user.id)) == 0
+
+
+def test_rolled_back_events_are_discarded(db_session):
+    session, models, _crud = db_session
+    user = models.User(username="rt_rollback")
+    session.add(user)
+    session.commit()
+
+    broker = realtime.InMemoryBroker()
+    realtime.set_broker(broker)
+
+    async def scenario():
+        sub = broker.subscribe(realtime.user_channel(user.id))
+        session.add(models.User(username="rt_rolled_back"))
+        session.flush()
+        realtime.publish_after_commit(session, user.id, "notification", {"id": 1})
+        session.rollback()
+        session.commit()
+        event = await sub.get(timeout=0.05)
+        sub.close()
+        return event
+
+    try:
+        assert asyncio.run(scenario()) is None
+    finally:
+        realtime.set_broker(None)
+
+
+def test_event_stream_formats_server_sent_events():
+    from app.routes.events import _event_stream
+
+    broker = realtime.InMemoryBroker()
+
+    class _Request:
+        async def is_disconnected(self):
+            return False
+
+    async def scenario():
+        sub = broker.subscribe(realtime.user_channel(7))
+        stream = _event_stream(_Request(), sub, heartbeat_seconds=0.05)
+        chunks = [await stream.__anext__()]
+        chunks.append(await stream.__anext__())
+        broker.publish(None, realtime.user_channel(7), {"type": "notification", "data": {"id": 3}})
+        chunks.append(await stream.__anext__())
+        await stream.aclose()
+        return chunks
+
+    ready, keep_alive, notification = asyncio.run(scenario())
+    assert ready.startswith("event: ready\n")
+    assert keep_alive == ": keep-alive\n\n"
+    assert notification == 'event: notification\ndata: {"id": 3}\n\n'
+    assert broker.subscriber_count(realtime.user_channel(7)) == 0
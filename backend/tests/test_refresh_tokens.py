@@ -164,3 +164,50 @@ def test_logout_revokes_refresh_token(db_session):
         assert post_logout.json()["detail"]["code"] == "SESSION_EXPIRED"
     finally:
         app.dependency_overrides = {}
+
+
+def test_rotation_links_tokens_and_rejects_a_stale_record(db_session):
+    session, models, crud = db_session
+    user = _create_verified_user(session, models, crud, email="rotate@test.com")
+    old = crud.create_refresh_token_record(session, user.id, "old-hash")
+
+    new_id = crud.rotate_refresh_token(session, old, "new-hash")
+    session.refresh(old)
+    assert old.revoked_at is not None
+    assert old.replaced_by_token_id == new_id
+    new = session.get(models.RefreshToken, new_id)
+    assert new.token_hash == "new-hash"
+    assert new.user_id == user.id
+    assert new.revoked_at is None
+
+    # A second rotation of the same (now revoked) token leaves no orphan row.
+    assert crud.rotate_refresh_token(session, old, "orphan-hash") is None
+    assert crud.get_refresh_token_by_hash(session, "orphan-hash") is None
+
+
+def test_prune_refresh_tokens_keeps_live_sessions(db_session):
+    session, models, crud = db_session
+    from app.utils.time import now_guyana
+
+    user = _create_verified_user(session, models, crud, email="prune@test.com")
+    long_ago = now_guyana() - timedelta(days=120)
+
+    rotated = crud.create_refresh_token_record(session, user.id, "rotated")
+    current_id = crud.rotate_refresh_token(session, rotated, "current")
+    stale_chain = crud.create_refresh_token_record(session, user.id, "stale-old")
+    stale_id = crud.rotate_refresh_token(session, stale_chain, "stale-new")
+    recent_logout = crud.create_refresh_token_record(session, user.id, "recent-logout")
+    crud.revoke_refresh_token(session, recent_logout)
+
+    session.refresh(stale_chain)
+    stale_chain.created_at = stale_chain.last_used_at = stale_chain.revoked_at = long_ago
+    stale = session.get(models.RefreshToken, stale_id)
+    stale.created_at = stale.last_used_at = long_ago
+    session.refresh(rotated)
+    rotated.revoked_at = long_ago
+    session.commit()
+
+    assert crud.prune_refresh_tokens(session, inactivity_days=90, batch_size=1) == 3
+    remaining = {token.token_hash for token in session.query(models.RefreshToken).all()}
+    assert remaining == {"current", "recent-logout"}
+    assert session.get(models.RefreshToken, current_id) is not None
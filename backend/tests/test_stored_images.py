@@ -0,0 +1,154 @@
+from io import BytesIO
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+
+def _build_client(session, user):
+    from app.main import app
+    from app.database import get_db
+    from app.security import get_current_user_from_header
+
+    def override_get_db():
+        yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user_from_header] = lambda: user
+    return app, TestClient(app)
+
+
+def _image_bytes(color):
+    buf = BytesIO()
+    Image.new("RGB", (64, 48), color=color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_duplicate_catalog_uploads_share_one_stored_image(db_session, monkeypatch):
+    session, models, crud = db_session
+    user = models.User(username="dedupe_provider", is_provider=True)
+    session.add(user)
+    session.commit()
+    provider = models.Provider(user_id=user.id, account_number="ACC-DEDUPE")
+    session.add(provider)
+    session.commit()
+
+    app, client = _build_client(session, user)
+    uploads = []
+    destroyed = []
+
+    def fake_upload(fileobj, public_id=None):
+        uploads.append(public_id)
+        return {
+            "secure_url": f"https://cdn.example.com/catalog/{public_id}.png",
+            "public_id": f"bookitgy/catalog/{public_id}",
+        }
+
+    def fake_derivative(fileobj, variant, *, folder, public_id=None):
+        return {"secure_url": f"https://cdn.example.com/{variant}/{public_id}.webp"}
+
+    monkeypatch.setattr("app.routes.providers.upload_catalog_image", fake_upload)
+    monkeypatch.setattr("app.routes.providers.upload_image_derivative", fake_derivative)
+    monkeypatch.setattr(
+        crud,
+        "destroy_stored_image",
+        lambda public_id, variants=(): destroyed.append((public_id, list(variants))),
+    )
+
+    try:
+        same = _image_bytes((10, 120, 200))
+        first = client.post("/providers/me/catalog", files={"file": ("a.png", same, "image/png")})
+        second = client.post("/providers/me/catalog", files={"file": ("b.png", same, "image/png")})
+        other = client.post(
+            "/providers/me/catalog",
+            files={"file": ("c.png", _image_bytes((200, 10, 10)), "image/png")},
+        )
+        assert first.status_code == 200
+        assert second.status_code == 200
+        assert other.status_code == 200
+
+        assert len(uploads) == 2
+        assert first.json()["image_url"] == second.json()["image_url"]
+        assert first.json()["thumbnail_url"] == second.json()["thumbnail_url"]
+        assert first.json()["id"] != second.json()["id"]
+
+        stored = crud.get_stored_image(session, "catalog", uploads[0])
+        assert stored.ref_count == 2
+
+        response = client.delete(f"/providers/me/catalog/{first.json()['id']}")
+        assert response.status_code == 200
+        assert destroyed == []
+        session.refresh(stored)
+        assert stored.ref_count == 1
+
+        response = client.delete(f"/providers/me/catalog/{second.json()['id']}")
+        assert response.status_code == 200
+        assert destroyed == [(f"bookitgy/catalog/{uploads[0]}", ["thumbnail", "medium"])]
+        session.expire_all()
+        assert crud.get_stored_image(session, "catalog", uploads[0]) is None
+        assert crud.get_stored_image(session, "catalog", uploads[1]).ref_count == 1
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_released_images_are_uploaded_again_and_avatars_are_not_counted(db_session, monkeypatch):
+    session, models, crud = db_session
+    from sqlalchemy.orm import Session
+
+    user = models.User(username="release_provider", is_provider=True)
+    session.add(user)
+    session.commit()
+    session.add(models.Provider(user_id=user.id, account_number="ACC-RELEASE"))
+    session.commit()
+
+    app, client = _build_client(session, user)
+    uploads = []
+    destroyed = []
+
+    def fake_upload(fileobj, public_id=None):
+        uploads.append(public_id)
+        return {
+            "secure_url": f"https://cdn.example.com/{public_id}.png",
+            "public_id": f"bookitgy/{public_id}",
+        }
+
+    def fake_derivative(fileobj, variant, *, folder, public_id=None):
+        return {"secure_url": f"https://cdn.example.com/{variant}/{public_id}.webp"}
+
+    monkeypatch.setattr("app.routes.providers.upload_catalog_image", fake_upload)
+    monkeypatch.setattr("app.routes.users.upload_avatar", fake_upload)
+    monkeypatch.setattr("app.routes.providers.upload_image_derivative", fake_derivative)
+    monkeypatch.setattr("app.routes.users.upload_image_derivative", fake_derivative)
+    monkeypatch.setattr(
+        crud,
+        "destroy_stored_image",
+        lambda public_id, variants=(): destroyed.append(public_id),
+    )
+
+    try:
+        same = _image_bytes((30, 60, 90))
+        first = client.post("/providers/me/catalog", files={"file": ("a.png", same, "image/png")})
+        assert first.status_code == 200
+
+        # Another upload found the row just before the last reference went.
+        racing = Session(bind=session.get_bind())
+        try:
+            found = crud.get_stored_image(racing, "catalog", uploads[0])
+            assert client.delete(f"/providers/me/catalog/{first.json()['id']}").status_code == 200
+            assert destroyed == [f"bookitgy/{uploads[0]}"]
+            assert crud.reference_stored_image(racing, found) is None
+        finally:
+            racing.close()
+
+        again = client.post("/providers/me/catalog", files={"file": ("b.png", same, "image/png")})
+        assert again.status_code == 200
+        assert uploads == [uploads[0], uploads[0]]
+
+        avatar = _image_bytes((90, 60, 30))
+        for _ in range(3):
+            response = client.post("/users/me/avatar", files={"file": ("me.png", avatar, "image/png")})
+            assert response.status_code == 200
+        session.expire_all()
+        assert crud.get_stored_image(session, "avatar", uploads[-1]).ref_count == 0
+        assert len(uploads) == 3
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,172 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+
+@contextmanager
+def _count_queries(session):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def _authenticate(session, user):
+    from app.auth.jwt import create_access_token
+    from app.security import get_current_user_from_header
+
+    token = create_access_token({"sub": user.email, "tv": user.token_version, "uid": user.id})
+    return get_current_user_from_header(
+        SimpleNamespace(url=SimpleNamespace(path="/users/me")),
+        authorization=f"Bearer {token}",
+        db=session,
+    )
+
+
+def _new_session(session):
+    from sqlalchemy.orm import Session
+
+    return Session(bind=session.get_bind())
+
+
+def test_cached_user_skips_the_lookup_and_stays_writable(db_session):
+    session, models, _crud = db_session
+    user = models.User(username="cached_user", email="cached@example.com", token_version=0)
+    session.add(user)
+    session.commit()
+
+    _authenticate(session, user)
+
+    other = _new_session(session)
+    try:
+        with _count_queries(other) as statements:
+            current = _authenticate(other, user)
+        assert current.id == user.id
+        assert not any("FROM users" in statement for statement in statements)
+
+        # The merged copy belongs to the request session and can be saved.
+        current.location = "Georgetown"
+        other.commit()
+    finally:
+        other.close()
+
+    session.expire_all()
+    assert session.get(models.User, user.id).location == "Georgetown"
+
+    third = _new_session(session)
+    try:
+        with _count_queries(third) as statements:
+            assert _authenticate(third, user).location == "Georgetown"
+        assert any("FROM users" in statement for statement in statements)
+    finally:
+        third.close()
+
+
+def test_suspension_and_token_bumps_invalidate_the_cache(db_session):
+    session, models, crud = db_session
+    from app.services import user_cache
+
+    user = models.User(username="cached_suspend", email="suspend@example.com", token_version=0)
+    session.add(user)
+    session.commit()
+    _authenticate(session, user)
+
+    crud.set_user_suspension(session, user.id, True)
+    assert user_cache._entries.get(user.id) is None
+
+    _authenticate(session, user)
+    user.token_version = 1
+    session.commit()
+    stale = SimpleNamespace(id=user.id, email=user.email, token_version=0)
+    with pytest.raises(HTTPException) as exc_info:
+        _authenticate(session, stale)
+    assert exc_info.value.status_code == 401
+
+
+def test_provider_lookup_is_cached_with_the_user(db_session):
+    session, models, crud = db_session
+    from app.services import user_cache
+
+    user = models.User(username="cached_provider", email="prov@example.com", is_provider=True)
+    session.add(user)
+    session.commit()
+    provider = models.Provider(user_id=user.id, account_number="ACC-CACHE")
+    session.add(provider)
+    session.commit()
+    _authenticate(session, user)
+
+    calls = []
+
+    def loader(db, user_id):
+        calls.append(user_id)
+        return crud.get_provider_by_user_id(db, user_id)
+
+    assert user_cache.get_provider(session, user.id, loader).id == provider.id
+    other = _new_session(session)
+    try:
+        cached = user_cache.get_provider(other, user.id, loader)
+        assert cached.id == provider.id
+        assert calls == [user.id]
+
+        cached.bio = "Updated"
+        other.commit()
+    finally:
+        other.close()
+
+    assert user_cache._entries.get(user.id) is None
+
+
+def test_cache_can_be_disabled(db_session, monkeypatch):
+    session, models, _crud = db_session
+    import app.config as config
+    from app.services import user_cache
+
+    monkeypatch.setenv("AUTH_USER_CACHE_TTL_SECONDS", "0")
+    config.get_settings.cache_clear()
+
+    user = models.User(username="uncached", email="uncached@example.com", token_version=0)
+    session.add(user)
+    session.commit()
+    _authenticate(session, user)
+    assert user_cache._entries == {}
+
+
+def test_a_change_committed_during_the_lookup_is_not_cached(db_session, monkeypatch):
+    session, models, crud = db_session
+    from app.services import user_cache
+
+    user = models.User(username="cached_race", email="race@example.com", token_version=0)
+    session.add(user)
+    session.commit()
+
+    load_user = crud.get_user_by_id
+
+    def load_then_suspend(db, user_id, **kwargs):
+        loaded = load_user(db, user_id, **kwargs)
+        # Another request suspends the user after our SELECT but before
+        # the snapshot is stored; its invalidation has already run.
+        other = _new_session(session)
+        try:
+            crud.set_user_suspension(other, user_id, True)
+        finally:
+            other.close()
+        return loaded
+
+    monkeypatch.setattr(crud, "get_user_by_id", load_then_suspend)
+    _authenticate(session, user)
+    assert user_cache._entries.get(user.id) is None
+
+    monkeypatch.setattr(crud, "get_user_by_id", load_user)
+    session.expire_all()
+    assert _authenticate(session, user).is_suspended
+    assert user_cache._entries[user.id].user.is_suspended